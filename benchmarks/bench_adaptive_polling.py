@@ -0,0 +1,71 @@
+"""
+runs the same simulated worlds with fixed and with adaptive polling and
+compares the world model calls per treatment and how long each accepted
+person waited from the first snapshot that listed it until a hospital
+accepted it, separately for persons first seen during an earthquake and in
+calm times. the mean since spawning of FakeWorldModel mixes both and is
+dominated by the backlog an earthquake leaves. the scenarios are a busy
+hospital, one that is full most of the time (a single doctor), three
+hospitals competing for few persons, a world that rejects most admissions
+and earthquakes.
+
+    python -m benchmarks.bench_adaptive_polling --hours 1 --seed 1
+"""
+
+import argparse
+import logging
+import statistics
+
+from src.runtime.simulation import Simulation
+
+
+SINGLE_DOCTOR = [{"name": "Chris Davis", "gender": "male", "birth_date": "1992-05-30", "expertise": "Emergency Medicine"}]
+
+SCENARIOS = {
+    "busy": dict(definitions=[{"name": "hospital", "max_capacity": 15}]),
+    "full": dict(definitions=[{"name": "hospital", "max_capacity": 15, "doctors": SINGLE_DOCTOR}]),
+    "competing": dict(
+        definitions=[{"name": name, "max_capacity": 15} for name in ("north", "south", "east")],
+        population=10, share_snapshots=False,
+    ),
+    "rejecting": dict(definitions=[{"name": "hospital", "max_capacity": 15}], reject_rate=0.9),
+    "earthquakes": dict(
+        definitions=[{"name": "hospital", "max_capacity": 15}],
+        earthquake_rate=0.02, earthquake_duration=120, earthquake_population=1_000,
+    ),
+}
+
+
+def describe(waits: list[float]) -> str:
+    if len(waits) < 2:
+        return f"{'-':>24}"
+    return f"{statistics.fmean(waits):6.1f} s p95 {statistics.quantiles(waits, n=20)[-1]:6.1f} s ({len(waits):5})"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for name in args.scenarios:
+        options = dict(SCENARIOS[name])
+        definitions = options.pop("definitions")
+        for adaptive in (False, True):
+            simulation = Simulation(definitions, args.seed, adaptive_polling=adaptive, **options)
+            report = simulation.run(args.hours * 3600)
+            calls = report["world"]["calls"]
+            treatments = sum(hospital["treatments"] for hospital in report["hospitals"].values())
+            waits = simulation.world.sighting_waits
+            print(
+                f"{name:>12} {'adaptive' if adaptive else 'fixed':>8}: snapshots {calls.get('snapshot', 0):6}"
+                f" - accept requests {calls.get('accept-person', 0):6} - treatments {treatments:6}"
+                f" - calls per treatment {(calls.get('snapshot', 0) + calls.get('accept-person', 0)) / max(treatments, 1):5.2f}"
+                f" - wait since sighting: calm {describe(waits[False])} - earthquake {describe(waits[True])}"
+            )
+
+
+if __name__ == "__main__":
+    main()
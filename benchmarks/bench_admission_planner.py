@@ -0,0 +1,78 @@
+"""
+runs the same simulated worlds with random admission (ACCEPTENCE_RATE) and
+with the admission planner and compares treatments served, accept requests,
+persons requested per treatment and accepted persons no doctor could treat.
+the scenarios are the default roster, more beds than doctor slots, a roster
+missing plastic surgery and emergency medicine (burns cannot be treated) that
+shares its world with a burn center, and earthquakes. only the first hospital
+of a scenario is reported.
+
+    python -m benchmarks.bench_admission_planner --hours 1 --seed 1
+"""
+
+import argparse
+import logging
+
+from src.models.hospital import admissions_attempted, admissions_untreatable
+from src.runtime.simulation import Simulation
+
+
+NO_BURNS = [
+    {"name": "Sophia Williams", "gender": "female", "birth_date": "1985-06-15", "expertise": "Orthopedics"},
+    {"name": "John Smith", "gender": "male", "birth_date": "1990-04-22", "expertise": "Traumatology"},
+    {"name": "Emily Brown", "gender": "female", "birth_date": "1987-03-08", "expertise": "Physical Therapy"},
+]
+
+# persons only leave the world when accepted, a world that takes burns slower than they
+# arrive fills up with burn patients and starves every hospital without plastic surgery
+BURN_CENTER = {
+    "name": "burn center",
+    "max_capacity": 15,
+    "doctors": [
+        {"name": "Emma Garcia", "gender": "female", "birth_date": "1995-09-14", "expertise": "Plastic Surgery"},
+        {"name": "Sarah Miller", "gender": "female", "birth_date": "1988-10-10", "expertise": "Plastic Surgery"},
+        {"name": "Olivia Wilson", "gender": "female", "birth_date": "1991-02-19", "expertise": "Plastic Surgery"},
+        {"name": "James Taylor", "gender": "male", "birth_date": "1986-11-03", "expertise": "Plastic Surgery"},
+    ],
+}
+
+SCENARIOS = {
+    "default": dict(max_capacity=15),
+    "spare beds": dict(max_capacity=60),
+    "no burns": dict(max_capacity=15, doctors=NO_BURNS, companions=[BURN_CENTER]),
+    "earthquakes": dict(
+        max_capacity=15, earthquake_rate=0.02, earthquake_duration=120, earthquake_population=1_000,
+    ),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for name in args.scenarios:
+        options = dict(SCENARIOS[name])
+        definition = {"max_capacity": options.pop("max_capacity"), "doctors": options.pop("doctors", [])}
+        companions = options.pop("companions", [])
+        for planner in (False, True):
+            # a fresh name per run, the metric counters are process wide
+            hospital = definition["name"] = f"{name} {'planned' if planner else 'random'}"
+            report = Simulation([definition, *companions], args.seed, admission_planner=planner, **options).run(args.hours * 3600)
+            treatments = report["hospitals"][hospital]["treatments"]
+            requested = admissions_attempted.labels(hospital).value
+            print(
+                f"{name:>12} {'planned' if planner else 'random':>8}: treatments {treatments:6}"
+                f" - accept requests {report['world']['calls'].get('accept-person', 0):6}"
+                f" - requested per treatment {requested / max(treatments, 1):5.2f}"
+                f" - untreatable {admissions_untreatable.labels(hospital).value:5.0f}"
+                f" - mean occupancy {report['hospitals'][hospital]['mean_occupancy']:5.1f}"
+                f" - mean wait for admission {report['world']['mean_admission_wait']:6.1f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
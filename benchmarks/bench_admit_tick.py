@@ -0,0 +1,38 @@
+"""
+measures how long one admit tick takes to pick candidates while the patient
+history grows. the tick latency should stay flat.
+
+    python -m benchmarks.bench_admit_tick
+"""
+
+import time
+
+from src.models.hospital import Hospital
+from src.models.person import Person
+
+
+def run(snapshot_size: int = 1_000, history_sizes=(1_000, 10_000, 100_000, 1_000_000), ticks: int = 50) -> None:
+    snapshot = [
+        Person(i, "person", "male", "1990-01-01", str(i), "injured")
+        for i in range(10_000_000, 10_000_000 + snapshot_size)
+    ]
+    hospital = Hospital("bench", snapshot_size)
+    filled = 0
+    for history in history_sizes:
+        # pretend earlier patients were admitted and discharged
+        for person_id in range(filled, history):
+            hospital.patients.admit(person_id)
+            hospital.patients.start_treatment(person_id, person_id)
+            hospital.patients.discharge(person_id)
+        filled = history
+
+        start = time.perf_counter()
+        for _ in range(ticks):
+            candidates = hospital._select_candidates(snapshot)
+            hospital.patients.release(list(candidates))
+        elapsed = (time.perf_counter() - start) / ticks
+        print(f"history: {history:>9} patients - admit tick: {elapsed * 1000:.3f} ms - used capacity: {hospital.used_capacity}")
+
+
+if __name__ == "__main__":
+    run()
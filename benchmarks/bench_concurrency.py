@@ -0,0 +1,172 @@
+"""
+stress test of the hospital state under parallel admit and discharge workers.
+one hospital runs against an in-process fake world model with short treatments
+while several threads admit in a tight loop, the discharge coalescer sends
+batches from several workers and a snapshot thread keeps the candidates fresh.
+the gil is made to switch threads as often as possible to shake out races.
+
+a checker thread asserts the capacity invariants the whole time: the registry
+is consistent, beds used plus reserved never exceed max_capacity and the world
+model never holds more persons for the hospital than it has beds, and no
+patient keeps waiting while a doctor who could treat it is free (a lost
+wakeup between a queue and a released doctor). after the
+run everything is drained, no treatment may be left in memory and the final
+counts, those of the status summary too, must add up.
+
+    python -m benchmarks.bench_concurrency --seconds 10 --admit-workers 1 4 --discharge-workers 1 4
+"""
+
+import argparse
+import itertools
+import logging
+import sys
+import threading
+import time
+
+from src.fake_worldmodel import FakeWorldModel, InProcessClient
+from src.models.hospital import Hospital
+
+
+# a queued patient and a free doctor of its expertise side by side for this long is a lost wakeup
+STUCK_SECONDS = 0.5
+
+
+def check(hospital: Hospital, world: FakeWorldModel) -> list[str]:
+    problems = hospital.patients.check()
+    with world._lock:
+        hospitalized = sum(1 for entity_id in world.hospitalized.values() if entity_id == hospital.id)
+    if hospitalized > hospital.max_capacity:
+        problems.append(f"world model holds {hospitalized} persons for {hospital.max_capacity} beds")
+    return problems
+
+
+def idle_doctors(hospital: Hospital) -> list:
+    # expertises with waiting patients and a free slot, fine for an instant, not for long
+    with hospital._waiting_lock:
+        waiting = [expertise for expertise, queue in hospital.waiting_patients.items() if queue]
+    return [expertise for expertise in waiting if hospital.doctor_pool.free_slots(expertise) > 0]
+
+
+def final_check(hospital: Hospital, world: FakeWorldModel, settled: list) -> list[str]:
+    patients = hospital.patients
+    problems = hospital.patients.check()
+    for name, persons in (
+        ("requested", patients.requested), ("held", patients.held),
+        ("waiting", patients.waiting), ("in service", patients.in_service),
+    ):
+        if persons:
+            problems.append(f"{len(persons)} persons still {name} after draining")
+    busy = {doctor_id: load for doctor_id, load in hospital.doctor_pool.loads.items() if load}
+    if busy:
+        problems.append(f"doctors still busy after draining: {busy}")
+    if hospital.treatments:
+        problems.append(f"{len(hospital.treatments)} treatments still kept after draining")
+    status = hospital.stats.summary()
+    if status["occupancy"]["current"] or status["occupancy"]["waiting"]:
+        problems.append(f"status still reports {status['occupancy']} after draining")
+    treatments = status["treatments"]
+    if treatments["started"] != len(settled):
+        problems.append(f"{treatments['started']} treatments started but {len(settled)} settled")
+    discharged = sum(discharge is not None for discharge in settled)
+    if treatments["healthy"] + treatments["dead"] != discharged:
+        problems.append(f"{discharged} discharges but status counts {treatments}")
+    stats = world.stats()
+    if stats["healthy"] + stats["dead"] != discharged:
+        problems.append(f"world model discharged {stats['healthy'] + stats['dead']}, hospital {discharged}")
+    return problems
+
+
+def run(seconds: float, capacity: int, admit_workers: int, discharge_workers: int, time_rate: float, population: int) -> dict:
+    world = FakeWorldModel(population=population, time_rate=time_rate, seed=0)
+    # list.append is atomic, the discharge workers can all report here
+    settled: list = []
+    hospital = Hospital(
+        f"stress-{admit_workers}-{discharge_workers}", capacity, client=InProcessClient(world),
+        on_discharge=lambda treatment, discharge: settled.append(discharge),
+    )
+    hospital.polling.enabled = False
+    hospital.discharge_coalescer.workers = discharge_workers
+    hospital.register()
+    hospital.registered.wait(5)
+
+    stop = threading.Event()
+    violations: list[str] = []
+    peak = [0]
+
+    def admit() -> None:
+        while not stop.is_set():
+            hospital.admit_patient()
+            time.sleep(0)
+
+    def snapshot() -> None:
+        while not stop.is_set():
+            hospital.take_snapshot()
+            stop.wait(0.05)
+
+    def checker() -> None:
+        idle_since: dict = {}
+        while not stop.is_set():
+            violations.extend(check(hospital, world))
+            peak[0] = max(peak[0], hospital.used_capacity)
+            now = time.perf_counter()
+            idle = idle_doctors(hospital)
+            idle_since = {expertise: idle_since.get(expertise, now) for expertise in idle}
+            for expertise, since in idle_since.items():
+                if now - since > STUCK_SECONDS:
+                    violations.append(f"patients waiting for {expertise.value} with a free doctor for {now - since:.1f} s")
+                    idle_since[expertise] = now
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=admit) for _ in range(admit_workers)]
+    threads += [threading.Thread(target=snapshot), threading.Thread(target=checker)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # the treatments still running end within a few seconds at this time rate
+    hospital.drain(timeout=30)
+    violations.extend(final_check(hospital, world, settled))
+    discharged = sum(discharge is not None for discharge in settled)
+    return {
+        "treatments": len(settled),
+        "discharges": discharged,
+        "per_second": len(settled) / elapsed,
+        "peak": peak[0],
+        "violations": violations,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--capacity", type=int, default=50)
+    parser.add_argument("--time-rate", type=float, default=8)
+    parser.add_argument("--population", type=int, default=2_000)
+    parser.add_argument("--admit-workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--discharge-workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    sys.setswitchinterval(1e-6)
+
+    failed = False
+    for admit_workers, discharge_workers in itertools.product(args.admit_workers, args.discharge_workers):
+        result = run(args.seconds, args.capacity, admit_workers, discharge_workers, args.time_rate, args.population)
+        print(
+            f"admit workers {admit_workers} - discharge workers {discharge_workers}: "
+            f"{result['treatments']:6} treatments ({result['per_second']:7.1f}/s) - {result['discharges']:6} discharges - "
+            f"peak beds {result['peak']}/{args.capacity} - violations {len(result['violations'])}"
+        )
+        for violation in result["violations"][:10]:
+            print(f"    {violation}")
+        failed = failed or bool(result["violations"])
+    if failed:
+        raise SystemExit("capacity invariants were broken")
+
+
+if __name__ == "__main__":
+    main()
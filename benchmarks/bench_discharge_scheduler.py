@@ -0,0 +1,49 @@
+"""
+schedules a large number of concurrent treatments on a single DischargeScheduler
+and reports throughput and thread count.
+
+    python -m benchmarks.bench_discharge_scheduler [count]
+"""
+
+import sys
+import threading
+import time
+
+from src.utils.discharge_scheduler import DischargeScheduler
+
+
+def run(count: int = 100_000, spread: float = 2.0) -> None:
+    done = threading.Event()
+    handled = 0
+
+    def handler(key, payload):
+        nonlocal handled
+        handled += 1
+        if handled == count:
+            done.set()
+
+    threads_before = threading.active_count()
+    scheduler = DischargeScheduler(handler)
+    scheduler.start()
+
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(count):
+        scheduler.schedule(i, now + 0.5 + spread * (i % 1000) / 1000)
+    schedule_elapsed = time.perf_counter() - start
+
+    # cancel and reschedule a slice to exercise the lazy deletion path
+    for i in range(0, count, 10):
+        scheduler.reschedule(i, now + 0.5 + spread)
+
+    print(f"scheduled {count} treatments in {schedule_elapsed:.3f}s - pending: {scheduler.pending}")
+    print(f"threads before: {threads_before} - threads while pending: {threading.active_count()}")
+
+    done.wait(spread + 30)
+    total = time.perf_counter() - start
+    print(f"handled {handled}/{count} discharges in {total:.3f}s - pending: {scheduler.pending}")
+    scheduler.stop()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,104 @@
+"""
+drives a Hospital through the local fake world model and reports throughput,
+discharge latency, http calls per patient, cpu and rss for a matrix of
+time_rate and max_capacity settings.
+
+    python -m benchmarks.bench_end_to_end --duration 10 --time-rates 1 5 20 --capacities 15 60
+"""
+
+import argparse
+import logging
+import resource
+import statistics
+import threading
+import time
+
+from src.fake_worldmodel import FakeWorldModel, FakeWorldModelServer
+from src.models.hospital import Hospital
+from src.runtime.supervisor import Supervisor
+
+
+def current_rss_mib() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def run_scenario(time_rate: float, max_capacity: int, duration: float, population: int, latency: float, reject_rate: float) -> dict:
+    world = FakeWorldModel(population=population, time_rate=time_rate, reject_rate=reject_rate, seed=0)
+    server = FakeWorldModelServer(world, latency=latency).start()
+    # time from the planned end of a treatment to its accepted discharge
+    latencies: list[float] = []
+
+    def on_discharge(treatment, discharge) -> None:
+        if discharge is not None:
+            latencies.append((discharge.discharge_date - treatment.end_date).total_seconds())
+
+    hospital = Hospital(f"bench-{time_rate}-{max_capacity}", max_capacity, server.base_url, on_discharge=on_discharge)
+    supervisor = Supervisor(hospital, drain_timeout=1)
+
+    stop = threading.Timer(duration, supervisor.shutdown)
+    stop.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    supervisor.run()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    server.stop()
+
+    calls = sum(world.stats()["calls"].values())
+    admitted = hospital.stats.summary()["treatments"]["started"]
+    jitter = supervisor.jitter_stats()
+    return {
+        "time_rate": time_rate,
+        "capacity": max_capacity,
+        "admissions/s": admitted / wall,
+        "discharges": len(latencies),
+        "p50 ms": percentile(latencies, 0.5) * 1000,
+        "p95 ms": percentile(latencies, 0.95) * 1000,
+        "p99 ms": percentile(latencies, 0.99) * 1000,
+        "calls/patient": calls / admitted if admitted else float("nan"),
+        "cpu %": 100 * cpu / wall,
+        "rss MiB": current_rss_mib(),
+        "max jitter ms": 1000 * max(loop["max_jitter"] for loop in jitter.values()),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--time-rates", type=float, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--capacities", type=int, nargs="+", default=[15, 60])
+    parser.add_argument("--population", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--reject-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rows = [
+        run_scenario(time_rate, capacity, args.duration, args.population, args.latency, args.reject_rate)
+        for time_rate in args.time_rates
+        for capacity in args.capacities
+    ]
+    headers = list(rows[0])
+    print(" | ".join(f"{header:>13}" for header in headers))
+    for row in rows:
+        print(" | ".join(f"{value:>13.2f}" if isinstance(value, float) else f"{value:>13}" for value in row.values()))
+    print(f"discharge latency is measured from Treatment.end_date to the accepted Discharge (mean over all: "
+          f"{statistics.mean([r['p50 ms'] for r in rows]):.1f} ms p50)")
+
+
+if __name__ == "__main__":
+    main()
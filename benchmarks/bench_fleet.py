@@ -0,0 +1,79 @@
+"""
+runs fleets of 1 to 1000 hospitals against the local fake world model and
+reports the per-hospital cost in memory, cpu and http calls.
+
+    python -m benchmarks.bench_fleet --sizes 1 10 100 1000 --duration 10
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import time
+import tracemalloc
+
+from src.fake_worldmodel import FakeWorldModel, FakeWorldModelServer
+from src.runtime.fleet import Fleet
+from benchmarks.bench_end_to_end import current_rss_mib
+
+
+async def _run_for(fleet: Fleet, duration: float) -> None:
+    task = asyncio.create_task(fleet.run())
+    await asyncio.sleep(duration)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def run_fleet(size: int, duration: float, share_snapshots: bool, time_rate: float) -> dict:
+    world = FakeWorldModel(population=500, time_rate=time_rate, seed=0)
+    server = FakeWorldModelServer(world).start()
+
+    gc.collect()
+    tracemalloc.start()
+    fleet = Fleet(
+        [{"name": f"hospital-{i}", "max_capacity": 15} for i in range(size)],
+        server.base_url,
+        share_snapshots,
+    )
+    build_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_before = current_rss_mib()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    asyncio.run(_run_for(fleet, duration))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    server.stop()
+
+    calls = sum(world.stats()["calls"].values())
+    admitted = fleet.stats()["treatments"]
+    return {
+        "hospitals": size,
+        "KiB/hospital": build_bytes / size / 1024,
+        "rss MiB": current_rss_mib(),
+        "rss delta MiB": current_rss_mib() - rss_before,
+        "cpu ms/hospital/s": 1000 * cpu / wall / size,
+        "calls/hospital/s": calls / wall / size,
+        "admitted": admitted,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--time-rate", type=float, default=5)
+    parser.add_argument("--no-share-snapshots", action="store_true")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    rows = [run_fleet(size, args.duration, not args.no_share_snapshots, args.time_rate) for size in args.sizes]
+    headers = list(rows[0])
+    print(" | ".join(f"{header:>17}" for header in headers))
+    for row in rows:
+        print(" | ".join(f"{value:>17.2f}" if isinstance(value, float) else f"{value:>17}" for value in row.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+generates ids from UniqueIDGenerator one by one, in reserved blocks and from
+several threads at once, and checks that all of them are unique.
+
+    python -m benchmarks.bench_id_generator [count]
+"""
+
+import sys
+import threading
+import time
+
+from src.utils.random_id_generator import UniqueIDGenerator
+
+
+def run(count: int = 1_000_000, threads: int = 8, block_size: int = 1_000) -> None:
+    start = time.perf_counter()
+    ids = [UniqueIDGenerator.generate_id() for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    print(f"generate_id:  {count} ids in {elapsed:.3f}s ({count / elapsed:,.0f} ids/s)")
+
+    start = time.perf_counter()
+    for _ in range(count // block_size):
+        ids.extend(UniqueIDGenerator.reserve_ids(block_size))
+    elapsed = time.perf_counter() - start
+    print(f"reserve_ids:  {count} ids in {elapsed:.3f}s ({count / elapsed:,.0f} ids/s)")
+
+    per_thread = count // threads
+    results: list[list[int]] = [[] for _ in range(threads)]
+
+    def worker(out: list[int]):
+        for _ in range(per_thread):
+            out.append(UniqueIDGenerator.generate_id())
+
+    workers = [threading.Thread(target=worker, args=(out,)) for out in results]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"{threads} threads: {per_thread * threads} ids in {elapsed:.3f}s")
+
+    for out in results:
+        ids.extend(out)
+    print(f"unique: {len(set(ids)) == len(ids)} ({len(ids)} ids)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,116 @@
+"""
+measures what the metrics instrumentation costs. the hospital is driven at
+full capacity against an in-process FakeWorldModel (no sockets, so the
+instrumented code is as large a share of the work as it can get), once with
+the metrics and once with every update turned into a no-op, and the cpu time
+per tick is compared. the per-operation cost of each metric type is printed too.
+
+    python -m benchmarks.bench_metrics_overhead --ticks 2000 --rounds 5
+"""
+
+import argparse
+import logging
+import time
+from time import perf_counter
+
+from src.fake_worldmodel import FakeWorldModel, InProcessClient
+from src.models.enums import DischargeStatus
+from src.models.hospital import Hospital
+from src.utils.metrics import Counter, Histogram, MetricsRegistry, _Timer
+
+
+def per_operation_ns(operations: int = 200_000) -> dict[str, float]:
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "bench", ("hospital",)).labels("a")
+    histogram = registry.histogram("bench_seconds", "bench", ("hospital",)).labels("a")
+    family = registry.counter("bench_lookup_total", "bench", ("endpoint",))
+
+    def timed() -> None:
+        with histogram.time():
+            pass
+
+    results = {}
+    for name, operation in (
+        ("counter.inc", counter.inc),
+        ("histogram.observe", lambda: histogram.observe(0.003)),
+        ("histogram.time", timed),
+        ("family.labels", lambda: family.labels("/snapshot")),
+    ):
+        start = perf_counter()
+        for _ in range(operations):
+            operation()
+        results[name] = (perf_counter() - start) / operations * 1e9
+    return results
+
+
+def run_hospital(ticks: int, population: int, capacity: int) -> float:
+    world = FakeWorldModel(population=population, seed=1)
+    hospital = Hospital("bench-metrics", capacity, client=InProcessClient(world))
+    _, body = hospital.client.post("/register", hospital._registration_payload())
+    hospital._on_registered(body)
+
+    start = time.process_time()
+    try:
+        for _ in range(ticks):
+            hospital.take_snapshot()
+            hospital.admit_patient()
+            # every running treatment ends right away, the scheduler thread is not involved
+            items = []
+            for treatment_id in list(hospital.patients.in_service.values()):
+                hospital.discharge_scheduler.cancel(treatment_id)
+                items.append((treatment_id, DischargeStatus.HEALTHY, 1))
+            hospital.discharge_batch(items)
+        return (time.process_time() - start) / ticks
+    finally:
+        # the next round builds a hospital of the same name
+        hospital.close_metrics()
+
+
+def disable_metrics() -> dict:
+    originals = {
+        (Counter, "inc"): Counter.inc,
+        (Histogram, "observe"): Histogram.observe,
+        (_Timer, "__enter__"): _Timer.__enter__,
+        (_Timer, "__exit__"): _Timer.__exit__,
+    }
+    Counter.inc = lambda self, amount=1: None
+    Histogram.observe = lambda self, value: None
+    _Timer.__enter__ = lambda self: self
+    _Timer.__exit__ = lambda self, *exc_info: None
+    return originals
+
+
+def restore_metrics(originals: dict) -> None:
+    for (cls, name), method in originals.items():
+        setattr(cls, name, method)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ticks", type=int, default=2_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--population", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=60)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for name, cost in per_operation_ns().items():
+        print(f"{name:>18}: {cost:8.1f} ns")
+
+    # rounds alternate so drift in machine load hits both sides alike
+    enabled, disabled = [], []
+    for _ in range(args.rounds):
+        enabled.append(run_hospital(args.ticks, args.population, args.capacity))
+        originals = disable_metrics()
+        try:
+            disabled.append(run_hospital(args.ticks, args.population, args.capacity))
+        finally:
+            restore_metrics(originals)
+
+    with_metrics, without_metrics = min(enabled), min(disabled)
+    overhead = (with_metrics - without_metrics) / without_metrics * 100
+    print(f"tick cpu with metrics: {with_metrics * 1e6:.1f} us - without: {without_metrics * 1e6:.1f} us - overhead: {overhead:.2f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+runs the same cpu bound simulation without the profiler, with stack sampling
+only and with tracemalloc on the whole time, and reports how much slower each
+one made the run. tracemalloc windows are too far apart to show up in a run
+of a few seconds, their steady cost is estimated from the traced run and the
+PROFILE_ALLOC_WINDOW / PROFILE_ALLOC_EVERY duty cycle.
+
+    python -m benchmarks.bench_profiler_overhead --hours 8 --rounds 2
+"""
+
+import argparse
+import logging
+import tempfile
+
+from src.runtime.simulation import Simulation
+from src.utils.profiler import Profiler
+import src.config as config
+
+
+def run(hours: float, profiler: Profiler | None) -> float:
+    if profiler is not None:
+        profiler.start()
+    try:
+        return Simulation.single(15, seed=1).run(hours * 3600)["wall_seconds"]
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=2)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cases = {
+            "no profiler": lambda: None,
+            "stacks only": lambda: Profiler(directory, alloc_window=0),
+            # one window as long as the run, tracing never stops
+            "stacks + tracemalloc always": lambda: Profiler(directory, alloc_window=1e9),
+        }
+        baseline = None
+        overhead = {}
+        for name, factory in cases.items():
+            wall = min(run(args.hours, factory()) for _ in range(args.rounds))
+            baseline = baseline or wall
+            overhead[name] = wall / baseline - 1
+            print(f"{name:>32}: {wall:7.2f} s - overhead {overhead[name]:7.1%}")
+        duty = config.PROFILE_ALLOC_WINDOW / config.PROFILE_ALLOC_EVERY
+        traced = overhead["stacks + tracemalloc always"] - overhead["stacks only"]
+        print(
+            f"{'defaults':>32}: about {overhead['stacks only'] + traced * duty:.1%} overhead with tracemalloc"
+            f" {config.PROFILE_ALLOC_WINDOW} s every {config.PROFILE_ALLOC_EVERY} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+bytes per record for the slotted entity classes compared with the same
+attributes stored in a per-instance __dict__ (the layout the classes had
+before they declared __slots__).
+
+    python -m benchmarks.bench_record_memory [count]
+"""
+
+import logging
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+from src.models.discharge import Discharge
+from src.models.enums import DischargeStatus, TreatmentType
+from src.models.person import Person
+from src.models.treatment import Treatment
+
+
+def measure(factory, count: int) -> float:
+    tracemalloc.start()
+    records = [factory(i) for i in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / count
+
+
+def as_dict_record(record) -> SimpleNamespace:
+    return SimpleNamespace(**{name: getattr(record, name) for cls in type(record).__mro__ for name in getattr(cls, "__slots__", ())})
+
+
+def run(count: int = 1_000_000) -> None:
+    # treatments log on creation, keep the benchmark about memory
+    logging.disable(logging.INFO)
+
+    factories = {
+        "Person": lambda i: Person(i, "person", "male", "1990-01-01", str(i), "injured"),
+        "Treatment": lambda i: Treatment(i, 1, TreatmentType.WOUND_CARE, 1),
+        "Discharge": lambda i: Discharge(i, DischargeStatus.HEALTHY),
+    }
+    for name, factory in factories.items():
+        slotted = measure(factory, count)
+        legacy = measure(lambda i: as_dict_record(factory(i)), count)
+        print(f"{name:<10} before: {legacy:7.1f} bytes/record - after: {slotted:7.1f} bytes/record")
+    print(f"({count} records each)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
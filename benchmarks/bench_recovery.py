@@ -0,0 +1,73 @@
+"""
+writes a journal of admit, treatment and discharge events for a long running
+hospital and times how long a restart takes to rebuild the state from it and
+re-arm the discharges of the treatments that were still running.
+
+    python -m benchmarks.bench_recovery --events 1000000 --running 1000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from src.models.enums import TreatmentType
+from src.models.hospital import Hospital
+from src.models.hospital_journal import ADMIT, DISCHARGE, DOCTOR, REGISTER, TREATMENT, HospitalJournal
+
+
+def write_journal(path: str, events: int, running: int) -> int:
+    journal = HospitalJournal(path)
+    journal.journal.open()
+    append = journal.journal.append
+    now = time.time()
+    append(REGISTER, 0, 1, 0, 0, 1.0, datetime.now().timestamp())
+    for position in range(10):
+        append(DOCTOR, 0, 1_000 + position, position, 0, 0.0, 0.0)
+
+    # every patient is one admit, one treatment and, unless still running, one discharge
+    written, person_id = 11, 0
+    while written < events:
+        person_id += 1
+        still_running = person_id <= running
+        start = now - 5 if still_running else now - 3_600
+        append(ADMIT, 0, person_id, 0, 0, 0.0, 0.0)
+        append(TREATMENT, person_id % len(TreatmentType), person_id, person_id, 1_000 + person_id % 10, start, start + 30)
+        written += 2
+        if not still_running:
+            append(DISCHARGE, 0, person_id, person_id, 0, 0.0, start + 30)
+            written += 1
+    journal.close()
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--running", type=int, default=1_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.journal")
+        start = time.perf_counter()
+        written = write_journal(path, args.events, args.running)
+        print(f"wrote {written} events ({os.path.getsize(path) / 2**20:.1f} MiB) in {time.perf_counter() - start:.2f} s")
+
+        journal = HospitalJournal(path)
+        start = time.perf_counter()
+        hospital = Hospital("bench-recovery", args.running, journal=journal)
+        elapsed = time.perf_counter() - start
+        print(
+            f"recovered in {elapsed * 1000:.0f} ms - running treatments: {len(hospital.patients.in_service)}"
+            f" - armed discharges: {hospital.discharge_scheduler.pending}"
+            f" - known patients: {len(hospital.patients.admitted)}"
+            f" - checkpoint: {os.path.getsize(journal.journal.checkpoint_path) / 2**20:.1f} MiB"
+        )
+        hospital.close_journal()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+runs a large fleet through ShardedFleet with a growing number of worker
+processes and reports aggregate throughput. the fake world model runs in its
+own process so it does not share the parent's GIL.
+
+    python -m benchmarks.bench_sharding --hospitals 1000 --workers 1 2 4 --duration 20
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from src.fake_worldmodel import FakeWorldModel, FakeWorldModelServer
+from src.runtime.sharding import ShardedFleet
+
+
+def _serve(population: int, time_rate: float, urls) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = FakeWorldModelServer(FakeWorldModel(population=population, time_rate=time_rate, seed=0))
+    urls.put(server.base_url)
+    server.serve_forever()
+
+
+def run(hospitals: int, workers: int, duration: float, time_rate: float, crash_after: float | None) -> dict:
+    context = multiprocessing.get_context("spawn")
+    urls = context.Queue()
+    server = context.Process(target=_serve, args=(2_000, time_rate, urls), daemon=True)
+    server.start()
+    base_url = urls.get(timeout=30)
+
+    fleet = ShardedFleet(
+        [{"name": f"hospital-{i}", "max_capacity": 15} for i in range(hospitals)],
+        workers,
+        base_url,
+        report_interval=1,
+    )
+    threading.Timer(duration, fleet.shutdown).start()
+    if crash_after is not None:
+        def crash():
+            shard, process = next(iter(fleet._processes.items()))
+            print(f"killing shard {shard} (pid {process.pid})")
+            os.kill(process.pid, signal.SIGKILL)
+        threading.Timer(crash_after, crash).start()
+
+    start = time.perf_counter()
+    fleet.run()
+    wall = time.perf_counter() - start
+    server.terminate()
+
+    metrics = fleet.metrics()
+    return {
+        "workers": workers,
+        "hospitals": metrics.get("hospitals", 0),
+        "treatments/s": metrics.get("treatments", 0) / wall,
+        "discharges/s": metrics.get("discharges", 0) / wall,
+        "worker cpu s": metrics.get("cpu", 0.0),
+        "restarts": metrics["restarts"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hospitals", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--time-rate", type=float, default=5)
+    parser.add_argument("--crash-after", type=float, default=None, help="kill one worker after this many seconds")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    print(f"{os.cpu_count()} cpus")
+    rows = [run(args.hospitals, workers, args.duration, args.time_rate, args.crash_after) for workers in args.workers]
+    headers = list(rows[0])
+    print(" | ".join(f"{header:>13}" for header in headers))
+    for row in rows:
+        print(" | ".join(f"{value:>13.2f}" if isinstance(value, float) else f"{value:>13}" for value in row.values()))
+
+
+if __name__ == "__main__":
+    main()
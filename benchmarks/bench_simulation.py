@@ -0,0 +1,41 @@
+"""
+replays hospital activity on the virtual clock and reports how many simulated
+seconds pass per wall second. the first seed is run twice and the fingerprints
+have to match, a regression in determinism fails the benchmark.
+
+    python -m benchmarks.bench_simulation --hours 24 --capacity 15 --seeds 1 2
+"""
+
+import argparse
+import logging
+
+from src.runtime.simulation import Simulation
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--capacity", type=int, default=15)
+    parser.add_argument("--population", type=int, default=100)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    duration = args.hours * 3600
+    runs = [args.seeds[0], *args.seeds]
+    fingerprints = {}
+    for seed in runs:
+        report = Simulation.single(args.capacity, seed=seed, population=args.population).run(duration)
+        hospital = report["hospitals"]["hospital"]
+        print(
+            f"seed {seed}: {args.hours:g} h in {report['wall_seconds']:.2f} s ({report['speedup']:,.0f}x)"
+            f" - treatments: {hospital['treatments']} - dead: {hospital['dead']}"
+            f" - mean occupancy: {hospital['mean_occupancy']:.2f}/{args.capacity}"
+            f" - fingerprint: {report['fingerprint'][:16]}"
+        )
+        fingerprints.setdefault(seed, set()).add(report["fingerprint"])
+    assert len(fingerprints[args.seeds[0]]) == 1, "equal seeds produced different runs"
+
+
+if __name__ == "__main__":
+    main()
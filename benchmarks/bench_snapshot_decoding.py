@@ -0,0 +1,95 @@
+"""
+decodes one big snapshot body the old way (the whole body through json.loads,
+then Snapshot.from_dict) and streamed through a SnapshotReader in
+SNAPSHOT_STREAM_CHUNK pieces, once with the standard library and once with
+every optional json backend that is installed. reports the total time, the
+time until the first admission candidates are known and the peak of traced
+memory.
+
+    python -m benchmarks.bench_snapshot_decoding --persons 200000
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import time
+import tracemalloc
+
+from src.fake_worldmodel import FakeWorldModel
+from src.models.person_cache import PersonCache
+from src.models.snapshot import Snapshot, SnapshotReader
+from src.utils import json_backend
+import src.config as config
+
+
+def build_body(persons: int) -> bytes:
+    world = FakeWorldModel(population=persons, seed=0)
+    _, registered = world.register({})
+    _, body = world.snapshot(registered["entity_id"])
+    return json.dumps(body).encode()
+
+
+def full(body: bytes) -> tuple[float, float]:
+    start = time.perf_counter()
+    snapshot = Snapshot.from_dict(json.loads(body), PersonCache())
+    # candidates are only known once everything is parsed
+    elapsed = time.perf_counter() - start
+    assert snapshot.persons
+    return elapsed, elapsed
+
+
+def streamed(body: bytes) -> tuple[float, float]:
+    first = []
+    start = time.perf_counter()
+    reader = SnapshotReader(PersonCache(), lambda persons: first or first.append(time.perf_counter() - start))
+    for offset in range(0, len(body), config.SNAPSHOT_STREAM_CHUNK):
+        reader.feed(body[offset:offset + config.SNAPSHOT_STREAM_CHUNK])
+    snapshot = reader.finish()
+    elapsed = time.perf_counter() - start
+    assert snapshot.persons
+    return elapsed, first[0]
+
+
+def peak(func, body: bytes) -> float:
+    tracemalloc.start()
+    func(body)
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return traced / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--persons", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    body = build_body(args.persons)
+    print(f"{args.persons} persons, {len(body) / 1024 / 1024:.1f} MiB body, {config.SNAPSHOT_STREAM_CHUNK} byte chunks")
+
+    backends = [("json", json.loads)]
+    for name in ("orjson", "ujson"):
+        try:
+            backends.append((name, importlib.import_module(name).loads))
+        except ImportError:
+            print(f"{name} is not installed")
+
+    cases = [("json.loads + from_dict", None, full)]
+    cases += [(f"streamed, {name}", loads, streamed) for name, loads in backends]
+    installed = json_backend.loads
+    try:
+        for name, loads, func in cases:
+            json_backend.loads = loads or installed
+            func(body)
+            timings = [func(body) for _ in range(args.rounds)]
+            total = min(timing[0] for timing in timings) * 1000
+            first = min(timing[1] for timing in timings) * 1000
+            print(f"{name:>24}: {total:8.1f} ms - first candidates after {first:8.1f} ms - peak {peak(func, body):7.1f} MiB")
+    finally:
+        json_backend.loads = installed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+feeds a long run of snapshots through the SnapshotStore and reports how much
+memory the history holds. the numbers should stop growing once the retention
+limits are reached.
+
+    python -m benchmarks.bench_snapshot_store [snapshots] [persons]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from src.models.person import Person
+from src.models.snapshot import Snapshot
+from src.models.snapshot_store import SnapshotStore
+
+
+def run(count: int = 5_000, population: int = 2_000, churn: float = 0.05) -> None:
+    rng = random.Random(0)
+    people = {i: Person(i, "person", "male", "1990-01-01", str(i), "injured") for i in range(population)}
+    next_id = population
+    store = SnapshotStore()
+
+    tracemalloc.start()
+    for snapshot_id in range(count):
+        for person_id in rng.sample(list(people), int(population * churn)):
+            del people[person_id]
+            people[next_id] = Person(next_id, "person", "male", "1990-01-01", str(next_id), "injured")
+            next_id += 1
+        store.add(Snapshot(snapshot_id, list(people.values()), False))
+        if snapshot_id % (count // 5) == 0 or snapshot_id == count - 1:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"snapshot {snapshot_id:>6} - traced: {current / 1024 / 1024:.1f} MiB - {store.memory_stats()}")
+    tracemalloc.stop()
+
+    oldest = next(iter(store._compact)).id if store._compact else count - 1
+    print(f"ids of oldest retained snapshot {oldest}: {len(store.persons_id(oldest))}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
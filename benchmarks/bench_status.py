@@ -0,0 +1,92 @@
+"""
+cost of the hospital status summaries. times one update of the aggregates
+(the work added to every treatment start and discharge), one summary and one
+GET /status/<hospital> round trip, then runs the same simulation alone and
+with a dashboard polling /status every --poll seconds of wall time.
+
+    python -m benchmarks.bench_status --hours 4 --poll 0.05
+"""
+
+import argparse
+import logging
+import statistics
+import threading
+import time
+import timeit
+import urllib.parse
+import urllib.request
+
+from src.models.enums import DischargeStatus, TreatmentType
+from src.runtime.simulation import Simulation
+from src.utils.metrics import MetricsServer, status_board
+
+
+def run(hours: float, url: str | None, poll: float) -> tuple[float, int]:
+    stop = threading.Event()
+    polls = [0]
+
+    def dashboard() -> None:
+        while not stop.wait(poll):
+            urllib.request.urlopen(f"{url}/status").read()
+            polls[0] += 1
+
+    poller = threading.Thread(target=dashboard, daemon=True) if url else None
+    if poller is not None:
+        poller.start()
+    try:
+        wall = Simulation.single(15, seed=1).run(hours * 3600)["wall_seconds"]
+    finally:
+        stop.set()
+    return wall, polls[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hours", type=float, default=4)
+    parser.add_argument("--poll", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    simulation = Simulation.single(15, seed=1)
+    simulation.run(3600)
+    hospital = simulation.hospitals[0]
+    stats, doctor_id = hospital.stats, hospital.doctors[0].id
+
+    def update() -> None:
+        stats.treatment_started(TreatmentType.WOUND_CARE, doctor_id)
+        stats.discharged(TreatmentType.WOUND_CARE, doctor_id, DischargeStatus.HEALTHY)
+
+    number = 100_000
+    print(f"start + discharge update: {min(timeit.repeat(update, number=number, repeat=3)) / number * 1e6:6.2f} us")
+    number = 10_000
+    print(f"summary:                  {min(timeit.repeat(stats.summary, number=number, repeat=3)) / number * 1e6:6.2f} us")
+
+    server = MetricsServer(port=0)
+    server.start()
+    url = server.url.rsplit("/", 1)[0]
+    try:
+        # a finished simulation takes its hospitals off the status board, this one is put back for the probes
+        status_board.add(hospital.name, stats.summary)
+        path = f"{url}/status/{urllib.parse.quote(hospital.name)}"
+        latencies = []
+        for _ in range(500):
+            started = time.perf_counter()
+            urllib.request.urlopen(path).read()
+            latencies.append(time.perf_counter() - started)
+        status_board.remove(hospital.name)
+        print(f"GET /status/<hospital>:   {statistics.median(latencies) * 1e3:6.2f} ms median")
+
+        baseline = min(run(args.hours, None, args.poll)[0] for _ in range(args.rounds))
+        polled = [run(args.hours, url, args.poll) for _ in range(args.rounds)]
+        wall, polls = min(polled)
+        print(
+            f"{args.hours:.0f} simulated hours: {baseline:.2f} s alone, {wall:.2f} s with {polls} status polls"
+            f" ({wall / baseline - 1:+.1%})"
+        )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
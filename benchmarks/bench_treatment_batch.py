@@ -0,0 +1,86 @@
+"""
+compares building the treatments of one large admission one Treatment at a
+time with drawing them as a TreatmentBatch (numpy when installed, the python
+loop otherwise). the distributions of the three are printed side by side
+and the draws are timed on their own too.
+
+    python -m benchmarks.bench_treatment_batch --patients 10000 --rounds 5
+"""
+
+import argparse
+import logging
+import time
+from collections import Counter
+
+from src.models import treatment_batch
+from src.models.treatment import RandomTreatmentType, Treatment
+from src.models.treatment_batch import TreatmentBatch
+from src.utils.random_id_generator import UniqueIDGenerator
+
+
+def one_by_one(count: int) -> list[Treatment]:
+    return [Treatment(patient_id, 1, RandomTreatmentType.generate(), 1) for patient_id in range(count)]
+
+
+def draw(count: int, use_numpy: bool) -> TreatmentBatch:
+    module_numpy = treatment_batch.numpy
+    if not use_numpy:
+        treatment_batch.numpy = None
+    try:
+        return TreatmentBatch.draw(count, 1)
+    finally:
+        treatment_batch.numpy = module_numpy
+
+
+def batched(count: int, use_numpy: bool) -> list[Treatment]:
+    batch = draw(count, use_numpy)
+    ids = UniqueIDGenerator.reserve_ids(count)
+    return [batch.build(index, ids[index], index, 1) for index in range(count)]
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def summary(treatments: list[Treatment]) -> str:
+    types = Counter(treatment.treatment_type for treatment in treatments)
+    dead = sum(treatment.is_dead for treatment in treatments)
+    mean = sum(treatment.duration for treatment in treatments) / len(treatments)
+    return f"dead {dead / len(treatments):.3f} - mean duration {mean:.3f} s - types {sorted(types.values())}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    variants = {"one by one": one_by_one, "batch, python": lambda count: batched(count, False)}
+    if treatment_batch.numpy is not None:
+        variants["batch, numpy"] = lambda count: batched(count, True)
+    else:
+        print("numpy is not installed, only the python batch is measured")
+
+    baseline = None
+    for name, build in variants.items():
+        best = float("inf")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            treatments = build(args.patients)
+            best = min(best, time.perf_counter() - start)
+            # the pool would otherwise grow by a block of ids every round
+            UniqueIDGenerator.reset()
+        baseline = baseline or best
+        print(f"{name:>14}: {best * 1000:7.1f} ms per {args.patients} patients ({baseline / best:4.1f}x) - {summary(treatments)}")
+
+    # the draws alone, without materializing Treatment objects
+    for use_numpy in (False, True) if treatment_batch.numpy is not None else (False,):
+        best = min(timed(lambda: draw(args.patients, use_numpy)) for _ in range(args.rounds))
+        print(f"{'draws, numpy' if use_numpy else 'draws, python':>14}: {best * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
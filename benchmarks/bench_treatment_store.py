@@ -0,0 +1,118 @@
+"""
+fills a TreatmentStore with a long history of treatments and discharges and
+compares its indexed aggregate queries with scanning the equivalent in-memory
+dicts the way it had to be done before.
+
+    python -m benchmarks.bench_treatment_store --treatments 200000
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from src.models.discharge import Discharge
+from src.models.enums import DischargeStatus, Expertise, TreatmentType
+from src.models.treatment import Treatment
+from src.models.treatment_store import TreatmentStore
+
+
+EXPERTISE = {
+    TreatmentType.FRACTURE_TREATMENT: Expertise.ORTHOPEDICS,
+    TreatmentType.WOUND_CARE: Expertise.TRAUMATOLOGY,
+    TreatmentType.PHYSIOTHERAPY: Expertise.PHYSICAL_THERAPY,
+    TreatmentType.BURN_TREATMENT: Expertise.PLASTIC_SURGERY,
+    TreatmentType.DISLOCATION_TREATMENT: Expertise.ORTHOPEDICS,
+}
+
+
+def build_history(count: int) -> tuple[dict[int, Treatment], dict[int, Discharge]]:
+    treatments, discharges = {}, {}
+    now = datetime.now()
+    for index in range(count):
+        start = now - timedelta(seconds=index)
+        treatment_type = random.choice(list(TreatmentType))
+        is_dead = random.random() < 0.2
+        treatment = Treatment.restore(index, index % 10, treatment_type, start, start + timedelta(seconds=random.randint(1, 8)), is_dead)
+        discharge = Discharge(treatment.id, DischargeStatus.DEAD if is_dead else DischargeStatus.HEALTHY)
+        discharge.discharge_date = treatment.end_date
+        treatments[treatment.id] = treatment
+        discharges[discharge.id] = discharge
+    return treatments, discharges
+
+
+def scan_deaths(treatments, discharges, expertise: Expertise, since: datetime) -> int:
+    return sum(
+        1 for discharge in discharges.values()
+        if discharge.discharge_status == DischargeStatus.DEAD
+        and discharge.discharge_date >= since
+        and EXPERTISE[treatments[discharge.treatment_id].treatment_type] == expertise
+    )
+
+
+def scan_average_duration(treatments, since: datetime | None = None) -> dict[TreatmentType, float]:
+    totals: dict[TreatmentType, list[float]] = {}
+    for treatment in treatments.values():
+        if since is not None and treatment.start_date < since:
+            continue
+        total = totals.setdefault(treatment.treatment_type, [0.0, 0])
+        total[0] += treatment.duration
+        total[1] += 1
+    return {treatment_type: total / count for treatment_type, (total, count) in totals.items()}
+
+
+def timed(func, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--treatments", type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    treatments, discharges = build_history(args.treatments)
+    with tempfile.TemporaryDirectory() as directory:
+        store = TreatmentStore(os.path.join(directory, "history.sqlite"))
+        start = time.perf_counter()
+        for discharge in discharges.values():
+            treatment = treatments[discharge.treatment_id]
+            store.add_treatment("bench", treatment, EXPERTISE[treatment.treatment_type])
+            store.add_discharge("bench", discharge, treatment, EXPERTISE[treatment.treatment_type])
+        queued = time.perf_counter() - start
+        store.flush()
+        written = time.perf_counter() - start
+        print(f"{2 * args.treatments} rows queued in {queued:.2f} s, committed after {written:.2f} s ({2 * args.treatments / written:,.0f} rows/s)")
+
+        since = datetime.now() - timedelta(hours=1)
+        deaths = scan_deaths(treatments, discharges, Expertise.PLASTIC_SURGERY, since)
+        assert deaths == store.count_discharges("bench", DischargeStatus.DEAD, Expertise.PLASTIC_SURGERY, since)
+        for name, scan, query in (
+            (
+                "deaths under plastic surgery this hour",
+                lambda: scan_deaths(treatments, discharges, Expertise.PLASTIC_SURGERY, since),
+                lambda: store.count_discharges("bench", DischargeStatus.DEAD, Expertise.PLASTIC_SURGERY, since),
+            ),
+            (
+                "average duration per treatment type",
+                lambda: scan_average_duration(treatments),
+                lambda: store.average_duration_by_type("bench"),
+            ),
+            (
+                "average duration per type this hour",
+                lambda: scan_average_duration(treatments, since),
+                lambda: store.average_duration_by_type("bench", since),
+            ),
+        ):
+            print(f"{name:>40}: dict scan {timed(scan):8.2f} ms - sqlite {timed(query):8.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,5 +6,123 @@ SNAPSHOT_CLOCK_INTERVAL = 5
 ADMIT_PATIENT_CLOCK_INTERVAL = 4 
 
 #should be a fload between 0 to 1
+#only used with ADMISSION_PLANNER off
 ACCEPTENCE_RATE = 0.5
-DEATH_RATE = 0.2
\ No newline at end of file
+DEATH_RATE = 0.2
+
+# seconds before a world model call is abandoned
+HTTP_TIMEOUT = 5
+# keep-alive connections shared by all world model calls
+HTTP_POOL_SIZE = 20
+# upper bound on how long the async discharge loop sleeps between checks
+DISCHARGE_POLL_INTERVAL = 1
+
+# discharges due within this many seconds are sent to the world model together
+DISCHARGE_BATCH_WINDOW = 0.5
+DISCHARGE_BATCH_MAX_SIZE = 100
+# how many times a discharge is sent before giving up on it
+DISCHARGE_MAX_TRY = 3
+# seconds before a failed discharge is sent again, doubled with every further try
+DISCHARGE_RETRY_BACKOFF = 1
+
+# threads sending admit requests and discharge batches in the thread runtime
+ADMIT_WORKERS = 1
+DISCHARGE_WORKERS = 1
+
+# snapshots kept in full, by count and optionally by age in seconds (None keeps no time window)
+SNAPSHOT_RETENTION_COUNT = 10
+SNAPSHOT_RETENTION_SECONDS = None
+# older snapshots are kept as person id diffs, up to this many
+SNAPSHOT_COMPACT_RETENTION_COUNT = 1_000
+
+# seconds to wait for running treatments to finish and be reported on shutdown
+SHUTDOWN_DRAIN_TIMEOUT = 10
+
+# patients a single doctor treats at the same time
+MAX_PATIENTS_PER_DOCTOR = 3
+
+# connections shared by all hospitals in fleet mode
+FLEET_HTTP_POOL_SIZE = 100
+# seconds between metrics reports from sharded fleet workers
+SHARD_METRICS_INTERVAL = 5
+
+# directory for the log files and their format, "text" or "json" (one object per line)
+LOG_DIR = "LOGS"
+LOG_FORMAT = "text"
+# per-entity log messages (one per treatment, discharge, ...) let through per second and kind
+LOG_SAMPLE_MAX_PER_SECOND = 20
+
+# local endpoint serving the metrics in prometheus text format (GET /metrics)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+# file the metrics are rewritten to every METRICS_DUMP_INTERVAL seconds (None keeps no file)
+METRICS_DUMP_PATH = None
+METRICS_DUMP_INTERVAL = 15
+# the same endpoint serves hospital status as json (GET /status, /status/<hospital>), its
+# rolling occupancy is a time weighted mean over about this many seconds
+STATUS_OCCUPANCY_WINDOW = 300
+
+# directory for the per hospital write-ahead journals (None runs without a journal)
+JOURNAL_DIR = None
+# journaled events are fsynced together at most this many seconds after they happen,
+# or as soon as this many bytes are waiting
+JOURNAL_FSYNC_INTERVAL = 0.05
+JOURNAL_BATCH_BYTES = 64 * 1024
+# events after which the journal is folded into a fresh checkpoint
+JOURNAL_CHECKPOINT_EVENTS = 100_000
+
+# profiling (main.py --profile DIR or SIGUSR1, see src/utils/profiler.py): directory of the
+# collapsed stacks and the report, seconds between stack samples and between rewrites
+PROFILE_DIR = "profiles"
+PROFILE_SAMPLE_INTERVAL = 0.05
+PROFILE_WRITE_INTERVAL = 60
+# share of one cpu the sampler may use, samples are spaced out further when they cost more
+PROFILE_MAX_OVERHEAD = 0.01
+# frames kept per stack, innermost first
+PROFILE_MAX_DEPTH = 64
+# tracemalloc runs for PROFILE_ALLOC_WINDOW seconds every PROFILE_ALLOC_EVERY seconds (0 disables it)
+PROFILE_ALLOC_WINDOW = 1
+PROFILE_ALLOC_EVERY = 300
+PROFILE_ALLOC_FRAMES = 1
+# lines per section of the report
+PROFILE_TOP = 25
+
+# sqlite file for the treatment and discharge history (None keeps no history)
+STORE_PATH = None
+# history rows are committed together at most this many seconds after they happen
+STORE_FLUSH_INTERVAL = 1.0
+STORE_BATCH_SIZE = 1_000
+
+# json decoder for world model responses: "orjson", "ujson", "json" or None for the fastest installed
+JSON_BACKEND = None
+# snapshot bodies are read and decoded in chunks of this many bytes
+SNAPSHOT_STREAM_CHUNK = 64 * 1024
+
+# snapshot and admit intervals follow the world instead of staying fixed (see src/utils/adaptive_polling.py)
+ADAPTIVE_POLLING = True
+# intervals are multiplied by this while the last snapshot reported an earthquake
+POLL_SURGE_FACTOR = 0.25
+# snapshot intervals double per snapshot without news, up to this factor
+POLL_IDLE_BACKOFF_MAX = 4
+# accept requests in a row that got nobody accepted before admit ticks are skipped, a world
+# that rejects at random still admits on a retry
+POLL_EMPTY_ANSWERS_BEFORE_BACKOFF = 3
+# world model calls slower than this (seconds, smoothed) stretch both intervals proportionally,
+# up to POLL_LATENCY_BACKOFF_MAX times
+POLL_LATENCY_TARGET = 0.5
+POLL_LATENCY_BACKOFF_MAX = 8
+# weight of the newest latency sample in the smoothed latency
+POLL_LATENCY_SMOOTHING = 0.2
+
+# plan treatments and doctors before /accept-person instead of accepting at ACCEPTENCE_RATE
+# (see src/models/admission_planner.py)
+ADMISSION_PLANNER = True
+# patients a plan may queue for busy doctors, per doctor able to treat them
+PLANNER_QUEUE_PER_DOCTOR = 3
+
+# admissions of at least this many patients draw their treatments as numpy arrays (when numpy is installed)
+TREATMENT_BATCH_NUMPY_MIN = 32
+
+# simulation mode (--simulate): seed of the random streams and persons the fake world keeps waiting
+SIMULATION_SEED = 0
+SIMULATION_POPULATION = 100
@@ -0,0 +1,10 @@
+"""
+local stand-in for the world model api, used to benchmark the hospital agent
+without a real world model.
+"""
+
+from src.fake_worldmodel.world import FakeWorldModel
+from src.fake_worldmodel.server import FakeWorldModelServer
+from src.fake_worldmodel.client import InProcessClient
+
+__all__ = ["FakeWorldModel", "FakeWorldModelServer", "InProcessClient"]
@@ -0,0 +1,44 @@
+from time import perf_counter
+
+from src.fake_worldmodel.world import FakeWorldModel
+from src.utils import http_client
+
+
+class InProcessClient:
+    """
+    answers like WorldModelClient straight from a FakeWorldModel, without
+    sockets or threads, and records the same request metrics.
+    """
+
+    def __init__(self, world: FakeWorldModel) -> None:
+        self.world = world
+        self.routes = {
+            "/register": world.register,
+            "/accept-person": world.accept_person,
+            "/service-done": world.service_done,
+            "/person-death": world.person_death,
+        }
+
+    def get(self, path: str, timeout: float | None = None):
+        start = perf_counter()
+        status, body = self.world.snapshot(int(path.rsplit("/", 1)[1]))
+        http_client._record(path, start, status)
+        return status, body
+
+    def stream(self, path: str, reader, timeout: float | None = None):
+        start = perf_counter()
+        status, body = self.world.snapshot(int(path.rsplit("/", 1)[1]))
+        if status == 200:
+            reader.feed_document(body)
+            body = None
+        http_client._record(path, start, status)
+        return status, body
+
+    def post(self, path: str, payload: dict, timeout: float | None = None):
+        start = perf_counter()
+        status, body = self.routes[path](payload)
+        http_client._record(path, start, status)
+        return status, body
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,141 @@
+"""
+serves a FakeWorldModel over http with the same routes as the real world model.
+
+    python -m src.fake_worldmodel.server --port 8000 --population 500 --latency 0.02
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.fake_worldmodel.world import FakeWorldModel
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self) -> None:
+        latency = self.server.latency
+        if latency:
+            time.sleep(latency * (0.5 + random.random()))
+
+    def do_GET(self) -> None:
+        self._delay()
+        world = self.server.world
+        prefix = self.server.prefix
+        if self.path.startswith(prefix + "/snapshot/"):
+            try:
+                entity_id = int(self.path.rsplit("/", 1)[1])
+            except ValueError:
+                return self._reply(400, {"message": "invalid entity id"})
+            return self._reply(*world.snapshot(entity_id))
+        if self.path == prefix + "/stats":
+            return self._reply(200, world.stats())
+        self._reply(404, {"message": "not found"})
+
+    def do_POST(self) -> None:
+        self._delay()
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        routes = {
+            "/register": self.server.world.register,
+            "/accept-person": self.server.world.accept_person,
+            "/service-done": self.server.world.service_done,
+            "/person-death": self.server.world.person_death,
+        }
+        route = routes.get(self.path.removeprefix(self.server.prefix))
+        if route is None:
+            return self._reply(404, {"message": "not found"})
+        self._reply(*route(payload))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, world: FakeWorldModel, latency: float, prefix: str) -> None:
+        super().__init__(address, _Handler)
+        self.world = world
+        self.latency = latency
+        self.prefix = prefix
+
+    def handle_error(self, request, client_address) -> None:
+        # clients dropping keep-alive connections on shutdown are expected
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FakeWorldModelServer:
+    def __init__(
+        self,
+        world: FakeWorldModel | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        prefix: str = "/api",
+    ) -> None:
+        self.world = world or FakeWorldModel()
+        self._server = _Server((host, port), self.world, latency, prefix)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self._server.prefix}"
+
+    def start(self) -> "FakeWorldModelServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-worldmodel")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--population", type=int, default=100)
+    parser.add_argument("--time-rate", type=float, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds added to every call")
+    parser.add_argument("--reject-rate", type=float, default=0.0)
+    parser.add_argument("--earthquake-rate", type=float, default=0.0)
+    parser.add_argument("--earthquake-duration", type=float, default=0.0, help="seconds an earthquake lasts")
+    parser.add_argument("--earthquake-population", type=int, help="persons waiting during an earthquake")
+    parser.add_argument(
+        "--earthquake-interval", type=float, default=5.0, help="seconds between draws of --earthquake-rate",
+    )
+    args = parser.parse_args()
+
+    world = FakeWorldModel(
+        args.population, args.time_rate, args.reject_rate, args.earthquake_rate,
+        earthquake_duration=args.earthquake_duration, earthquake_population=args.earthquake_population,
+        earthquake_interval=args.earthquake_interval,
+    )
+    server = FakeWorldModelServer(world, args.host, args.port, args.latency)
+    print(f"fake world model listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,183 @@
+import itertools
+import random
+import threading
+from collections import Counter
+
+from src.utils import clock
+
+
+class FakeWorldModel:
+    """
+    in-memory world model state. keeps `population` injured persons waiting for
+    a hospital, spawning new ones as others get accepted, and answers the same
+    payloads as the real api.
+
+    every `earthquake_interval` seconds (by src.utils.clock) an earthquake
+    starts with probability `earthquake_rate`. it is reported for
+    `earthquake_duration` seconds (only by the next snapshot when 0) and
+    meanwhile `earthquake_population` persons are kept waiting. earthquakes
+    are drawn on the world's own timeline from their own generator, how often
+    hospitals poll does not change when they hit.
+    """
+
+    def __init__(
+        self,
+        population: int = 100,
+        time_rate: float = 1,
+        reject_rate: float = 0.0,
+        earthquake_rate: float = 0.0,
+        seed: int | None = None,
+        earthquake_duration: float = 0.0,
+        earthquake_population: int | None = None,
+        earthquake_interval: float = 5.0,
+    ) -> None:
+        self.population = population
+        self.time_rate = time_rate
+        self.reject_rate = reject_rate
+        self.earthquake_rate = earthquake_rate
+        self.earthquake_duration = earthquake_duration
+        self.earthquake_population = earthquake_population or population
+        self.earthquake_interval = earthquake_interval
+        self.earthquake_until: float | None = None
+        self.start_date = clock.now()
+        self._random = random.Random(seed)
+        self._earthquake_random = random.Random(None if seed is None else f"{seed}:earthquakes")
+        self._next_earthquake_draw = clock.time() + earthquake_interval
+        self._lock = threading.Lock()
+
+        self._entity_ids = itertools.count(1)
+        self._person_ids = itertools.count(1)
+        self._snapshot_ids = itertools.count(1)
+        self.entities: dict[int, dict] = dict()
+        # person_id -> record, for persons no hospital has accepted yet
+        self.waiting: dict[int, dict] = dict()
+        # person_id -> entity_id
+        self.hospitalized: dict[int, int] = dict()
+        self.accepted_at: dict[int, float] = dict()
+        self.spawned_at: dict[int, float] = dict()
+        # person_id -> (first snapshot that listed the person, during an earthquake)
+        self.first_seen: dict[int, tuple[float, bool]] = dict()
+        # seconds persons waited from spawning until a hospital accepted them
+        self.admission_wait = 0.0
+        self.admissions = 0
+        # seconds from first sighting to acceptance per accepted person, split by
+        # whether the person was first seen during an earthquake
+        self.sighting_waits: dict[bool, list[float]] = {False: [], True: []}
+        self.healthy = 0
+        self.dead = 0
+        self.calls: Counter[str] = Counter()
+        self._spawn()
+
+    def _spawn(self, population: int | None = None) -> None:
+        now = clock.time()
+        while len(self.waiting) < (population or self.population):
+            person_id = next(self._person_ids)
+            self.spawned_at[person_id] = now
+            self.waiting[person_id] = {
+                "id": person_id,
+                "name": f"person {person_id}",
+                "gender": self._random.choice(("male", "female")),
+                "birth_date": f"{self._random.randint(1940, 2015)}-01-01",
+                "national_code": str(1_000_000_000 + person_id),
+                "status": "injured",
+            }
+
+    # ==api===================================================================
+    def register(self, payload: dict) -> tuple[int, dict]:
+        with self._lock:
+            self.calls["register"] += 1
+            entity_id = next(self._entity_ids)
+            self.entities[entity_id] = payload
+            return 200, {
+                "entity_id": entity_id,
+                "time_rate": self.time_rate,
+                "start_date": self.start_date.strftime("%Y-%m-%d"),
+            }
+
+    def snapshot(self, entity_id: int) -> tuple[int, dict]:
+        with self._lock:
+            self.calls["snapshot"] += 1
+            if entity_id not in self.entities:
+                return 404, {"message": f"entity {entity_id} is not registered"}
+            earthquake = self._earthquake()
+            self._spawn(self.earthquake_population if earthquake else self.population)
+            now = clock.time()
+            for person_id in self.waiting.keys() - self.first_seen.keys():
+                self.first_seen[person_id] = (now, earthquake)
+            return 200, {
+                "id": next(self._snapshot_ids),
+                "earthquake_status": earthquake,
+                "persons": list(self.waiting.values()),
+            }
+
+    def _earthquake(self) -> bool:
+        now = clock.time()
+        started = False
+        if self.earthquake_rate > 0:
+            # one draw per interval that passed since the last snapshot
+            while self._next_earthquake_draw <= now:
+                if self._earthquake_random.random() < self.earthquake_rate:
+                    until = self._next_earthquake_draw + self.earthquake_duration
+                    self.earthquake_until = max(self.earthquake_until or until, until)
+                    started = True
+                self._next_earthquake_draw += self.earthquake_interval
+        if self.earthquake_until is not None and now >= self.earthquake_until:
+            self.earthquake_until = None
+        # an earthquake that ended between two snapshots is still reported once
+        return started or self.earthquake_until is not None
+
+    def accept_person(self, payload: dict) -> tuple[int, dict]:
+        with self._lock:
+            self.calls["accept-person"] += 1
+            entity_id = payload["entity_id"]
+            accepted, rejected = [], []
+            for person_id in payload["persons_id"]:
+                if person_id in self.waiting and self._random.random() >= self.reject_rate:
+                    del self.waiting[person_id]
+                    self.hospitalized[person_id] = entity_id
+                    self.accepted_at[person_id] = now = clock.time()
+                    self.admission_wait += now - self.spawned_at.pop(person_id, now)
+                    seen_at, surge = self.first_seen.pop(person_id, (now, False))
+                    self.sighting_waits[surge].append(now - seen_at)
+                    self.admissions += 1
+                    accepted.append(person_id)
+                else:
+                    rejected.append(person_id)
+            return 200, {"accepted": accepted, "rejected": rejected}
+
+    def service_done(self, payload: dict) -> tuple[int, dict]:
+        return self._release("service-done", payload)
+
+    def person_death(self, payload: dict) -> tuple[int, dict]:
+        return self._release("person-death", payload)
+
+    def _release(self, endpoint: str, payload: dict) -> tuple[int, dict]:
+        with self._lock:
+            self.calls[endpoint] += 1
+            entity_id = payload["entity_id"]
+            accepted = []
+            for person_id in payload["persons_id"]:
+                if self.hospitalized.get(person_id) == entity_id:
+                    del self.hospitalized[person_id]
+                    self.accepted_at.pop(person_id, None)
+                    accepted.append(person_id)
+            if endpoint == "service-done":
+                self.healthy += len(accepted)
+            else:
+                self.dead += len(accepted)
+            return 200, {"accepted": accepted}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "waiting": len(self.waiting),
+                "hospitalized": len(self.hospitalized),
+                "healthy": self.healthy,
+                "dead": self.dead,
+                "mean_admission_wait": self.admission_wait / self.admissions if self.admissions else 0.0,
+                "mean_wait_since_sighting": {
+                    "earthquake" if surge else "calm": sum(waits) / len(waits) if waits else 0.0
+                    for surge, waits in self.sighting_waits.items()
+                },
+            }
@@ -1,48 +1,122 @@
 from src.models.hospital import Hospital
-import threading
-import time
+from src.models.hospital_journal import HospitalJournal
+from src.models.treatment_store import TreatmentStore
+import argparse
+import asyncio
+import json
+import logging
+import os
+from src.runtime import async_runtime
+from src.runtime.fleet import Fleet
+from src.runtime.sharding import ShardedFleet
+from src.runtime.simulation import Simulation
+from src.runtime.supervisor import Supervisor
 from src.utils.logger import get_logger
+from src.utils.metrics import MetricsDumper, MetricsServer
+from src.utils.profiler import Profiler
 import src.config as config
 
 
 logger = get_logger(__name__)
 
 
-
-def take_snapshot(hospital: Hospital):
-    while True:
-        hospital.take_snapshot()
-        time.sleep(config.SNAPSHOT_CLOCK_INTERVAL / hospital.time_rate)
-
-def admit_patient(hospital: Hospital):
-    while True:
-        hospital.admit_patient()
-        time.sleep(config.ADMIT_PATIENT_CLOCK_INTERVAL / hospital.time_rate)
-
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true",
+        help="run snapshot, admit and discharge loops on an asyncio event loop",
+    )
+    parser.add_argument(
+        "--fleet", metavar="PATH",
+        help="run every hospital defined in a fleet json file on one shared async runtime",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="with --fleet, spread the hospitals over this many worker processes",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=config.METRICS_PORT,
+        help="serve metrics under /metrics and hospital status under /status on this local port, 0 disables the endpoint",
+    )
+    parser.add_argument(
+        "--metrics-dump", metavar="PATH", default=config.METRICS_DUMP_PATH,
+        help="rewrite this file with the current metrics every METRICS_DUMP_INTERVAL seconds",
+    )
+    parser.add_argument(
+        "--journal-dir", metavar="PATH", default=config.JOURNAL_DIR,
+        help="journal hospital state to this directory and recover it from there on start",
+    )
+    parser.add_argument(
+        "--store", metavar="PATH", default=config.STORE_PATH,
+        help="keep the treatment and discharge history in this sqlite file",
+    )
+    parser.add_argument(
+        "--simulate", type=float, metavar="SECONDS",
+        help="simulate this many seconds against an in-process world model on a virtual clock and print a report",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=config.SIMULATION_SEED,
+        help="with --simulate, seed of every random stream, equal seeds replay the same run",
+    )
+    parser.add_argument(
+        "--profile", metavar="DIR", nargs="?", const=config.PROFILE_DIR,
+        help="sample thread stacks and allocations into this directory (PROFILE_DIR without one)"
+        " from the start, SIGUSR1 toggles profiling at any time",
+    )
+    args = parser.parse_args()
+
     logger.info("application started")
-    hospital = Hospital("hospital", 15, config.WORLDMODEL_BASE_URL)
 
+    exporters = []
+    store = None
+    profiler = Profiler(args.profile or config.PROFILE_DIR)
+    profiler.install_signal()
     try:
-        hospital.register()
-        
-        snapshot_thread = threading.Thread(
-            target=take_snapshot, args=(hospital,)
-        )
-        snapshot_thread.daemon = True
-        snapshot_thread.start()
-        
-        admit_thread = threading.Thread(
-            target=admit_patient, args=(hospital,)
-        )
-        admit_thread.daemon = True
-        admit_thread.start()
-        
-        while True:
-            pass
+        if args.profile:
+            profiler.start()
+        if args.metrics_port:
+            try:
+                exporters.append(MetricsServer(port=args.metrics_port))
+            except OSError as error:
+                # the agent still runs without its metrics endpoint
+                logger.error(f"could not serve metrics on port {args.metrics_port} - {error}")
+        if args.metrics_dump:
+            exporters.append(MetricsDumper(args.metrics_dump))
+        for exporter in exporters:
+            exporter.start()
+
+        if args.simulate is not None:
+            # a simulated week would log millions of per-tick lines
+            logging.disable(logging.INFO)
+            if args.fleet:
+                with open(args.fleet) as file:
+                    fleet = json.load(file)
+                simulation = Simulation(fleet["hospitals"], args.seed, share_snapshots=fleet.get("share_snapshots", False))
+            else:
+                simulation = Simulation.single(15, seed=args.seed)
+            print(json.dumps(simulation.run(args.simulate), indent=2))
+        elif args.fleet and args.workers > 1:
+            ShardedFleet.from_file(
+                args.fleet, args.workers, journal_dir=args.journal_dir, store_path=args.store
+            ).run()
+        elif args.fleet:
+            asyncio.run(Fleet.from_file(args.fleet, journal_dir=args.journal_dir, store_path=args.store).run())
+        else:
+            journal = HospitalJournal(os.path.join(args.journal_dir, "hospital.journal")) if args.journal_dir else None
+            store = TreatmentStore(args.store) if args.store else None
+            hospital = Hospital("hospital", 15, config.WORLDMODEL_BASE_URL, journal=journal, store=store)
+            if args.use_async:
+                asyncio.run(async_runtime.run(hospital))
+            else:
+                Supervisor(hospital).run()
 
     except KeyboardInterrupt:
         print(f"In {__name__}: Program interrupted by user. Shutting down...")
     except Exception as error:
         print(f"In {__name__}:\n" + f"Unexpected error: {error}")
+    finally:
+        profiler.stop()
+        if store is not None:
+            store.close()
+        for exporter in exporters:
+            exporter.stop()
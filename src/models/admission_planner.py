@@ -0,0 +1,177 @@
+"""
+plans an admission before /accept-person is sent. every candidate's treatment
+is drawn once, the first time the planner sees the person, and kept for as
+long as the person stays a candidate, a plan never draws again for someone it
+passed over. the treatment type is drawn from the person id, hospitals sharing
+a world agree on who needs which expertise. plans only choose among these
+fixed treatments:
+
+- doctors with a free slot first, a patient of their expertise (or any patient
+  for an emergency medicine doctor) goes to a bed
+- with beds left over, patients whose doctors are busy are planned into the
+  waiting queues, up to PLANNER_QUEUE_PER_DOCTOR per doctor that could take them
+- a candidate no doctor of this hospital can ever treat is never requested
+
+beds and emergency medicine slots are handed out one patient per expertise and
+round, the expertise that goes first rotates from one plan to the next, so no
+specialty waits while its doctors are free. within an expertise candidates go
+in the order they arrived.
+
+the drawn treatments travel with the plan, an accepted person is treated the
+way it was planned. doctors are only really assigned once the world model
+answers, a planned doctor that got busy in between means a wait in the queue.
+"""
+
+from collections import deque
+import threading
+
+from src.models.doctor_pool import DoctorPool
+from src.models.enums import Expertise, TreatmentType
+from src.models.person import Person
+from src.models.treatment_batch import TREATMENT_TYPES, TreatmentBatch, keyed_treatment_type
+from src.utils import clock
+import src.config as config
+
+
+class AdmissionPlan:
+    __slots__ = ("batch", "rows")
+
+    def __init__(self, batch: TreatmentBatch | None, rows: dict[int, int]) -> None:
+        self.batch = batch
+        # person_id -> row of the person's treatment in `batch`, in planned order
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def keep(self, persons_id) -> None:
+        # drops the persons that could not be reserved
+        self.rows = {person_id: row for person_id, row in self.rows.items() if person_id in persons_id}
+
+
+class AdmissionPlanner:
+    def __init__(
+        self,
+        doctor_pool: DoctorPool,
+        expertise_of: dict[TreatmentType, Expertise],
+        enabled: bool = config.ADMISSION_PLANNER,
+        queue_per_doctor: int = config.PLANNER_QUEUE_PER_DOCTOR,
+    ) -> None:
+        self.doctor_pool = doctor_pool
+        # expertise per index into TREATMENT_TYPES
+        self._expertise = [expertise_of[treatment_type] for treatment_type in TREATMENT_TYPES]
+        self.enabled = enabled
+        self.queue_per_doctor = queue_per_doctor
+        # person_id -> (type index, duration, dead, death offset), drawn once per candidate
+        self._draws: dict[int, tuple[int, int, bool, int]] = {}
+        self._draws_time_rate: float | None = None
+        self._turn = 0
+        # admit workers share one planner, plans are made one at a time
+        self._lock = threading.Lock()
+
+    def _fixed_draws(self, persons: list[Person], time_rate: float) -> dict[int, tuple[int, int, bool, int]]:
+        # the draws of `persons`, drawing for the ones seen for the first time
+        if time_rate != self._draws_time_rate:
+            # durations depend on the time rate, known once the hospital is registered
+            self._draws.clear()
+            self._draws_time_rate = time_rate
+        draws = self._draws
+        new = [person.id for person in persons if person.id not in draws]
+        if new:
+            # the treatment type is the person's injury, every hospital draws the same one
+            types = [keyed_treatment_type(person_id) for person_id in new]
+            batch = TreatmentBatch.draw(len(new), time_rate, types=types)
+            for row, person_id in enumerate(new):
+                draws[person_id] = (batch.types[row], batch.durations[row], batch.is_dead[row], batch.death_offsets[row])
+        return draws
+
+    def _forget_gone(self, persons: list[Person]) -> None:
+        # persons that were admitted or left the snapshots, `persons` is every candidate
+        if len(self._draws) > 2 * len(persons) + 64:
+            alive = {person.id for person in persons}
+            self._draws = {person_id: draw for person_id, draw in self._draws.items() if person_id in alive}
+
+    def _candidates(
+        self, persons: list[Person], free_beds: int, treatable: set[Expertise], time_rate: float
+    ) -> dict[Expertise, deque[int]]:
+        # indexes into `persons` per treatable expertise, at most `free_beds` each. draws are
+        # only made for a prefix of the candidates, grown until every expertise has enough
+        candidates: dict[Expertise, deque[int]] = {
+            expertise: deque() for expertise in dict.fromkeys(self._expertise) if expertise in treatable
+        }
+        scanned, window = 0, free_beds * len(TREATMENT_TYPES) * 2
+        while scanned < len(persons) and any(len(queue) < free_beds for queue in candidates.values()):
+            chunk = persons[scanned:scanned + window]
+            draws = self._fixed_draws(chunk, time_rate)
+            for index, person in enumerate(chunk, scanned):
+                queue = candidates.get(self._expertise[draws[person.id][0]])
+                if queue is not None and len(queue) < free_beds:
+                    queue.append(index)
+            scanned += len(chunk)
+            window *= 2
+        return candidates
+
+    def plan(self, persons: list[Person], free_beds: int, waiting: dict[Expertise, int], time_rate: float) -> AdmissionPlan:
+        # `persons` are all the candidates, in the order they arrived
+        with self._lock:
+            return self._plan(persons, free_beds, waiting, time_rate)
+
+    def _plan(self, persons: list[Person], free_beds: int, waiting: dict[Expertise, int], time_rate: float) -> AdmissionPlan:
+        self._forget_gone(persons)
+        if free_beds <= 0 or not persons:
+            return AdmissionPlan(None, {})
+
+        fallback = DoctorPool.FALLBACK_EXPERTISE
+        slots, doctors = self.doctor_pool.capacity()
+        treatable = set(self._expertise) if doctors.get(fallback) else set(doctors)
+        candidates = self._candidates(persons, free_beds, treatable, time_rate)
+        order = [expertise for expertise, queue in candidates.items() if queue]
+        if not order:
+            return AdmissionPlan(None, {})
+        self._turn = (self._turn + 1) % len(order)
+        order = order[self._turn:] + order[:self._turn]
+
+        # queued patients get the next free slots of their expertise, then of the fallback
+        for expertise, count in waiting.items():
+            taken = min(count, slots.get(expertise, 0))
+            if expertise in slots:
+                slots[expertise] -= taken
+            if count > taken and fallback in slots:
+                slots[fallback] = max(slots[fallback] - (count - taken), 0)
+
+        def take_slot(expertise: Expertise) -> bool:
+            if slots.get(expertise, 0) > 0:
+                slots[expertise] -= 1
+            elif slots.get(fallback, 0) > 0:
+                slots[fallback] -= 1
+            else:
+                return False
+            return True
+
+        queue_room = {
+            expertise: (doctors.get(expertise, 0) + doctors.get(fallback, 0)) * self.queue_per_doctor - waiting.get(expertise, 0)
+            for expertise in order
+        }
+
+        def take_queue_place(expertise: Expertise) -> bool:
+            if queue_room[expertise] <= 0:
+                return False
+            queue_room[expertise] -= 1
+            return True
+
+        picked: list[int] = []
+        for take in (take_slot, take_queue_place):
+            progress = True
+            while progress and len(picked) < free_beds:
+                progress = False
+                for expertise in order:
+                    queue = candidates[expertise]
+                    if queue and len(picked) < free_beds and take(expertise):
+                        picked.append(queue.popleft())
+                        progress = True
+
+        if not picked:
+            return AdmissionPlan(None, {})
+        columns = tuple(list(column) for column in zip(*(self._draws[persons[index].id] for index in picked)))
+        batch = TreatmentBatch(*columns, clock.now())
+        return AdmissionPlan(batch, {persons[index].id: row for row, index in enumerate(picked)})
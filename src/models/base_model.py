@@ -1,10 +1,13 @@
 from datetime import datetime
 
+from src.utils import clock
 from src.utils.random_id_generator import UniqueIDGenerator
 
 
 class BaseEntity:
-    def __init__(self) -> None:
+    __slots__ = ("id", "creation_date", "modified_date")
+
+    def __init__(self, creation_date: datetime | None = None) -> None:
         self.id = UniqueIDGenerator.generate_id()
-        self.creation_date = datetime.now()
+        self.creation_date = creation_date or clock.now()
         self.modified_date = self.creation_date
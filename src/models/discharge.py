@@ -3,6 +3,8 @@ from src.models.enums import DischargeStatus
 
 
 class Discharge(BaseEntity):
+    __slots__ = ("treatment_id", "discharge_status", "discharge_date")
+
     def __init__(self, treatment_id: int, discharge_status: DischargeStatus) -> None:
         super().__init__()
         self.treatment_id = treatment_id
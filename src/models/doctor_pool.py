@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+
+from src.models.enums import Expertise
+from src.models.person import Doctor
+import src.config as config
+
+
+class DoctorPool:
+    """
+    doctors indexed by expertise, each expertise keeps a min-heap on the number of
+    patients a doctor is treating so assignment picks the least loaded one.
+    emergency medicine doctors are the fallback for every expertise.
+    heap entries are never updated in place, an entry whose load differs from
+    the doctor's current load is stale and skipped.
+    """
+
+    FALLBACK_EXPERTISE = Expertise.EMERGENCY_MEDICINE
+
+    def __init__(self, doctors: list[Doctor], max_patients_per_doctor: int = config.MAX_PATIENTS_PER_DOCTOR) -> None:
+        self.max_patients_per_doctor = max_patients_per_doctor
+        self.doctors: dict[int, Doctor] = {doctor.id: doctor for doctor in doctors}
+        self.loads: dict[int, int] = {doctor.id: 0 for doctor in doctors}
+        self._counter = itertools.count()
+        self._heaps: dict[Expertise, list[tuple[int, int, int]]] = {}
+        for doctor in doctors:
+            heapq.heappush(self._heaps.setdefault(doctor.expertise, []), (0, next(self._counter), doctor.id))
+        self._lock = threading.Lock()
+
+    def has_expertise(self, expertise: Expertise) -> bool:
+        return expertise in self._heaps or self.FALLBACK_EXPERTISE in self._heaps
+
+    def acquire(self, expertise: Expertise) -> Doctor | None:
+        with self._lock:
+            doctor_id = self._acquire_locked(expertise)
+            if doctor_id is None and expertise != self.FALLBACK_EXPERTISE:
+                doctor_id = self._acquire_locked(self.FALLBACK_EXPERTISE)
+            return self.doctors[doctor_id] if doctor_id is not None else None
+
+    def occupy(self, doctor_id: int) -> None:
+        # gives a specific doctor one more patient, used when restoring running treatments
+        with self._lock:
+            self.loads[doctor_id] += 1
+            self._push_locked(self.doctors[doctor_id])
+
+    def release(self, doctor_id: int) -> Expertise | None:
+        with self._lock:
+            doctor = self.doctors.get(doctor_id)
+            if doctor is None or self.loads[doctor_id] == 0:
+                return None
+            self.loads[doctor_id] -= 1
+            self._push_locked(doctor)
+            return doctor.expertise
+
+    def free_slots(self, expertise: Expertise) -> int:
+        with self._lock:
+            return sum(
+                self.max_patients_per_doctor - self.loads[doctor_id]
+                for doctor_id, doctor in self.doctors.items()
+                if doctor.expertise in (expertise, self.FALLBACK_EXPERTISE)
+            )
+
+    def capacity(self) -> tuple[dict[Expertise, int], dict[Expertise, int]]:
+        # free slots and doctors per expertise, taken together
+        with self._lock:
+            slots: dict[Expertise, int] = {}
+            doctors: dict[Expertise, int] = {}
+            for doctor_id, doctor in self.doctors.items():
+                slots[doctor.expertise] = slots.get(doctor.expertise, 0) + self.max_patients_per_doctor - self.loads[doctor_id]
+                doctors[doctor.expertise] = doctors.get(doctor.expertise, 0) + 1
+            return slots, doctors
+
+    def _push_locked(self, doctor: Doctor) -> None:
+        heap = self._heaps[doctor.expertise]
+        heapq.heappush(heap, (self.loads[doctor.id], next(self._counter), doctor.id))
+        # drop stale entries once they outnumber the live ones
+        if len(heap) > 4 * len(self.doctors):
+            live = {}
+            for entry in heap:
+                if entry[0] == self.loads[entry[2]]:
+                    live.setdefault(entry[2], entry)
+            heap[:] = live.values()
+            heapq.heapify(heap)
+
+    def _acquire_locked(self, expertise: Expertise) -> int | None:
+        heap = self._heaps.get(expertise)
+        while heap:
+            load, _, doctor_id = heap[0]
+            if load != self.loads[doctor_id]:
+                heapq.heappop(heap)
+                continue
+            if load >= self.max_patients_per_doctor:
+                return None
+            heapq.heappop(heap)
+            self.loads[doctor_id] += 1
+            self._push_locked(self.doctors[doctor_id])
+            return doctor_id
+        return None
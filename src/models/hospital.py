@@ -1,40 +1,125 @@
-import random
-from time import sleep
-import requests
+import asyncio
+import math
+from time import monotonic, sleep, time
 import threading
+import weakref
+from collections import deque
 from datetime import datetime
+from typing import Callable
 
+from src.models.admission_planner import AdmissionPlan, AdmissionPlanner
+from src.models.doctor_pool import DoctorPool
+from src.models.hospital_journal import HospitalJournal
+from src.models.hospital_stats import HospitalStats
+from src.models.patient_registry import PatientRegistry
+from src.models.person_cache import PersonCache
 from src.models.person import Doctor, Person
-from src.models.snapshot import Snapshot
+from src.models.snapshot import Snapshot, SnapshotReader
+from src.models.snapshot_store import SnapshotStore
 from src.models.discharge import Discharge
 from src.models.base_model import BaseEntity
-from src.models.treatment import Treatment, RandomTreatmentType
+from src.models.treatment import Treatment
+from src.models.treatment_batch import TreatmentBatch
+from src.models.treatment_store import TreatmentStore
 from src.models.enums import (
     DischargeStatus,
     Gender,
     Expertise,
     TreatmentType,
 )
+from src.utils import clock, random_streams
+from src.utils.adaptive_polling import AdaptivePolling
+from src.utils.discharge_coalescer import DischargeCoalescer
+from src.utils.discharge_scheduler import DischargeScheduler
+from src.utils.http_client import AsyncWorldModelClient, WorldModelClient
 from src.utils.logger import get_logger
+from src.utils.random_id_generator import UniqueIDGenerator
+from src.utils.metrics import registry, status_board
 import src.config as config
 logger = get_logger(__name__)
 
+admissions_attempted = registry.counter(
+    "hospital_admissions_attempted_total", "persons sent to /accept-person", ("hospital",)
+)
+admissions_accepted = registry.counter(
+    "hospital_admissions_accepted_total", "persons the world model accepted", ("hospital",)
+)
+admissions_rejected = registry.counter(
+    "hospital_admissions_rejected_total", "persons the world model rejected", ("hospital",)
+)
+discharges_total = registry.counter(
+    "hospital_discharges_total", "discharges accepted by the world model", ("hospital", "status")
+)
+used_capacity_gauge = registry.gauge("hospital_used_capacity", "beds in use", ("hospital",))
+pending_discharges_gauge = registry.gauge(
+    "hospital_pending_discharges", "running treatments whose discharge was not accepted yet", ("hospital",)
+)
+snapshot_age_gauge = registry.gauge(
+    "hospital_snapshot_age_seconds", "seconds since the last snapshot was applied", ("hospital",)
+)
+admissions_untreatable = registry.counter(
+    "hospital_admissions_untreatable_total", "accepted persons no doctor of the hospital can treat", ("hospital",)
+)
+admit_skipped = registry.counter(
+    "hospital_admit_skipped_total", "admit ticks that did not call /accept-person", ("hospital",)
+)
+snapshot_interval_gauge = registry.gauge(
+    "hospital_snapshot_interval_seconds", "current adaptive snapshot interval", ("hospital",)
+)
+admit_tick_seconds = registry.histogram("hospital_admit_tick_seconds", "duration of one admit tick", ("hospital",))
+# gauges read from a live hospital, dropped with it
+_HOSPITAL_GAUGES = (used_capacity_gauge, pending_discharges_gauge, snapshot_age_gauge, snapshot_interval_gauge)
+
+
+def _weak_reader(hospital: "Hospital", read: Callable[["Hospital"], object], default: object = math.nan) -> Callable[[], object]:
+    # the process wide gauges and status board must not keep a hospital alive
+    reference = weakref.ref(hospital)
+
+    def reader() -> object:
+        current = reference()
+        return read(current) if current is not None else default
+
+    return reader
+
+
+def _forget_metrics(name: str, status_source: Callable[[], dict | None]) -> None:
+    # a newer hospital that took over the name keeps its gauges and status
+    if status_board.remove(name, status_source):
+        for family in _HOSPITAL_GAUGES:
+            family.remove(name)
+
 
 class Hospital(BaseEntity):
     def __init__(
-        self, name: str, max_capacity: int, worldmodel_baseUrl: str = ""
+        self,
+        name: str,
+        max_capacity: int,
+        worldmodel_baseUrl: str = "",
+        discharge_scheduler: DischargeScheduler | None = None,
+        client: WorldModelClient | None = None,
+        async_client: AsyncWorldModelClient | None = None,
+        doctors: list[Doctor] | None = None,
+        person_cache: PersonCache | None = None,
+        snapshots: SnapshotStore | None = None,
+        journal: HospitalJournal | None = None,
+        store: TreatmentStore | None = None,
+        on_discharge: Callable[[Treatment, Discharge | None], None] | None = None,
     ) -> None:
         super().__init__()
         self.url = worldmodel_baseUrl
+        # connection pools are shared by every world model call of this hospital
+        self.client = client or WorldModelClient(worldmodel_baseUrl)
+        self.async_client = async_client
 
         self.id = -1
         self.name = name
         self.max_capacity = max_capacity
-        self.used_capacity = 0
         self.time_rate = 1
-        self.world_model_creation_date = datetime.now()
+        self.world_model_creation_date = clock.now()
+        self.registered = threading.Event()
 
-        self.doctors: list[Doctor] = self.__initialize_doctors()
+        self.doctors: list[Doctor] = doctors or self.__initialize_doctors()
+        self.doctor_pool = DoctorPool(self.doctors)
         self.__expertise_mapping = {
             TreatmentType.FRACTURE_TREATMENT: Expertise.ORTHOPEDICS,
             TreatmentType.WOUND_CARE: Expertise.TRAUMATOLOGY,
@@ -42,68 +127,175 @@ class Hospital(BaseEntity):
             TreatmentType.BURN_TREATMENT: Expertise.PLASTIC_SURGERY,
             TreatmentType.DISLOCATION_TREATMENT: Expertise.ORTHOPEDICS,
         }
+        self.planner = AdmissionPlanner(self.doctor_pool, self.__expertise_mapping)
 
+        # running treatments and the ones whose discharge is not settled yet, a settled
+        # treatment is only kept by the store and whoever listens on `on_discharge`
         self.treatments: dict[int, Treatment] = dict()
-        self.discharges: dict[int, Discharge] = dict()
+        # called with every settled treatment and its discharge (None when the world model
+        # never accepted it), from the discharge workers
+        self.on_discharge = on_discharge
         self.patients_in_progress: dict[int, Person] = dict()
-        self.servicing_patients_id: list[int] = []
+        self.patients = PatientRegistry(max_capacity)
+        # ids of accepted patients waiting for a free doctor, per required expertise
+        self.waiting_patients: dict[Expertise, deque[tuple[int, TreatmentType]]] = {
+            expertise: deque() for expertise in Expertise
+        }
+        self._waiting_lock = threading.Lock()
+
+        # one worker fires every discharge instead of a Timer per treatment.
+        # the thread is started by register(), the async runtime drives it itself.
+        # a scheduler can be shared by several hospitals, entries carry their owner
+        if discharge_scheduler is None:
+            discharge_scheduler = DischargeScheduler(Hospital.dispatch_discharge)
+        self.discharge_scheduler = discharge_scheduler
+        self.discharge_coalescer = DischargeCoalescer(self.discharge_batch)
 
-        self.snapshots: dict[int, Snapshot] = self.__initialize_initial_snapshot(-1)
-        self.last_snapshot = self.snapshots[-1]
+        # hospitals fed from the same snapshots can share the store and the cache
+        self.snapshots = snapshots if snapshots is not None else SnapshotStore()
+        self.person_cache = person_cache if person_cache is not None else PersonCache()
+        # persons of the current snapshot that have not been admitted yet
+        self.admission_candidates: dict[int, Person] = dict()
+        self.last_snapshot_at: float | None = None
+        # snapshot and admit intervals, read by the runtime loops
+        self.polling = AdaptivePolling(
+            lambda: config.SNAPSHOT_CLOCK_INTERVAL / self.time_rate,
+            lambda: config.ADMIT_PATIENT_CLOCK_INTERVAL / self.time_rate,
+        )
+        # treatment and discharge history on disk, answers the history queries
+        self.store = store
+        self.last_snapshot = self.__initialize_initial_snapshot(-1)
+        # load and outcomes kept up to date as patients come and go, served under /status
+        self.stats = HospitalStats(max_capacity, self.doctors)
+        self.__initialize_metrics()
+
+        # events are journaled once the state from the previous run is rebuilt
+        self.journal = None
+        if journal is not None:
+            journal.recover(self)
+            self.journal = journal
 
     # ==registration========================================================
+    def _registration_payload(self) -> dict:
+        return {
+            "entity_type": "hospital",
+            "max_capacity": self.max_capacity,
+            "eav": {
+                "name": self.name,
+                "doctor": [doctor.to_dict() for doctor in self.doctors],
+                "creation_date": self.creation_date.strftime("%Y-%m-%d"),
+            },
+        }
+
+    def _on_registered(self, body: dict) -> None:
+        # the world model knows the hospital from here on, a failure is never retried with
+        # a new /register. the journal entry comes first, a crash after it recovers the entity
+        try:
+            entity_id, time_rate, start_date = body["entity_id"], body["time_rate"], body["start_date"]
+            if self.journal is not None:
+                self.journal.registered(entity_id, time_rate, start_date)
+        except Exception as error:
+            logger.error(f"registration answered but could not be recorded - {body} - {error}")
+            return
+        self.id = entity_id
+        self.time_rate = time_rate
+        self.world_model_creation_date = start_date
+        self.registered.set()
+        logger.info(
+            f"registered with success - entity_id: {self.id} - time_rate: {self.time_rate}"
+        )
+
     def _register_request(self):
         while True:
             try:
-                url = self.url + "/register"
-                logger.info(f"trying to register on {url}")
-                response = requests.post(
-                    url,
-                    json={
-                        "entity_type": "hospital",
-                        "max_capacity": self.max_capacity,
-                        "eav": {
-                            "name": self.name,
-                            "doctor": [doctor.to_dict() for doctor in self.doctors],
-                            "creation_date": self.creation_date.strftime("%Y-%m-%d"),
-                        },
-                    },
-                )
-                body = response.json()
-                self.id = body["entity_id"]
-                self.time_rate = body["time_rate"]
-                self.world_model_creation_date = body["start_date"]
-                logger.info(
-                    f"registered with success - entity_id: {self.id} - time_rate: {self.time_rate}"
-                )
+                logger.info(f"trying to register on {self.url}/register")
+                _, body = self.client.post("/register", self._registration_payload())
                 break
             except Exception as error:
                 logger.error(error)
             sleep(5)
+        self._on_registered(body)
 
     def register(self):
+        self.discharge_scheduler.start()
+        self.discharge_coalescer.start()
+        if self.registered.is_set():
+            # recovered from the journal, the world model already knows this hospital
+            return
         register_thread = threading.Thread(target=self._register_request)
         register_thread.daemon = True
         register_thread.start()
 
+    async def async_register(self):
+        if self.registered.is_set():
+            return
+        while True:
+            try:
+                logger.info(f"trying to register on {self.url}/register")
+                _, body = await self.async_client.post("/register", self._registration_payload())
+                break
+            except Exception as error:
+                logger.error(error)
+            await asyncio.sleep(5)
+        self._on_registered(body)
+
     # =======================================================================
 
     # ==snapshot=============================================================
-    def __initialize_initial_snapshot(self, id: int) -> dict[int, Snapshot]:
+    def __initialize_initial_snapshot(self, id: int) -> Snapshot:
         snapshot = Snapshot(id, [], False)
-        return {snapshot.id: snapshot}
+        self.snapshots.add(snapshot)
+        return snapshot
+
+    def apply_snapshot(self, snapshot: Snapshot) -> None:
+        delta = snapshot.delta
+        news = delta is None or bool(delta.added or delta.removed or delta.changed)
+        self._update_candidates(snapshot)
+        # with every bed taken new persons are of no use yet
+        self.polling.on_snapshot(snapshot.earthquake_status, news and self.patients.free_capacity > 0)
+        self.snapshots.add(snapshot)
+        self.last_snapshot = snapshot
+        self.last_snapshot_at = monotonic()
+        logger.info("snapshot was updated")
+
+    def _on_snapshot_stream(self, status_code: int, body: dict | None, reader: SnapshotReader) -> None:
+        if status_code != 200:
+            logger.error(f"faild to load snapshot - statuscode: {status_code} - message: {body['message']}")
+        else:
+            self.apply_snapshot(reader.finish())
+
+    def offer_candidates(self, persons: list[Person]) -> None:
+        # new or changed persons of a snapshot that is still being read
+        for person in persons:
+            if not self.patients.is_known(person.id):
+                self.admission_candidates[person.id] = person
+
+    def _update_candidates(self, snapshot: Snapshot) -> None:
+        delta = snapshot.delta
+        for person_id in delta.removed:
+            self.admission_candidates.pop(person_id, None)
+        for person_id in delta.added | delta.changed:
+            if not self.patients.is_known(person_id):
+                self.admission_candidates[person_id] = self.person_cache.get(person_id)
 
     def take_snapshot(self) -> None:
         try:
-            response = requests.get(self.url + f"/snapshot/{self.id}")
-            body = response.json()
-            if response.status_code != 200:
-                logger.error(f"faild to load snapshot - statuscode: {response.status_code} - message: {body["message"]}")
-            else:
-                snapshot = Snapshot.from_dict(body)            
-                self.snapshots[snapshot.id] = snapshot
-                self.last_snapshot = snapshot    
-                logger.info("snapshot was updated")
+            started = monotonic()
+            reader = SnapshotReader(self.person_cache, self.offer_candidates)
+            status_code, body = self.client.stream(f"/snapshot/{self.id}", reader)
+            self.polling.observe_latency(monotonic() - started)
+            self._on_snapshot_stream(status_code, body, reader)
+        except Exception as error:
+            logger.error("faile to get last snapshot from worldmodel")
+            logger.error(f"yoho: {error}")
+
+    async def async_take_snapshot(self) -> None:
+        try:
+            started = monotonic()
+            reader = SnapshotReader(self.person_cache, self.offer_candidates)
+            status_code, body = await self.async_client.stream(f"/snapshot/{self.id}", reader)
+            self.polling.observe_latency(monotonic() - started)
+            self._on_snapshot_stream(status_code, body, reader)
         except Exception as error:
             logger.error("faile to get last snapshot from worldmodel")
             logger.error(f"yoho: {error}")
@@ -111,109 +303,412 @@ class Hospital(BaseEntity):
     # =======================================================================
 
     #==handling patients=====================================================
-    def admit_patient(self):
-        persons = self.last_snapshot.persons
-        temp_accepted_persons = []
+    @property
+    def used_capacity(self) -> int:
+        return self.patients.used_capacity
+
+    def _select_candidates(self, persons: list[Person]) -> dict[int, Person]:
+        # picked persons are reserved until the world model answers
+        picked: list[Person] = []
+        free_capacity = self.patients.free_capacity
+        draw = random_streams.stream("admission").random
         for person in persons:
-            if person.id in self.servicing_patients_id:
-                continue
-            temp = self.max_capacity - (self.used_capacity + len(temp_accepted_persons))
-            if temp <= 0:
+            if free_capacity - len(picked) <= 0:
                 break
-            
-            if random.random() <= config.ACCEPTENCE_RATE:
-                temp_accepted_persons.append(person.id)
+            if self.patients.is_known(person.id):
+                self.admission_candidates.pop(person.id, None)
+                continue
+
+            if draw() <= config.ACCEPTENCE_RATE:
+                picked.append(person)
+        # another admit worker may have taken beds or persons since, reserve() has the last word
+        reserved = set(self.patients.reserve([person.id for person in picked]))
+        return {person.id: person for person in picked if person.id in reserved}
+
+    def _plan_candidates(self, persons: list[Person]) -> tuple[dict[int, Person], AdmissionPlan]:
+        unknown = []
+        for person in persons:
+            if self.patients.is_known(person.id):
+                self.admission_candidates.pop(person.id, None)
+            else:
+                unknown.append(person)
+        waiting = {expertise: len(queue) for expertise, queue in self.waiting_patients.items()}
+        plan = self.planner.plan(unknown, self.patients.free_capacity, waiting, self.time_rate)
+        plan.keep(set(self.patients.reserve(list(plan.rows))))
+        by_id = {person.id: person for person in unknown}
+        return {person_id: by_id[person_id] for person_id in plan.rows}, plan
+
+    def _pick_candidates(self) -> tuple[dict[int, Person], AdmissionPlan | None]:
+        persons = list(self.admission_candidates.values())
+        if self.planner.enabled:
+            return self._plan_candidates(persons)
+        return self._select_candidates(persons), None
+
+    def _on_accept_response(self, body: dict, candidates: dict[int, Person], plan: AdmissionPlan | None = None) -> None:
+        accepted_persons_id = body["accepted"]
+        rejected_persons_id = body["rejected"]
+        logger.info("accepted persons: %s - rejected persons: %s", accepted_persons_id, rejected_persons_id)
+        self._metrics["accepted"].inc(len(accepted_persons_id))
+        self.polling.on_admit(len(accepted_persons_id))
+        self._metrics["rejected"].inc(len(rejected_persons_id))
+        accepted_persons = []
+        for person_id in accepted_persons_id:
+            person = candidates.get(person_id)
+            if person is not None:
+                self.patients.admit(person_id)
+                if self.journal is not None:
+                    self.journal.admitted(person_id)
+                self.admission_candidates.pop(person_id, None)
+                accepted_persons.append(person)
+        self.patients.release(list(candidates))
+        if plan is not None:
+            # planned order, free doctor slots before queue places, expertises taking turns
+            rank = {person_id: position for position, person_id in enumerate(plan.rows)}
+            accepted_persons.sort(key=lambda person: rank[person.id])
+        self._addmit_procces(accepted_persons, plan)
+
+    def admit_patient(self):
+        with self._metrics["admit_tick"].time():
+            self._admit_patient()
+
+    def _should_admit(self) -> bool:
+        if self.polling.should_admit(self.patients.free_capacity, len(self.admission_candidates)):
+            return True
+        self._metrics["skipped"].inc()
+        return False
+
+    def _admit_patient(self):
+        if not self._should_admit():
+            return
+        candidates = None
         try:
-            if len(temp_accepted_persons) == 0:
+            candidates, plan = self._pick_candidates()
+            if len(candidates) == 0:
                 logger.info("no patiens in snapshot to admit")
                 return
             
-            logger.info(f"sending accept request for: {temp_accepted_persons}")
+            persons_id = list(candidates)
+            logger.info("sending accept request for: %s", persons_id)
+            self._metrics["attempted"].inc(len(persons_id))
             
-            response = requests.post(
-                self.url + "/accept-person",
-                json={"entity_id": self.id, "persons_id": temp_accepted_persons},
+            started = monotonic()
+            _, body = self.client.post(
+                "/accept-person",
+                {"entity_id": self.id, "persons_id": persons_id},
             )
-            body = response.json()
-            accepted_persons_id = body["accepted"]
-            rejected_persons_id = body["rejected"]
-            logger.info(f"accepted persons: {accepted_persons_id} - rejected persons: {rejected_persons_id}")
-            self.servicing_patients_id.extend(accepted_persons_id)
-            accepted_persons = list(
-                filter(lambda p: p.id in accepted_persons_id, persons)
+            self.polling.observe_latency(monotonic() - started)
+            self._on_accept_response(body, candidates, plan)
+        except Exception as error:
+            if candidates is not None:
+                self.patients.release(list(candidates))
+            logger.error(f"error while addmiting - {error}")
+
+    async def async_admit_patient(self):
+        with self._metrics["admit_tick"].time():
+            await self._async_admit_patient()
+
+    async def _async_admit_patient(self):
+        if not self._should_admit():
+            return
+        candidates = None
+        try:
+            candidates, plan = self._pick_candidates()
+            if len(candidates) == 0:
+                logger.info("no patiens in snapshot to admit")
+                return
+
+            persons_id = list(candidates)
+            logger.info("sending accept request for: %s", persons_id)
+            self._metrics["attempted"].inc(len(persons_id))
+
+            started = monotonic()
+            _, body = await self.async_client.post(
+                "/accept-person",
+                {"entity_id": self.id, "persons_id": persons_id},
             )
-            self._addmit_procces(accepted_persons)
+            self.polling.observe_latency(monotonic() - started)
+            self._on_accept_response(body, candidates, plan)
         except Exception as error:
+            if candidates is not None:
+                self.patients.release(list(candidates))
             logger.error(f"error while addmiting - {error}")
 
-    def _addmit_procces(self, persons: list[Person]):
-        for person in persons:
-            if self.used_capacity >= self.max_capacity:
-                break
-            treatment_type = RandomTreatmentType.generate()
-            doctor = self.__assign_doctor(treatment_type)
+    def _addmit_procces(self, persons: list[Person], plan: AdmissionPlan | None = None):
+        # every person here holds a bed reserved before the accept request.
+        # planned persons are treated as planned, otherwise the whole admission is
+        # drawn at once, earthquakes bring hundreds of patients per tick
+        if plan is not None:
+            batch, rows = plan.batch, [plan.rows[person.id] for person in persons]
+        else:
+            batch, rows = TreatmentBatch.draw(len(persons), self.time_rate), range(len(persons))
+        started: list[tuple[int, int, Doctor]] = []
+        for index, person in zip(rows, persons):
+            treatment_type = batch.treatment_type(index)
+            if not self.doctor_pool.has_expertise(self.__expertise_mapping[treatment_type]):
+                self._metrics["untreatable"].inc()
+                self.patients.drop(person.id)
+                continue
+            # the world model already handed the patient over, without a doctor it waits for one
+            self.patients_in_progress[person.id] = person
+            doctor = self._assign_or_queue(person.id, treatment_type)
             if doctor:
-                treatment = Treatment(person.id, doctor.id, treatment_type, self.time_rate)
-                self.treatments[treatment.id] = treatment
-                self.servicing_patients_id.append(person.id)
-                self.patients_in_progress[person.id] = person
-                self.used_capacity = len(self.servicing_patients_id)
+                started.append((index, person.id, doctor))
+            elif self.journal is not None:
+                self.journal.queued(person.id, treatment_type)
+        for (index, person_id, doctor), treatment_id in zip(started, UniqueIDGenerator.reserve_ids(len(started))):
+            self._begin_treatment(batch.build(index, treatment_id, person_id, doctor.id), doctor)
+
+    def _assign_or_queue(self, person_id: int, treatment_type: TreatmentType) -> Doctor | None:
+        # one step under the lock. a doctor released between a failed assignment and
+        # the enqueue would find the queue still empty and the patient would wait for nothing
+        with self._waiting_lock:
+            doctor = self.__assign_doctor(treatment_type)
+            if doctor is None:
+                self._queue_locked(person_id, treatment_type)
+            return doctor
 
-                duration = treatment.duration
+    def _requeue_held(self, person_id: int, treatment_type: TreatmentType) -> bool:
+        # a recovered patient that held a bed, it waits for a doctor unless none here can treat it
+        if not self.doctor_pool.has_expertise(self.__expertise_mapping[treatment_type]):
+            return False
+        self._queue_patient(person_id, treatment_type)
+        return True
 
-                timer = threading.Timer(
-                    duration, self.discharge, args=(treatment.id, DischargeStatus.DEAD if treatment.is_dead else DischargeStatus.HEALTHY)
-                )
-                timer.setDaemon(True)
-                timer.start()
+    def _queue_patient(self, person_id: int, treatment_type: TreatmentType) -> None:
+        with self._waiting_lock:
+            self._queue_locked(person_id, treatment_type)
 
-    def discharge(self, treatment_id: int, discharge_status:DischargeStatus = DischargeStatus.HEALTHY, count:int=1):
-        # TODO implement the maximum try with count parameter
-        treatment = self.treatments.get(treatment_id)
-        if not treatment:
-            return
-        
-        try:
-            person_id = treatment.patient_id
-            if discharge_status == DischargeStatus.HEALTHY:
-                response = requests.post(
-                    self.url + "/service-done",
-                    json={"entity_id": self.id, "persons_id": [person_id]},
-                )
-                body = response.json()
-                accepted = body["accepted"]
-                if accepted:
-                    logger.info(f"service done for {accepted} was accepted")
-                else:
-                    logger.info(f"service done for {body["accepted"]} was accepted")
-
-                if person_id in accepted:
-                    discharge = Discharge(treatment.id, DischargeStatus.HEALTHY)
-                    self.discharges[discharge.id] = discharge
-        
+    def _queue_locked(self, person_id: int, treatment_type: TreatmentType) -> None:
+        self.patients.queue(person_id)
+        expertise = self.__expertise_mapping[treatment_type]
+        self.waiting_patients[expertise].append((person_id, treatment_type))
+        self.stats.queued(expertise)
+
+    def _start_treatment(self, person_id: int, doctor: Doctor, treatment_type: TreatmentType) -> None:
+        self._begin_treatment(Treatment(person_id, doctor.id, treatment_type, self.time_rate), doctor)
+
+    def _begin_treatment(self, treatment: Treatment, doctor: Doctor) -> None:
+        if self.journal is not None:
+            self.journal.treatment_started(treatment)
+        if self.store is not None:
+            self.store.add_treatment(self.name, treatment, doctor.expertise)
+        self._arm_treatment(treatment)
+
+    def _arm_treatment(self, treatment: Treatment) -> None:
+        self.treatments[treatment.id] = treatment
+        self.patients.start_treatment(treatment.patient_id, treatment.id)
+        self.stats.treatment_started(treatment.treatment_type, treatment.doctor_id)
+        self.discharge_scheduler.schedule(
+            treatment.id, treatment.end_date, (self, DischargeStatus.DEAD if treatment.is_dead else DischargeStatus.HEALTHY, 1)
+        )
+
+    def _treat_waiting_patients(self, expertise: Expertise) -> None:
+        # a freed emergency medicine doctor can take a patient from any queue.
+        # discharge workers free doctors concurrently, the queues are popped under
+        # the lock and the treatments started outside of it
+        with self._waiting_lock:
+            if expertise == DoctorPool.FALLBACK_EXPERTISE:
+                queues = self.waiting_patients.values()
             else:
-                response = requests.post(
-                    self.url + "/person-death",
-                    json={"entity_id": self.id, "persons_id": [person_id]},
-                )
-                body = response.json()
-                accepted = body["accepted"]
-                if accepted:
-                    logger.info(f"person death for {accepted} was accepted")
-                else:
-                    logger.info(f"person death for {body["accepted"]} was accepted")
-
-                if person_id in accepted:
-                    discharge = Discharge(treatment.id, DischargeStatus.DEAD)
-                    self.discharges[discharge.id] = discharge
-                    
-        except Exception as error:
+                queues = [self.waiting_patients[expertise]]
+            assigned = []
+            for queue in queues:
+                while queue:
+                    person_id, treatment_type = queue[0]
+                    doctor = self.__assign_doctor(treatment_type)
+                    if doctor is None:
+                        break
+                    queue.popleft()
+                    self.stats.dequeued(self.__expertise_mapping[treatment_type])
+                    assigned.append((person_id, doctor, treatment_type))
+        for person_id, doctor, treatment_type in assigned:
+            self._start_treatment(person_id, doctor, treatment_type)
+
+    @staticmethod
+    def dispatch_discharge(treatment_id: int, payload: tuple["Hospital", DischargeStatus, int]):
+        hospital, discharge_status, count = payload
+        hospital.discharge(treatment_id, discharge_status, count)
+
+    def _group_discharges(self, items: list[tuple[int, DischargeStatus, int]]) -> dict[DischargeStatus, dict[int, tuple[Treatment, int]]]:
+        # status -> person_id -> (treatment, count)
+        groups: dict[DischargeStatus, dict[int, tuple[Treatment, int]]] = {}
+        for treatment_id, discharge_status, count in items:
+            treatment = self.treatments.get(treatment_id)
+            if not treatment:
+                continue
+            groups.setdefault(discharge_status, {})[treatment.patient_id] = (treatment, count)
+        return groups
+
+    def _discharge_request(self, discharge_status: DischargeStatus, persons_id: list[int]) -> tuple[str, dict]:
+        path = "/service-done" if discharge_status == DischargeStatus.HEALTHY else "/person-death"
+        return path, {"entity_id": self.id, "persons_id": persons_id}
+
+    def _retry_discharge(self, treatment: Treatment, discharge_status: DischargeStatus, count: int) -> None:
+        # back on the scheduler instead of the next batch, a failing world model gets
+        # DISCHARGE_RETRY_BACKOFF, then twice as long, ... to recover
+        delay = config.DISCHARGE_RETRY_BACKOFF * 2 ** (count - 1)
+        self.discharge_scheduler.schedule(treatment.id, clock.time() + delay, (self, discharge_status, count + 1))
+
+    def _on_discharge_response(
+        self, discharge_status: DischargeStatus, pending: dict[int, tuple[Treatment, int]], body: dict | None
+    ) -> None:
+        # records accepted discharges and schedules the ones that should be sent again
+        accepted = set(body["accepted"]) if body else set()
+        event = "service done" if discharge_status == DischargeStatus.HEALTHY else "person death"
+        if accepted:
+            logger.info("%s for %s was accepted", event, accepted, extra={"sample_key": "discharge"})
+
+        for person_id, (treatment, count) in pending.items():
+            if person_id not in accepted and count < config.DISCHARGE_MAX_TRY:
+                self._retry_discharge(treatment, discharge_status, count)
+                continue
+            # the treatment is over either way, the worker that frees the bed frees the doctor too
+            if self.patients.discharge(person_id, treatment.id) is None:
+                continue
+            self.treatments.pop(treatment.id, None)
+            discharge = None
+            if person_id in accepted:
+                discharge = Discharge(treatment.id, discharge_status)
+                self._metrics[discharge_status].inc()
+                if self.store is not None:
+                    doctor = self.doctor_pool.doctors[treatment.doctor_id]
+                    self.store.add_discharge(self.name, discharge, treatment, doctor.expertise)
+            else:
+                logger.error(f"{event} for {person_id} was not accepted after {count} tries")
+            self.stats.discharged(
+                treatment.treatment_type, treatment.doctor_id, discharge_status if person_id in accepted else None
+            )
+            if self.journal is not None:
+                self.journal.discharged(treatment, discharge_status)
+            if self.on_discharge is not None:
+                self.on_discharge(treatment, discharge)
+            self.patients_in_progress.pop(person_id, None)
+            expertise = self.doctor_pool.release(treatment.doctor_id)
+            if expertise is not None:
+                self._treat_waiting_patients(expertise)
+
+    def discharge(self, treatment_id: int, discharge_status:DischargeStatus = DischargeStatus.HEALTHY, count:int=1):
+        # queued and sent together with the other discharges due in the same window
+        self.discharge_coalescer.add((treatment_id, discharge_status, count))
+
+    def discharge_batch(self, items: list[tuple[int, DischargeStatus, int]]) -> None:
+        for discharge_status, pending in self._group_discharges(items).items():
+            path, payload = self._discharge_request(discharge_status, list(pending))
+            body = None
+            try:
+                _, body = self.client.post(path, payload)
+            except Exception as error:
                 logger.error("error in discharge")
                 logger.error(error)
+            self._on_discharge_response(discharge_status, pending, body)
+
+    def drain(self, timeout: float = config.SHUTDOWN_DRAIN_TIMEOUT) -> None:
+        # waits for treatments ending (and discharge retries due) within the timeout, then
+        # reports whatever is queued. retries left on the scheduler stay in the journal
+        deadline = monotonic() + timeout
+        while self.discharge_scheduler.pending and monotonic() < deadline:
+            next_due = self.discharge_scheduler.next_due()
+            if next_due is None or next_due - time() > deadline - monotonic():
+                break
+            sleep(0.1)
+        self.discharge_scheduler.stop()
+        self.discharge_coalescer.stop()
+        self.discharge_coalescer.flush()
+        if self.discharge_scheduler.pending:
+            logger.info(f"{self.discharge_scheduler.pending} treatments still running or waiting for a retry at shutdown")
+        self.close()
+
+    def close(self) -> None:
+        self.close_journal()
+        self.close_metrics()
+
+    def close_journal(self) -> None:
+        # running treatments stay in the journal and are re-armed on the next start
+        if self.journal is not None:
+            self.journal.close()
+
+    def close_metrics(self) -> None:
+        # counters stay, they are totals of the name. gauges and the status go
+        self._metrics_finalizer()
+
+    async def async_discharge_batch(self, items: list[tuple[int, DischargeStatus, int]]) -> None:
+        for discharge_status, pending in self._group_discharges(items).items():
+            path, payload = self._discharge_request(discharge_status, list(pending))
+            body = None
+            try:
+                _, body = await self.async_client.post(path, payload)
+            except Exception as error:
+                logger.error("error in discharge")
+                logger.error(error)
+            self._on_discharge_response(discharge_status, pending, body)
 
     #=========================================================================
     
+    #==history================================================================
+    def _history(self) -> TreatmentStore:
+        if self.store is None:
+            raise RuntimeError(f"hospital {self.name} has no treatment store, history queries need one")
+        # queries see every treatment and discharge recorded before the call
+        self.store.flush()
+        return self.store
+
+    def count_discharges(
+        self,
+        status: DischargeStatus | None = None,
+        expertise: Expertise | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> int:
+        return self._history().count_discharges(self.name, status, expertise, since, until)
+
+    def average_duration_by_type(
+        self, since: datetime | None = None, until: datetime | None = None
+    ) -> dict[TreatmentType, float]:
+        return self._history().average_duration_by_type(self.name, since, until)
+
+    def outcomes_by_expertise(
+        self, since: datetime | None = None, until: datetime | None = None
+    ) -> dict[Expertise, dict[str, int]]:
+        return self._history().outcomes_by_expertise(self.name, since, until)
+
+    def doctor_workload(self, since: datetime | None = None, until: datetime | None = None) -> dict[int, int]:
+        return self._history().doctor_workload(self.name, since, until)
+
+    def patient_history(self, patient_id: int) -> list[dict]:
+        return self._history().patient_history(self.name, patient_id)
+
+    #=========================================================================
+
     #==utils==================================================================
+    def __initialize_metrics(self) -> None:
+        # children are looked up once, the hot path only increments them
+        self._metrics = {
+            "attempted": admissions_attempted.labels(self.name),
+            "accepted": admissions_accepted.labels(self.name),
+            "rejected": admissions_rejected.labels(self.name),
+            "admit_tick": admit_tick_seconds.labels(self.name),
+            "skipped": admit_skipped.labels(self.name),
+            "untreatable": admissions_untreatable.labels(self.name),
+        }
+        for status in DischargeStatus:
+            self._metrics[status] = discharges_total.labels(self.name, status.name.lower())
+        used_capacity_gauge.labels(self.name).set_function(_weak_reader(self, lambda hospital: hospital.used_capacity))
+        snapshot_interval_gauge.labels(self.name).set_function(
+            _weak_reader(self, lambda hospital: hospital.polling.snapshot_interval())
+        )
+        pending_discharges_gauge.labels(self.name).set_function(
+            _weak_reader(self, lambda hospital: len(hospital.patients.in_service))
+        )
+        snapshot_age_gauge.labels(self.name).set_function(_weak_reader(self, Hospital._snapshot_age))
+        status_source = _weak_reader(self, lambda hospital: hospital.stats.summary(), None)
+        if not status_board.add(self.name, status_source):
+            logger.warning(f"another hospital is named {self.name}, its gauges and status now follow this one")
+        # also runs when the hospital is collected without being closed
+        self._metrics_finalizer = weakref.finalize(self, _forget_metrics, self.name, status_source)
+
+    def _snapshot_age(self) -> float:
+        return monotonic() - self.last_snapshot_at if self.last_snapshot_at is not None else math.nan
+
     def __initialize_doctors(self) -> list[Doctor]:
         doctors_data = [
             (
@@ -276,14 +771,14 @@ class Hospital(BaseEntity):
     def __assign_doctor(self, treatment_type: TreatmentType) -> Doctor | None:
         required_expertise = self.__expertise_mapping[treatment_type]
 
-        available_doctors = [
-            doctor for doctor in self.doctors if doctor.expertise == required_expertise
-        ]
-
-        if not available_doctors:
-            logger.info(f"No available doctor with expertise in {required_expertise.value}")
+        doctor = self.doctor_pool.acquire(required_expertise)
+        if not doctor:
+            logger.info(
+                "No available doctor with expertise in %s", required_expertise.value,
+                extra={"sample_key": "doctor"},
+            )
             return
 
-        return random.choice(available_doctors)
+        return doctor
 
     #=========================================================================
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+write-ahead journal of a hospital's admit, treatment and discharge events and
+the recovery that rebuilds the live state from it after a restart.
+
+every record is 48 bytes, (kind, flags, a, b, c, x, y):
+
+    REGISTER   a=entity_id                         x=time_rate  y=world start date
+    DOCTOR     a=doctor_id  b=roster position
+    ADMIT      a=person_id
+    QUEUE      a=person_id                                                   flags=treatment type
+    TREATMENT  a=treatment_id  b=person_id  c=doctor_id  x=start  y=end      flags=treatment type | dead
+    DISCHARGE  a=treatment_id  b=person_id                      y=date       flags=discharge status
+
+checkpoints only hold the live state: the registration, the roster, every
+admitted and discharged person id, queued patients and running treatments.
+finished treatments and accepted discharges are not kept across restarts.
+admitted persons with neither of the three were held, recovery queues them.
+
+records are aligned to 8 bytes so recovery reads whole columns at once
+instead of unpacking record by record. that works because replay does not
+depend on order: within one journal a patient is admitted, treated and
+discharged at most once.
+"""
+
+import struct
+import time
+from array import array
+from datetime import datetime
+from itertools import compress
+
+from src.models.doctor_pool import DoctorPool
+from src.models.enums import DischargeStatus, TreatmentType
+from src.models.treatment import Treatment
+from src.models.treatment_batch import TREATMENT_TYPES, keyed_treatment_type
+from src.utils import clock
+from src.utils.journal import Journal
+from src.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+RECORD = struct.Struct("<BB6xqqqdd")
+_WORDS = RECORD.size // 8
+
+REGISTER, DOCTOR, ADMIT, QUEUE, TREATMENT, DISCHARGE = range(1, 7)
+
+_TREATMENT_TYPES = list(TreatmentType)
+_DISCHARGE_STATUSES = list(DischargeStatus)
+_DEAD = 0x80
+
+
+def _pack_column(kind: int, ids: list[int], word: int = 1) -> bytes:
+    # one record per id with everything but the kind and that id left at zero
+    words = array("q", bytes(RECORD.size * len(ids)))
+    words[0::_WORDS] = array("q", [kind]) * len(ids)
+    words[word::_WORDS] = array("q", ids)
+    return words.tobytes()
+
+
+class HospitalJournal:
+    def __init__(self, path: str, **options) -> None:
+        self.journal = Journal(path, RECORD, **options)
+
+    # ==events==============================================================
+    def registered(self, entity_id: int, time_rate: float, start_date) -> None:
+        self.journal.append(*self._register_record(entity_id, time_rate, start_date))
+
+    def admitted(self, person_id: int) -> None:
+        self.journal.append(ADMIT, 0, person_id, 0, 0, 0.0, 0.0)
+
+    def queued(self, person_id: int, treatment_type: TreatmentType) -> None:
+        self.journal.append(QUEUE, _TREATMENT_TYPES.index(treatment_type), person_id, 0, 0, 0.0, 0.0)
+
+    def treatment_started(self, treatment: Treatment) -> None:
+        self.journal.append(*self._treatment_record(treatment))
+
+    def discharged(self, treatment: Treatment, discharge_status: DischargeStatus) -> None:
+        self.journal.append(
+            DISCHARGE, _DISCHARGE_STATUSES.index(discharge_status),
+            treatment.id, treatment.patient_id, 0, 0.0, clock.time(),
+        )
+
+    @staticmethod
+    def _register_record(entity_id: int, time_rate: float, start_date) -> tuple:
+        if isinstance(start_date, str):
+            start_date = datetime.fromisoformat(start_date)
+        return REGISTER, 0, entity_id, 0, 0, time_rate, start_date.timestamp()
+
+    @staticmethod
+    def _treatment_record(treatment: Treatment) -> tuple:
+        flags = _TREATMENT_TYPES.index(treatment.treatment_type) | (_DEAD if treatment.is_dead else 0)
+        return (
+            TREATMENT, flags, treatment.id, treatment.patient_id, treatment.doctor_id,
+            treatment.start_date.timestamp(), treatment.end_date.timestamp(),
+        )
+
+    # ==checkpoint==========================================================
+    def checkpoint_payload(self, hospital) -> bytes:
+        # copies are taken first, the other threads keep mutating the live containers
+        treatments = list(hospital.treatments.values())
+        in_service = dict(hospital.patients.in_service)
+        admitted = list(hospital.patients.admitted)
+        discharged = list(hospital.patients.discharged)
+        waiting = [entry for queue in list(hospital.waiting_patients.values()) for entry in list(queue)]
+
+        records = []
+        if hospital.registered.is_set():
+            records.append(self._register_record(hospital.id, hospital.time_rate, hospital.world_model_creation_date))
+        records.extend((DOCTOR, 0, doctor.id, position, 0, 0.0, 0.0) for position, doctor in enumerate(hospital.doctors))
+        records.extend(
+            (QUEUE, _TREATMENT_TYPES.index(treatment_type), person_id, 0, 0, 0.0, 0.0)
+            for person_id, treatment_type in waiting
+        )
+        records.extend(
+            self._treatment_record(treatment) for treatment in treatments
+            if in_service.get(treatment.patient_id) == treatment.id
+        )
+        return b"".join((
+            *(RECORD.pack(*record) for record in records),
+            _pack_column(ADMIT, admitted),
+            _pack_column(DISCHARGE, discharged, word=2),
+        ))
+
+    # ==recovery============================================================
+    def recover(self, hospital) -> dict:
+        """
+        replays the checkpoint and the journal into `hospital`, re-arms the
+        discharges of the treatments that were still running and writes a fresh
+        checkpoint. recovered treatments get new ids and are mapped to the
+        current roster by position, so the old ids never mix with new ones.
+        """
+        started = time.perf_counter()
+        data = self.journal.read_bytes()
+        events = len(data) // RECORD.size
+        words = memoryview(data).cast("q")
+        kinds = data[0::RECORD.size]
+        flags = data[1::RECORD.size]
+
+        def mask(kind: int) -> bytes:
+            return kinds.translate(bytes(int(value == kind) for value in range(256)))
+
+        def column(kind_mask: bytes, word: int):
+            return compress(words[word::_WORDS], kind_mask)
+
+        admit_mask, discharge_mask = mask(ADMIT), mask(DISCHARGE)
+        treatment_mask, queue_mask = mask(TREATMENT), mask(QUEUE)
+        doctor_mask, register_mask = mask(DOCTOR), mask(REGISTER)
+
+        admitted = set(column(admit_mask, 1))
+        discharged = set(column(discharge_mask, 2))
+        # person_id -> row of the treatment, a patient is only ever treated once
+        treatment_rows = dict(zip(column(treatment_mask, 2), compress(range(events), treatment_mask)))
+        running = treatment_rows.keys() - discharged
+        queued = dict(zip(column(queue_mask, 1), compress(flags, queue_mask)))
+        doctor_positions = dict(zip(column(doctor_mask, 1), column(doctor_mask, 2)))
+        registrations = list(compress(range(events), register_mask))
+
+        if registrations:
+            _, _, entity_id, _, _, time_rate, start_date = RECORD.unpack_from(data, registrations[-1] * RECORD.size)
+            hospital._on_registered({
+                "entity_id": entity_id,
+                "time_rate": time_rate,
+                "start_date": datetime.fromtimestamp(start_date).strftime("%Y-%m-%d"),
+            })
+
+        patients = hospital.patients
+        patients.admitted.update(admitted)
+        patients.discharged.update(discharged)
+
+        doctors = {position: doctor for position, doctor in enumerate(hospital.doctors)}
+        restored = 0
+        for person_id in running:
+            _, treatment_flags, _, patient_id, doctor_id, start, end = RECORD.unpack_from(
+                data, treatment_rows[person_id] * RECORD.size
+            )
+            doctor = doctors.get(doctor_positions.get(doctor_id, -1))
+            if doctor is None:
+                continue
+            treatment = Treatment.restore(
+                patient_id, doctor.id, _TREATMENT_TYPES[treatment_flags & ~_DEAD],
+                datetime.fromtimestamp(start), datetime.fromtimestamp(end), bool(treatment_flags & _DEAD),
+            )
+            hospital.doctor_pool.occupy(doctor.id)
+            hospital._arm_treatment(treatment)
+            restored += 1
+
+        requeued = 0
+        for person_id, type_index in queued.items():
+            if person_id in treatment_rows or person_id in discharged:
+                continue
+            hospital._queue_patient(person_id, _TREATMENT_TYPES[type_index])
+            requeued += 1
+        # admitted but neither queued nor treated: the patient held a bed when the hospital
+        # went down and the world model still counts it as ours. the planned treatment is
+        # gone, the patient waits for the one drawn from its id
+        held = 0
+        for person_id in admitted - treatment_rows.keys() - queued.keys() - discharged:
+            if hospital._requeue_held(person_id, TREATMENT_TYPES[keyed_treatment_type(person_id)]):
+                held += 1
+        # doctors freed by treatments that ended while the hospital was down
+        hospital._treat_waiting_patients(DoctorPool.FALLBACK_EXPERTISE)
+
+        # the old journal is replaced, its doctor and treatment ids are gone for good
+        self.journal.open()
+        self.journal.checkpoint(self.checkpoint_payload(hospital))
+        self.journal.checkpoint_source = lambda: self.checkpoint_payload(hospital)
+
+        stats = {
+            "events": events,
+            "treatments": restored,
+            "queued": requeued,
+            "held": held,
+            "admitted": len(admitted),
+            "seconds": time.perf_counter() - started,
+        }
+        logger.info(f"recovered hospital state from {self.journal.path} - {stats}")
+        return stats
+
+    def close(self) -> None:
+        self.journal.close()
@@ -0,0 +1,144 @@
+"""
+running aggregates of a hospital, updated when a treatment starts, a patient
+is queued or taken from a queue and a discharge is settled. reading them costs
+the same however long the hospital has been running, the hospital itself
+forgets treatments once they are discharged:
+
+- treatments started and outcomes per treatment type and per expertise of the
+  treating doctor, with the healthy / dead ratio
+- patients in the hospital (treated or waiting) now, the time weighted mean
+  over the last STATUS_OCCUPANCY_WINDOW seconds and the peak
+- patients waiting per expertise
+- current and total patients per doctor
+
+occupancy follows the process clock, a simulation sees it in simulated time.
+"""
+
+import math
+import threading
+
+from src.models.enums import DischargeStatus, Expertise, TreatmentType
+from src.models.person import Doctor
+from src.utils import clock
+import src.config as config
+
+
+def _ratio(part: int, whole: int) -> float | None:
+    return part / whole if whole else None
+
+
+class HospitalStats:
+    def __init__(self, max_capacity: int, doctors: list[Doctor], window: float = config.STATUS_OCCUPANCY_WINDOW) -> None:
+        self.max_capacity = max_capacity
+        self.window = window
+        self._doctors = {doctor.id: doctor for doctor in doctors}
+        self._lock = threading.Lock()
+
+        # [started, healthy, dead] per treatment type and per expertise
+        self._by_type = {treatment_type: [0, 0, 0] for treatment_type in TreatmentType}
+        self._by_expertise = {expertise: [0, 0, 0] for expertise in Expertise}
+        self._waiting = {expertise: 0 for expertise in Expertise}
+        # [current, total] per doctor
+        self._doctor_load = {doctor.id: [0, 0] for doctor in doctors}
+        self._unsettled = 0
+
+        # patients treated or waiting
+        self._patients = 0
+        self._peak = 0
+        # time weighted mean of the occupancy, decayed over `window`, as of `_changed_at`
+        self._mean = 0.0
+        self._changed_at = clock.time()
+
+    # ==updates (hot path)==================================================
+    def treatment_started(self, treatment_type: TreatmentType, doctor_id: int) -> None:
+        expertise = self._doctors[doctor_id].expertise
+        with self._lock:
+            self._by_type[treatment_type][0] += 1
+            self._by_expertise[expertise][0] += 1
+            load = self._doctor_load[doctor_id]
+            load[0] += 1
+            load[1] += 1
+            self._move(1)
+
+    def queued(self, expertise: Expertise) -> None:
+        with self._lock:
+            self._waiting[expertise] += 1
+            self._move(1)
+
+    def dequeued(self, expertise: Expertise) -> None:
+        # the treatment that follows counts the patient again
+        with self._lock:
+            self._waiting[expertise] -= 1
+            self._move(-1)
+
+    def discharged(self, treatment_type: TreatmentType, doctor_id: int, status: DischargeStatus | None) -> None:
+        # `status` is None when the world model never accepted the discharge
+        expertise = self._doctors[doctor_id].expertise
+        with self._lock:
+            if status is None:
+                self._unsettled += 1
+            else:
+                column = 1 if status == DischargeStatus.HEALTHY else 2
+                self._by_type[treatment_type][column] += 1
+                self._by_expertise[expertise][column] += 1
+            self._doctor_load[doctor_id][0] -= 1
+            self._move(-1)
+
+    def _move(self, delta: int) -> None:
+        # under the lock: folds the time spent at the old occupancy into the mean
+        now = clock.time()
+        self._mean = self._decayed(now)
+        self._changed_at = now
+        self._patients += delta
+        self._peak = max(self._peak, self._patients)
+
+    def _decayed(self, now: float) -> float:
+        weight = math.exp(-max(now - self._changed_at, 0.0) / self.window) if self.window > 0 else 0.0
+        return self._patients + (self._mean - self._patients) * weight
+
+    # ==reads=============================================================
+    def summary(self) -> dict:
+        # the size of the answer depends on the roster, not on the history
+        with self._lock:
+            by_type = {treatment_type: list(row) for treatment_type, row in self._by_type.items()}
+            by_expertise = {expertise: list(row) for expertise, row in self._by_expertise.items()}
+            waiting = dict(self._waiting)
+            doctor_load = {doctor_id: list(load) for doctor_id, load in self._doctor_load.items()}
+            occupancy, peak, unsettled = self._patients, self._peak, self._unsettled
+            mean = self._decayed(clock.time())
+
+        def outcomes(started: int, healthy: int, dead: int) -> dict:
+            return {
+                "started": started,
+                "healthy": healthy,
+                "dead": dead,
+                "healthy_ratio": _ratio(healthy, healthy + dead),
+                "dead_ratio": _ratio(dead, healthy + dead),
+            }
+
+        started, healthy, dead = (sum(column) for column in zip(*by_type.values()))
+        return {
+            "max_capacity": self.max_capacity,
+            "occupancy": {
+                "current": occupancy,
+                "waiting": sum(waiting.values()),
+                "mean": round(mean, 3),
+                "window_seconds": self.window,
+                "peak": peak,
+                "utilization": _ratio(occupancy, self.max_capacity),
+            },
+            "treatments": {**outcomes(started, healthy, dead), "unsettled": unsettled},
+            "by_treatment_type": {treatment_type.value: outcomes(*row) for treatment_type, row in by_type.items()},
+            "by_expertise": {expertise.value: outcomes(*row) for expertise, row in by_expertise.items()},
+            "waiting_by_expertise": {expertise.value: count for expertise, count in waiting.items()},
+            "doctors": [
+                {
+                    "id": doctor_id,
+                    "name": self._doctors[doctor_id].name,
+                    "expertise": self._doctors[doctor_id].expertise.value,
+                    "patients": current,
+                    "treated": total,
+                }
+                for doctor_id, (current, total) in doctor_load.items()
+            ],
+        }
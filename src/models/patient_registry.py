@@ -0,0 +1,118 @@
+import threading
+
+
+class PatientRegistry:
+    """
+    indexes every patient the hospital has dealt with so membership checks and
+    capacity accounting are O(1) no matter how long the hospital has been running.
+
+    requested  - persons with an /accept-person request in flight
+    admitted   - persons the world model has ever accepted for this hospital
+    held       - admitted persons holding a bed until they are queued or treated
+    waiting    - admitted persons queued for a free doctor
+    in_service - person_id -> treatment_id of the treatments currently running
+    discharged - persons whose treatment is finished
+
+    admit, discharge and snapshot work run on different threads (and admit and
+    discharge on several at once), every change goes through one lock. a bed is
+    counted from reserve() until discharge(), so concurrent admissions can never
+    hand out more beds than max_capacity.
+    """
+
+    def __init__(self, max_capacity: int) -> None:
+        self.max_capacity = max_capacity
+        self.requested: set[int] = set()
+        self.admitted: set[int] = set()
+        self.held: set[int] = set()
+        self.waiting: set[int] = set()
+        self.in_service: dict[int, int] = dict()
+        self.discharged: set[int] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def used_capacity(self) -> int:
+        with self._lock:
+            return len(self.in_service) + len(self.waiting) + len(self.held)
+
+    @property
+    def free_capacity(self) -> int:
+        with self._lock:
+            return self._free_locked()
+
+    def _free_locked(self) -> int:
+        return self.max_capacity - len(self.in_service) - len(self.waiting) - len(self.held) - len(self.requested)
+
+    def is_known(self, person_id: int) -> bool:
+        return person_id in self.admitted or person_id in self.requested
+
+    def reserve(self, persons_id: list[int]) -> list[int]:
+        # takes as many of `persons_id` as there are free beds, in one step.
+        # persons another thread reserved or admitted in the meantime are skipped
+        with self._lock:
+            free = self._free_locked()
+            reserved = []
+            for person_id in persons_id:
+                if len(reserved) >= free:
+                    break
+                if person_id in self.admitted or person_id in self.requested:
+                    continue
+                reserved.append(person_id)
+            self.requested.update(reserved)
+            return reserved
+
+    def release(self, persons_id: list[int]) -> None:
+        with self._lock:
+            self.requested.difference_update(persons_id)
+
+    def admit(self, person_id: int) -> None:
+        # the reserved bed stays taken until queue(), start_treatment() or drop()
+        with self._lock:
+            if person_id in self.requested:
+                self.requested.discard(person_id)
+                self.held.add(person_id)
+            self.admitted.add(person_id)
+
+    def drop(self, person_id: int) -> None:
+        # an admitted person this hospital cannot treat gives the bed back
+        with self._lock:
+            self.held.discard(person_id)
+
+    def queue(self, person_id: int) -> None:
+        with self._lock:
+            self.held.discard(person_id)
+            self.waiting.add(person_id)
+
+    def start_treatment(self, person_id: int, treatment_id: int) -> None:
+        with self._lock:
+            self.held.discard(person_id)
+            self.waiting.discard(person_id)
+            self.in_service[person_id] = treatment_id
+
+    def discharge(self, person_id: int, treatment_id: int | None = None) -> int | None:
+        # returns the finished treatment id, None if it was discharged already
+        with self._lock:
+            current = self.in_service.get(person_id)
+            if current is None or (treatment_id is not None and current != treatment_id):
+                return None
+            del self.in_service[person_id]
+            self.discharged.add(person_id)
+            return current
+
+    def check(self) -> list[str]:
+        # broken capacity invariants, empty while the counts are consistent
+        with self._lock:
+            problems = []
+            used = len(self.in_service) + len(self.waiting) + len(self.held)
+            if used + len(self.requested) > self.max_capacity:
+                problems.append(f"{used} beds used and {len(self.requested)} reserved of {self.max_capacity}")
+            states = {"held": self.held, "waiting": self.waiting, "in service": self.in_service.keys()}
+            for name, persons in states.items():
+                if not persons <= self.admitted:
+                    problems.append(f"{name} persons that were never admitted: {sorted(persons - self.admitted)[:5]}")
+            for first, second in (("held", "waiting"), ("held", "in service"), ("waiting", "in service")):
+                overlap = states[first] & states[second]
+                if overlap:
+                    problems.append(f"persons both {first} and {second}: {sorted(overlap)[:5]}")
+            if self.in_service.keys() & self.discharged:
+                problems.append("discharged persons still in service")
+            return problems
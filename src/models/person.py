@@ -8,7 +8,22 @@ from src.models.enums import (
 from src.models.base_model import BaseEntity
 
 
+_STATUSES = {
+    "alive": PersonStatus.ALIVE,
+    "injured": PersonStatus.ALIVE,
+    "dead": PersonStatus.DEAD,
+}
+
+
 class Person:
+    """
+    a person from a snapshot. most persons are only ever looked at by id, so
+    gender, dates and status are kept as the strings of the snapshot and decoded
+    on first access.
+    """
+
+    __slots__ = ("id", "name", "national_code", "_gender", "_birth_date", "_death_date", "_status")
+
     def __init__(
         self,
         id: int,
@@ -21,17 +36,51 @@ class Person:
     ) -> None:
         self.id = id
         self.name = name
-        self.gender = Gender.MALE if gender == "male" else Gender.FEMALE
-        self.birth_date = datetime.fromisoformat(birth_date)
         self.national_code = national_code
-        self.death_date: datetime | None = datetime.fromisoformat(death_date) if  death_date else None
-        match status:
-            case 'alive':
-                self.status = PersonStatus.ALIVE
-            case 'injured':
-                self.status = PersonStatus.ALIVE
-            case 'dead':
-                self.status = PersonStatus.DEAD
+        self._gender = gender
+        self._birth_date = birth_date
+        self._death_date = death_date or None
+        self._status = status
+
+    @property
+    def gender(self) -> Gender:
+        if type(self._gender) is str:
+            self._gender = Gender.MALE if self._gender == "male" else Gender.FEMALE
+        return self._gender
+
+    @gender.setter
+    def gender(self, value: Gender) -> None:
+        self._gender = value
+
+    @property
+    def birth_date(self) -> datetime:
+        if type(self._birth_date) is str:
+            self._birth_date = datetime.fromisoformat(self._birth_date)
+        return self._birth_date
+
+    @birth_date.setter
+    def birth_date(self, value: datetime) -> None:
+        self._birth_date = value
+
+    @property
+    def death_date(self) -> datetime | None:
+        if type(self._death_date) is str:
+            self._death_date = datetime.fromisoformat(self._death_date)
+        return self._death_date
+
+    @death_date.setter
+    def death_date(self, value: datetime | None) -> None:
+        self._death_date = value
+
+    @property
+    def status(self) -> PersonStatus | None:
+        if type(self._status) is str:
+            self._status = _STATUSES.get(self._status)
+        return self._status
+
+    @status.setter
+    def status(self, value: PersonStatus) -> None:
+        self._status = value
 
     def __str__(self) -> str:
         return (
@@ -44,6 +93,8 @@ class Person:
         )
 
 class Doctor(BaseEntity):
+    __slots__ = ("name", "gender", "birth_date", "expertise")
+
     def __init__(
         self, name: str, gender: Gender, birth_date: datetime, expertise: Expertise
     ) -> None:
@@ -0,0 +1,82 @@
+from src.models.person import Person
+
+
+class SnapshotDelta:
+    __slots__ = ("added", "removed", "changed")
+
+    def __init__(self, added: set[int], removed: set[int], changed: set[int]) -> None:
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __str__(self) -> str:
+        return f"added: {len(self.added)} - removed: {len(self.removed)} - changed: {len(self.changed)}"
+
+
+class PersonCache:
+    """
+    keeps the Person objects of the last ingested snapshot keyed by id. a record
+    that is identical to the cached one reuses the cached Person, only new or
+    changed records are parsed again.
+    """
+
+    def __init__(self) -> None:
+        self._persons: dict[int, Person] = dict()
+        self._records: dict[int, tuple] = dict()
+
+    def __len__(self) -> int:
+        return len(self._persons)
+
+    def get(self, person_id: int) -> Person | None:
+        return self._persons.get(person_id)
+
+    def ingest(self, records: list[dict]) -> tuple[list[Person], SnapshotDelta]:
+        session = self.begin()
+        session.add_many(records)
+        return session.finish()
+
+    def begin(self) -> "IngestSession":
+        # a snapshot that arrives in pieces, the cache changes on finish()
+        return IngestSession(self)
+
+
+class IngestSession:
+    __slots__ = ("cache", "persons", "fields", "added", "changed")
+
+    def __init__(self, cache: PersonCache) -> None:
+        self.cache = cache
+        self.persons: dict[int, Person] = dict()
+        self.fields: dict[int, tuple] = dict()
+        self.added: set[int] = set()
+        self.changed: set[int] = set()
+
+    def add_many(self, records: list[dict]) -> list[Person]:
+        # returns the persons of `records` that are new or changed
+        cached_records, cached_persons = self.cache._records, self.cache._persons
+        persons, fields = self.persons, self.fields
+        fresh: list[Person] = []
+        for record in records:
+            person_id = record["id"]
+            key = (
+                record["name"],
+                record["gender"],
+                record["birth_date"],
+                record["national_code"],
+                record["status"],
+                record.get("death_date"),
+            )
+            previous = cached_records.get(person_id)
+            if previous == key:
+                persons[person_id] = cached_persons[person_id]
+            else:
+                person = persons[person_id] = Person(person_id, *key)
+                (self.added if previous is None else self.changed).add(person_id)
+                fresh.append(person)
+            fields[person_id] = key
+        return fresh
+
+    def finish(self) -> tuple[list[Person], SnapshotDelta]:
+        removed = self.cache._records.keys() - self.fields.keys()
+        self.cache._persons = self.persons
+        self.cache._records = self.fields
+        return list(self.persons.values()), SnapshotDelta(self.added, set(removed), self.changed)
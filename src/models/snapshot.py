@@ -1,10 +1,17 @@
-from datetime import datetime
+import logging
+from time import perf_counter
+from typing import Callable
 
 from src.models.person import Person
+from src.models.person_cache import PersonCache, SnapshotDelta
+from src.utils import clock
+from src.utils.json_stream import ArrayStreamDecoder
 from src.utils.logger import get_logger
+from src.utils.metrics import registry
 
 
 logger = get_logger(__name__)
+parse_seconds = registry.histogram("snapshot_parse_seconds", "time spent decoding snapshots")
 
 
 class Snapshot:
@@ -12,15 +19,30 @@ class Snapshot:
         self.id = id
         self.persons = persons
         self.earthquake_status = earthquake_status
-        self.creation_date = datetime.now()
-        persons_id = list(map(lambda x: x.id, persons))
-        logger.info("new snap shot was created")
+        self.creation_date = clock.now()
+        # set when the snapshot was built incrementally from a PersonCache
+        self.delta: SnapshotDelta | None = None
         logger.info(
-            f"snapshpt_id: {id} - persons_id: {persons_id} - earthquake: {earthquake_status}"
+            "new snap shot was created - snapshpt_id: %s - persons: %s - earthquake: %s",
+            id, len(persons), earthquake_status,
         )
+        # the full id list is only built when someone is reading debug logs
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("snapshpt_id: %s - persons_id: %s", id, [person.id for person in persons])
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, person_cache: PersonCache | None = None):
+        with parse_seconds.time():
+            return cls._from_dict(data, person_cache)
+
+    @classmethod
+    def _from_dict(cls, data, person_cache: PersonCache | None = None):
+        if person_cache is not None:
+            persons, delta = person_cache.ingest(data["persons"])
+            snapshot = cls(data["id"], persons, data["earthquake_status"])
+            snapshot.delta = delta
+            logger.info("snapshot_id: %s - %s", snapshot.id, delta)
+            return snapshot
         persons = [Person(person["id"], person["name"], person["gender"], person["birth_date"], person["national_code"], person["status"]) for person in data["persons"]]
         return cls(data["id"], persons, data["earthquake_status"])
 
@@ -31,3 +53,54 @@ class Snapshot:
             f"Earthquake Status: {'Active' if self.earthquake_status else 'Inactive'}\n"
             f"Creation Date: {self.creation_date.strftime('%Y-%m-%d %H:%M:%S')}"
         )
+
+
+class SnapshotReader:
+    """
+    builds a Snapshot from a response body that arrives in chunks. persons are
+    handed to the PersonCache as soon as they are decoded and the new or
+    changed ones go to `on_persons` right away, so admission can start before
+    the rest of the body is there. finish() returns the snapshot with its delta.
+    """
+
+    def __init__(self, person_cache: PersonCache, on_persons: Callable[[list[Person]], None] | None = None) -> None:
+        self.person_cache = person_cache
+        self.on_persons = on_persons
+        self._decoder = ArrayStreamDecoder("persons")
+        self._session = person_cache.begin()
+        # top level fields of a body that was handed over decoded
+        self._fields: dict | None = None
+        # decoding time only, waiting for the network is not parsing
+        self._seconds = 0.0
+
+    def _add(self, records: list[dict]) -> None:
+        persons = self._session.add_many(records)
+        if persons and self.on_persons is not None:
+            self.on_persons(persons)
+
+    def feed(self, chunk: bytes) -> None:
+        start = perf_counter()
+        records = self._decoder.feed(chunk)
+        if records:
+            self._add(records)
+        self._seconds += perf_counter() - start
+
+    def feed_document(self, data: dict) -> None:
+        # a body that is already decoded, as from an in-process world model
+        start = perf_counter()
+        self._fields = data
+        self._add(data["persons"])
+        self._seconds += perf_counter() - start
+
+    def finish(self) -> Snapshot:
+        start = perf_counter()
+        fields = self._fields
+        if fields is None:
+            self._decoder.close()
+            fields = self._decoder.fields
+        persons, delta = self._session.finish()
+        snapshot = Snapshot(fields["id"], persons, fields["earthquake_status"])
+        snapshot.delta = delta
+        logger.info("snapshot_id: %s - %s", snapshot.id, delta)
+        parse_seconds.observe(self._seconds + perf_counter() - start)
+        return snapshot
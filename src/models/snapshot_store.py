@@ -0,0 +1,141 @@
+import sys
+import threading
+from array import array
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+
+from src.models.snapshot import Snapshot
+import src.config as config
+
+
+class CompactSnapshot:
+    """
+    an aged out snapshot. only the person ids that were added and removed
+    compared to the previous snapshot are kept.
+    """
+
+    __slots__ = ("id", "earthquake_status", "creation_date", "added", "removed")
+
+    def __init__(
+        self, id: int, earthquake_status: bool, creation_date: datetime, added: array, removed: array
+    ) -> None:
+        self.id = id
+        self.earthquake_status = earthquake_status
+        self.creation_date = creation_date
+        self.added = added
+        self.removed = removed
+
+
+class SnapshotStore:
+    """
+    bounded snapshot history. the newest snapshots are kept in full, either the
+    last `max_full` of them or the ones younger than `max_age_seconds`, older ones
+    are compacted into id diffs and only the last `max_compact` diffs are kept.
+    """
+
+    def __init__(
+        self,
+        max_full: int = config.SNAPSHOT_RETENTION_COUNT,
+        max_age_seconds: float | None = config.SNAPSHOT_RETENTION_SECONDS,
+        max_compact: int = config.SNAPSHOT_COMPACT_RETENTION_COUNT,
+    ) -> None:
+        self.max_full = max_full
+        self.max_age_seconds = max_age_seconds
+        self.max_compact = max_compact
+
+        self._full: OrderedDict[int, Snapshot] = OrderedDict()
+        self._compact: deque[CompactSnapshot] = deque()
+        self._compact_index: dict[int, CompactSnapshot] = dict()
+        # person ids before the oldest compact snapshot and after the newest one
+        self._base_ids: set[int] = set()
+        self._tail_ids: set[int] = set()
+        self._lock = threading.Lock()
+
+    def add(self, snapshot: Snapshot) -> None:
+        with self._lock:
+            self._full.pop(snapshot.id, None)
+            self._full[snapshot.id] = snapshot
+            self._apply_retention(snapshot.creation_date)
+
+    @property
+    def latest(self) -> Snapshot | None:
+        with self._lock:
+            return next(reversed(self._full.values()), None)
+
+    def get(self, snapshot_id: int) -> Snapshot | CompactSnapshot | None:
+        with self._lock:
+            return self._full.get(snapshot_id) or self._compact_index.get(snapshot_id)
+
+    def persons_id(self, snapshot_id: int) -> list[int] | None:
+        with self._lock:
+            snapshot = self._full.get(snapshot_id)
+            if snapshot is not None:
+                return [person.id for person in snapshot.persons]
+            if snapshot_id not in self._compact_index:
+                return None
+            ids = set(self._base_ids)
+            for compact in self._compact:
+                ids.difference_update(compact.removed)
+                ids.update(compact.added)
+                if compact.id == snapshot_id:
+                    return sorted(ids)
+
+    def __contains__(self, snapshot_id: int) -> bool:
+        return snapshot_id in self._full or snapshot_id in self._compact_index
+
+    def __len__(self) -> int:
+        return len(self._full) + len(self._compact)
+
+    def memory_stats(self) -> dict:
+        with self._lock:
+            full_persons = sum(len(snapshot.persons) for snapshot in self._full.values())
+            compact_ids = sum(len(c.added) + len(c.removed) for c in self._compact)
+            compact_bytes = sum(
+                sys.getsizeof(c) + sys.getsizeof(c.added) + sys.getsizeof(c.removed) for c in self._compact
+            )
+            return {
+                "full_snapshots": len(self._full),
+                "compact_snapshots": len(self._compact),
+                "full_persons": full_persons,
+                "compact_person_ids": compact_ids,
+                "compact_bytes": compact_bytes,
+                "id_set_bytes": sys.getsizeof(self._base_ids) + sys.getsizeof(self._tail_ids),
+            }
+
+    # ==retention=============================================================
+    def _apply_retention(self, now: datetime) -> None:
+        oldest_allowed = None
+        if self.max_age_seconds is not None:
+            oldest_allowed = now - timedelta(seconds=self.max_age_seconds)
+
+        # the newest snapshot is always kept in full
+        while len(self._full) > 1:
+            oldest = next(iter(self._full.values()))
+            too_many = len(self._full) > self.max_full
+            too_old = oldest_allowed is not None and oldest.creation_date < oldest_allowed
+            if not (too_many or too_old):
+                break
+            self._full.popitem(last=False)
+            self._compact_snapshot(oldest)
+
+        while len(self._compact) > self.max_compact:
+            dropped = self._compact.popleft()
+            del self._compact_index[dropped.id]
+            self._base_ids.difference_update(dropped.removed)
+            self._base_ids.update(dropped.added)
+
+    def _compact_snapshot(self, snapshot: Snapshot) -> None:
+        ids = {person.id for person in snapshot.persons}
+        compact = CompactSnapshot(
+            snapshot.id,
+            snapshot.earthquake_status,
+            snapshot.creation_date,
+            array("q", sorted(ids - self._tail_ids)),
+            array("q", sorted(self._tail_ids - ids)),
+        )
+        self._tail_ids = ids
+        if self.max_compact <= 0:
+            self._base_ids = ids
+            return
+        self._compact.append(compact)
+        self._compact_index[compact.id] = compact
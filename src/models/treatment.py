@@ -1,13 +1,23 @@
-import random
 from datetime import datetime, timedelta
 
 from src.models.base_model import BaseEntity
 from src.models.enums import TreatmentType
 import src.config as config
+from src.utils import random_streams
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# inclusive duration range in seconds per treatment type, before the time rate.
+# wound care always takes one second, whatever the time rate. the single and the
+# batched draws (src/models/treatment_batch.py) both read it from here
+DURATION_RANGES = {
+    TreatmentType.FRACTURE_TREATMENT: (6, 8),
+    TreatmentType.WOUND_CARE: (1, 1),
+    TreatmentType.PHYSIOTHERAPY: (2, 4),
+    TreatmentType.BURN_TREATMENT: (1, 4),
+    TreatmentType.DISLOCATION_TREATMENT: (3, 5),
+}
 
 
 class RandomTreatmentType:
@@ -17,41 +27,66 @@ class RandomTreatmentType:
 
     @staticmethod
     def generate():
-        return random.choice(tuple(RandomTreatmentType._available_treatment_types))
+        return random_streams.stream("treatment_type").choice(RandomTreatmentType._available_treatment_types)
 
 
 class Treatment(BaseEntity):
+    __slots__ = (
+        "patient_id", "doctor_id", "treatment_type", "start_date",
+        "duration", "is_dead", "death_offset_seconds", "end_date",
+    )
+
     def __init__(self, patient_id: int, doctor_id: int, treatment_type: TreatmentType, time_rate: int) -> None:
         super().__init__()
         self.patient_id = patient_id
         self.doctor_id = doctor_id
         self.treatment_type = treatment_type
-        self.start_date = datetime.now()
+        self.start_date = self.creation_date
         self.duration = self.__estimate_duration(time_rate)
         self.is_dead, self.death_offset_seconds = self.__death_during_treatment()
         if self.is_dead and self.death_offset_seconds:
             self.duration = self.death_offset_seconds
         self.end_date = self.start_date + timedelta(seconds=self.duration)
         
-        logger.info(f"treatmeant created: patient_id={self.patient_id} - duration = {self.duration} - healthy = {not self.is_dead}")
+        logger.info(
+            "treatmeant created: patient_id=%s - duration = %s - healthy = %s",
+            self.patient_id, self.duration, not self.is_dead,
+            extra={"sample_key": "treatment"},
+        )
+
+    @classmethod
+    def restore(
+        cls,
+        patient_id: int,
+        doctor_id: int,
+        treatment_type: TreatmentType,
+        start_date: datetime,
+        end_date: datetime,
+        is_dead: bool,
+    ) -> "Treatment":
+        # rebuilds a journaled treatment with a fresh id, nothing is drawn at random
+        treatment = cls.__new__(cls)
+        BaseEntity.__init__(treatment, start_date)
+        treatment.patient_id = patient_id
+        treatment.doctor_id = doctor_id
+        treatment.treatment_type = treatment_type
+        treatment.start_date = start_date
+        treatment.end_date = end_date
+        treatment.duration = round((end_date - start_date).total_seconds())
+        treatment.is_dead = is_dead
+        treatment.death_offset_seconds = treatment.duration if is_dead else None
+        return treatment
 
     def __estimate_duration(self, time_rate: int) -> int:
-        match self.treatment_type:
-            case TreatmentType.FRACTURE_TREATMENT:
-                return round(random.randint(6, 8) / time_rate)
-            case TreatmentType.PHYSIOTHERAPY:
-                return round(random.randint(2, 4) / time_rate)
-            case TreatmentType.BURN_TREATMENT:
-                return round(random.randint(1, 4) / time_rate)
-            case TreatmentType.DISLOCATION_TREATMENT:
-                return round(random.randint(3, 5) / time_rate)
-            case _:    
-                # added to prevent linter warning 
-                return 1
+        if self.treatment_type == TreatmentType.WOUND_CARE:
+            return 1
+        low, high = DURATION_RANGES[self.treatment_type]
+        return round(random_streams.stream("treatment_duration").randint(low, high) / time_rate)
 
     def __death_during_treatment(self) -> (bool, int):  # type: ignore
-        if random.random() < config.DEATH_RATE:
-            death_offset_seconds : int = random.randint(0, self.duration)
+        rng = random_streams.stream("treatment_death")
+        if rng.random() < config.DEATH_RATE:
+            death_offset_seconds : int = rng.randint(0, self.duration)
             return True, death_offset_seconds
         return False, None
 
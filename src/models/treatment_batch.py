@@ -0,0 +1,124 @@
+"""
+treatment draws for many patients at once, kept as columns: treatment type,
+duration, death and death offset per patient. the distributions are the ones
+Treatment draws one patient at a time, durations come from the same
+DURATION_RANGES.
+
+with numpy installed, batches of TREATMENT_BATCH_NUMPY_MIN patients or more
+are drawn as arrays. numpy is optional, without it (and for small batches,
+where setting up the arrays costs more than it saves) the columns are drawn
+in one python loop. both draw from the "treatment_batch" random stream, but a
+seeded run only repeats on a machine with the same numpy availability.
+the treatment types can be given instead of drawn, the rest is drawn for them.
+"""
+
+from datetime import datetime, timedelta
+
+from src.models.enums import TreatmentType
+from src.models.treatment import DURATION_RANGES, RandomTreatmentType, Treatment
+from src.utils import clock, random_streams
+from src.utils.logger import get_logger
+import src.config as config
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+logger = get_logger(__name__)
+
+TREATMENT_TYPES = RandomTreatmentType._available_treatment_types
+_LOW = [DURATION_RANGES[treatment_type][0] for treatment_type in TREATMENT_TYPES]
+_HIGH = [DURATION_RANGES[treatment_type][1] for treatment_type in TREATMENT_TYPES]
+_WOUND_CARE = TREATMENT_TYPES.index(TreatmentType.WOUND_CARE)
+
+
+def keyed_treatment_type(person_id: int) -> int:
+    # the person's injury as an index into TREATMENT_TYPES, the same wherever it is drawn
+    return int(random_streams.keyed("treatment_type", person_id) * len(TREATMENT_TYPES))
+
+
+class TreatmentBatch:
+    __slots__ = ("types", "durations", "is_dead", "death_offsets", "start_date")
+
+    def __init__(self, types, durations, is_dead, death_offsets, start_date: datetime) -> None:
+        # index into TREATMENT_TYPES, final duration (cut short by death), death flag and offset
+        self.types = types
+        self.durations = durations
+        self.is_dead = is_dead
+        self.death_offsets = death_offsets
+        self.start_date = start_date
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @classmethod
+    def draw(
+        cls, count: int, time_rate: float, start_date: datetime | None = None, types: list[int] | None = None
+    ) -> "TreatmentBatch":
+        # `types` are indexes into TREATMENT_TYPES, one per patient
+        if start_date is None:
+            start_date = clock.now()
+        if numpy is not None and count >= config.TREATMENT_BATCH_NUMPY_MIN:
+            batch = cls(*cls._draw_numpy(count, time_rate, types), start_date)
+        else:
+            batch = cls(*cls._draw_python(count, time_rate, types), start_date)
+        logger.debug("drew %s treatments at once", count)
+        return batch
+
+    @staticmethod
+    def _draw_numpy(count: int, time_rate: float, given: list[int] | None) -> tuple:
+        generator = numpy.random.default_rng(random_streams.stream("treatment_batch").getrandbits(64))
+        if given is None:
+            types = generator.integers(0, len(TREATMENT_TYPES), count)
+        else:
+            types = numpy.array(given, dtype=numpy.int64)
+        low, high = numpy.array(_LOW)[types], numpy.array(_HIGH)[types]
+        # rint rounds half to even like round()
+        durations = numpy.rint(generator.integers(low, high, endpoint=True) / time_rate).astype(numpy.int64)
+        durations[types == _WOUND_CARE] = 1
+        is_dead = generator.random(count) < config.DEATH_RATE
+        offsets = generator.integers(0, durations, endpoint=True)
+        # a death at offset 0 keeps the full duration, as in Treatment
+        durations = numpy.where(is_dead & (offsets > 0), offsets, durations)
+        # materialized once, the hospital reads single patients from here on
+        return types.tolist(), durations.tolist(), is_dead.tolist(), offsets.tolist()
+
+    @staticmethod
+    def _draw_python(count: int, time_rate: float, given: list[int] | None) -> tuple:
+        rng = random_streams.stream("treatment_batch")
+        randrange, random = rng.randrange, rng.random
+        choices = len(TREATMENT_TYPES)
+        death_rate = config.DEATH_RATE
+        types, durations, is_dead, offsets = [], [], [], []
+        for row in range(count):
+            index = randrange(choices) if given is None else given[row]
+            duration = 1 if index == _WOUND_CARE else round(randrange(_LOW[index], _HIGH[index] + 1) / time_rate)
+            dead = random() < death_rate
+            offset = randrange(duration + 1) if dead else 0
+            types.append(index)
+            durations.append(offset if dead and offset else duration)
+            is_dead.append(dead)
+            offsets.append(offset)
+        return types, durations, is_dead, offsets
+
+    def treatment_type(self, index: int) -> TreatmentType:
+        return TREATMENT_TYPES[self.types[index]]
+
+    def build(self, index: int, treatment_id: int, patient_id: int, doctor_id: int) -> Treatment:
+        # the treatment of patient `index`, nothing is drawn at random anymore
+        treatment = Treatment.__new__(Treatment)
+        duration = self.durations[index]
+        dead = self.is_dead[index]
+        treatment.id = treatment_id
+        treatment.creation_date = treatment.modified_date = self.start_date
+        treatment.patient_id = patient_id
+        treatment.doctor_id = doctor_id
+        treatment.treatment_type = TREATMENT_TYPES[self.types[index]]
+        treatment.start_date = self.start_date
+        treatment.duration = duration
+        treatment.is_dead = dead
+        treatment.death_offset_seconds = self.death_offsets[index] if dead else None
+        treatment.end_date = self.start_date + timedelta(seconds=duration)
+        return treatment
@@ -0,0 +1,282 @@
+"""
+sqlite history of treatments and discharges. rows are queued by the hospital
+and written by one background thread in batched transactions, the database
+runs in wal mode so queries from other threads never block the writer.
+
+discharges repeat the doctor, expertise and treatment type of their treatment,
+so questions like "deaths under plastic surgery this hour" are answered from
+one indexed table. several hospitals can share a store, every row carries the
+hospital name.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from src.models.discharge import Discharge
+from src.models.enums import DischargeStatus, Expertise, TreatmentType
+from src.models.treatment import Treatment
+from src.utils.logger import get_logger
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS treatments (
+    row_id INTEGER PRIMARY KEY,
+    hospital TEXT NOT NULL,
+    treatment_id INTEGER NOT NULL,
+    patient_id INTEGER NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    expertise TEXT NOT NULL,
+    treatment_type TEXT NOT NULL,
+    start_date REAL NOT NULL,
+    end_date REAL NOT NULL,
+    duration REAL NOT NULL,
+    is_dead INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS treatments_patient ON treatments (hospital, patient_id);
+CREATE INDEX IF NOT EXISTS treatments_doctor ON treatments (hospital, doctor_id, start_date);
+CREATE INDEX IF NOT EXISTS treatments_type ON treatments (hospital, treatment_type, start_date);
+CREATE INDEX IF NOT EXISTS treatments_start ON treatments (hospital, start_date, treatment_type, duration);
+CREATE INDEX IF NOT EXISTS treatments_end ON treatments (hospital, end_date);
+
+CREATE TABLE IF NOT EXISTS discharges (
+    row_id INTEGER PRIMARY KEY,
+    hospital TEXT NOT NULL,
+    discharge_id INTEGER NOT NULL,
+    treatment_id INTEGER NOT NULL,
+    patient_id INTEGER NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    expertise TEXT NOT NULL,
+    treatment_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    discharge_date REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS discharges_patient ON discharges (hospital, patient_id);
+CREATE INDEX IF NOT EXISTS discharges_doctor ON discharges (hospital, doctor_id, discharge_date);
+CREATE INDEX IF NOT EXISTS discharges_status ON discharges (hospital, status, discharge_date);
+CREATE INDEX IF NOT EXISTS discharges_expertise ON discharges (hospital, expertise, status, discharge_date);
+CREATE INDEX IF NOT EXISTS discharges_type ON discharges (hospital, treatment_type, discharge_date);
+
+-- running totals per treatment type, kept up to date by the writer
+CREATE TABLE IF NOT EXISTS treatment_totals (
+    hospital TEXT NOT NULL,
+    treatment_type TEXT NOT NULL,
+    treatments INTEGER NOT NULL,
+    total_duration REAL NOT NULL,
+    PRIMARY KEY (hospital, treatment_type)
+);
+"""
+
+_INSERT_TREATMENT = "INSERT INTO treatments VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_DISCHARGE = "INSERT INTO discharges VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_UPDATE_TOTALS = """
+INSERT INTO treatment_totals VALUES (?, ?, ?, ?)
+ON CONFLICT (hospital, treatment_type) DO UPDATE SET
+    treatments = treatments + excluded.treatments,
+    total_duration = total_duration + excluded.total_duration
+"""
+
+
+def _status_name(status: DischargeStatus) -> str:
+    return status.name.lower()
+
+
+def _range_clause(column: str, since: datetime | None, until: datetime | None, params: list) -> str:
+    clause = ""
+    if since is not None:
+        clause += f" AND {column} >= ?"
+        params.append(since.timestamp())
+    if until is not None:
+        clause += f" AND {column} < ?"
+        params.append(until.timestamp())
+    return clause
+
+
+class TreatmentStore:
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = config.STORE_FLUSH_INTERVAL,
+        batch_size: int = config.STORE_BATCH_SIZE,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        # ("treatment" | "discharge", row) or a threading.Event asking for a flush
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._stop = threading.Event()
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.commit()
+        self._thread = threading.Thread(target=self._run, name="treatment-store")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # with wal a commit only waits on the log write, checkpoints fsync
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        # one connection per querying thread, wal readers do not block each other
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    # ==writing=============================================================
+    def add_treatment(self, hospital: str, treatment: Treatment, expertise: Expertise) -> None:
+        self._queue.put(("treatment", (
+            hospital, treatment.id, treatment.patient_id, treatment.doctor_id, expertise.value,
+            treatment.treatment_type.value, treatment.start_date.timestamp(), treatment.end_date.timestamp(),
+            treatment.duration, int(treatment.is_dead),
+        )))
+
+    def add_discharge(self, hospital: str, discharge: Discharge, treatment: Treatment, expertise: Expertise) -> None:
+        self._queue.put(("discharge", (
+            hospital, discharge.id, treatment.id, treatment.patient_id, treatment.doctor_id, expertise.value,
+            treatment.treatment_type.value, _status_name(discharge.discharge_status),
+            discharge.discharge_date.timestamp(),
+        )))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        # waits until everything queued so far is committed
+        if not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        connection = self._connect()
+        while True:
+            treatments, discharges, waiters = [], [], []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stop.is_set():
+                    break
+                continue
+            # rows keep coming into the same transaction until the interval is over,
+            # the batch is full or someone waits on a flush
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item[0] == "treatment":
+                    treatments.append(item[1])
+                else:
+                    discharges.append(item[1])
+                if waiters or self._stop.is_set() or len(treatments) + len(discharges) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            try:
+                with connection:
+                    connection.executemany(_INSERT_TREATMENT, treatments)
+                    connection.executemany(_INSERT_DISCHARGE, discharges)
+                    connection.executemany(_UPDATE_TOTALS, self._totals(treatments))
+            except sqlite3.Error as error:
+                logger.error(f"failed to write {len(treatments) + len(discharges)} rows to {self.path} - {error}")
+            for waiter in waiters:
+                waiter.set()
+        connection.close()
+
+    @staticmethod
+    def _totals(treatments: list[tuple]) -> list[tuple]:
+        totals: dict[tuple[str, str], list] = {}
+        for row in treatments:
+            total = totals.setdefault((row[0], row[5]), [0, 0.0])
+            total[0] += 1
+            total[1] += row[8]
+        return [(hospital, treatment_type, count, duration) for (hospital, treatment_type), (count, duration) in totals.items()]
+
+    def close(self) -> None:
+        # shared stores are closed by every owner, only the first call does anything
+        if self._stop.is_set():
+            return
+        self.flush()
+        self._stop.set()
+        self._thread.join()
+
+    # ==queries=============================================================
+    def _query(self, sql: str, params: list) -> list[tuple]:
+        return self._reader().execute(sql, params).fetchall()
+
+    def count_discharges(
+        self,
+        hospital: str,
+        status: DischargeStatus | None = None,
+        expertise: Expertise | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> int:
+        params: list = [hospital]
+        sql = "SELECT COUNT(*) FROM discharges WHERE hospital = ?"
+        if expertise is not None:
+            sql += " AND expertise = ?"
+            params.append(expertise.value)
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(_status_name(status))
+        sql += _range_clause("discharge_date", since, until, params)
+        return self._query(sql, params)[0][0]
+
+    def average_duration_by_type(
+        self, hospital: str, since: datetime | None = None, until: datetime | None = None
+    ) -> dict[TreatmentType, float]:
+        params: list = [hospital]
+        if since is None and until is None:
+            sql = "SELECT treatment_type, total_duration / treatments FROM treatment_totals WHERE hospital = ?"
+        else:
+            sql = (
+                "SELECT treatment_type, AVG(duration) FROM treatments WHERE hospital = ?"
+                + _range_clause("start_date", since, until, params)
+                + " GROUP BY treatment_type"
+            )
+        return {TreatmentType(treatment_type): average for treatment_type, average in self._query(sql, params)}
+
+    def outcomes_by_expertise(
+        self, hospital: str, since: datetime | None = None, until: datetime | None = None
+    ) -> dict[Expertise, dict[str, int]]:
+        params: list = [hospital]
+        sql = (
+            "SELECT expertise, status, COUNT(*) FROM discharges WHERE hospital = ?"
+            + _range_clause("discharge_date", since, until, params)
+            + " GROUP BY expertise, status"
+        )
+        outcomes: dict[Expertise, dict[str, int]] = {}
+        for expertise, status, count in self._query(sql, params):
+            outcomes.setdefault(Expertise(expertise), {})[status] = count
+        return outcomes
+
+    def doctor_workload(
+        self, hospital: str, since: datetime | None = None, until: datetime | None = None
+    ) -> dict[int, int]:
+        params: list = [hospital]
+        sql = (
+            "SELECT doctor_id, COUNT(*) FROM treatments WHERE hospital = ?"
+            + _range_clause("start_date", since, until, params)
+            + " GROUP BY doctor_id"
+        )
+        return dict(self._query(sql, params))
+
+    def patient_history(self, hospital: str, patient_id: int) -> list[dict]:
+        cursor = self._reader().execute(
+            "SELECT treatment_id, doctor_id, expertise, treatment_type, start_date, end_date, duration, is_dead"
+            " FROM treatments WHERE hospital = ? AND patient_id = ? ORDER BY start_date",
+            (hospital, patient_id),
+        )
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
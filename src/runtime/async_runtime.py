@@ -0,0 +1,145 @@
+"""
+asyncio runtime for the hospital agent. snapshot, admit and discharge run as
+independent coroutines over one pooled http client, so a slow endpoint only
+delays its own loop.
+"""
+
+import asyncio
+import signal
+import time
+
+from src.models.hospital import Hospital
+from src.utils.discharge_scheduler import DischargeScheduler
+from src.utils.http_client import AsyncWorldModelClient
+from src.utils.logger import get_logger
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+
+async def at_fixed_rate(func, interval):
+    # ticks follow the loop's own timeline so call latency does not add up as drift
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while True:
+        try:
+            await func()
+        except Exception as error:
+            logger.error(f"{func.__name__} tick failed - {error}")
+        next_tick += interval()
+        now = loop.time()
+        if next_tick < now:
+            next_tick = now
+        await asyncio.sleep(next_tick - now)
+
+
+async def take_snapshot(hospital: Hospital):
+    await at_fixed_rate(hospital.async_take_snapshot, hospital.polling.snapshot_interval)
+
+
+async def admit_patient(hospital: Hospital):
+    await at_fixed_rate(hospital.async_admit_patient, hospital.polling.admit_interval)
+
+
+async def discharge_patient(scheduler: DischargeScheduler):
+    # entries carry their owning hospital, so one loop serves a shared scheduler too
+    max_batch_size = config.DISCHARGE_BATCH_MAX_SIZE
+    in_flight: set[asyncio.Task] = set()
+    pending: dict[Hospital, list] = {}
+    first_pending: dict[Hospital, float] = {}
+
+    def enqueue(hospital: Hospital, items: list) -> None:
+        if hospital not in pending:
+            pending[hospital] = []
+            first_pending[hospital] = time.monotonic()
+        pending[hospital].extend(items)
+
+    async def send(hospital: Hospital, batch: list) -> None:
+        # failed discharges come back through the scheduler once their backoff ran out
+        await hospital.async_discharge_batch(batch)
+
+    def flush(hospital: Hospital) -> None:
+        batch = pending.pop(hospital)
+        for start in range(0, len(batch), max_batch_size):
+            task = asyncio.create_task(send(hospital, batch[start:start + max_batch_size]))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    try:
+        while True:
+            for treatment_id, (hospital, status, count) in scheduler.pop_due():
+                enqueue(hospital, [(treatment_id, status, count)])
+
+            delay = config.DISCHARGE_POLL_INTERVAL
+            now = time.monotonic()
+            for hospital in list(pending):
+                window_left = first_pending[hospital] + config.DISCHARGE_BATCH_WINDOW - now
+                if len(pending[hospital]) < max_batch_size and window_left > 0:
+                    delay = min(window_left, delay)
+                    continue
+                flush(hospital)
+
+            next_due = scheduler.next_due()
+            if next_due is not None:
+                delay = min(max(next_due - time.time(), 0), delay)
+            await asyncio.sleep(delay)
+    finally:
+        # on shutdown send what is still buffered or in flight instead of dropping it
+        while pending or in_flight:
+            for hospital in list(pending):
+                flush(hospital)
+            await asyncio.gather(*list(in_flight), return_exceptions=True)
+
+
+def shutdown_event() -> asyncio.Event:
+    shutdown = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, shutdown.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    return shutdown
+
+
+async def run(hospital: Hospital):
+    if hospital.async_client is None:
+        hospital.async_client = AsyncWorldModelClient(hospital.url)
+    shutdown = shutdown_event()
+
+    tasks = []
+    try:
+        await hospital.async_register()
+        tasks = [
+            asyncio.create_task(take_snapshot(hospital)),
+            asyncio.create_task(admit_patient(hospital)),
+            asyncio.create_task(discharge_patient(hospital.discharge_scheduler)),
+        ]
+        await shutdown.wait()
+        logger.info("shutting down")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await drain(hospital.discharge_scheduler)
+        hospital.close()
+        await hospital.async_client.close()
+
+
+async def drain(scheduler: DischargeScheduler, timeout: float = config.SHUTDOWN_DRAIN_TIMEOUT):
+    # reports treatments that end (and discharge retries due) within the timeout before the client is closed
+    deadline = time.time() + timeout
+    while True:
+        pending: dict[Hospital, list] = {}
+        for treatment_id, (hospital, status, count) in scheduler.pop_due():
+            pending.setdefault(hospital, []).append((treatment_id, status, count))
+        for hospital, items in pending.items():
+            for start in range(0, len(items), config.DISCHARGE_BATCH_MAX_SIZE):
+                await hospital.async_discharge_batch(items[start:start + config.DISCHARGE_BATCH_MAX_SIZE])
+        next_due = scheduler.next_due()
+        if next_due is None or next_due > deadline:
+            break
+        await asyncio.sleep(max(next_due - time.time(), 0))
+    if scheduler.pending:
+        logger.info(f"{scheduler.pending} treatments still running or waiting for a retry at shutdown")
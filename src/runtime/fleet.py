@@ -0,0 +1,170 @@
+"""
+fleet mode: many hospitals in one process on the asyncio runtime. all of them
+share one discharge scheduler and one http connection pool. with
+`share_snapshots` a single snapshot fetch per tick, of the first hospital, is
+parsed once and fed to every hospital at the pace of the fastest one. that is
+only right when the world model answers every hospital of the fleet with the
+same persons, so it is off unless the fleet file turns it on.
+
+fleet files are json:
+
+    {
+        "share_snapshots": true,
+        "hospitals": [
+            {"name": "north", "max_capacity": 20},
+            {"name": "south", "max_capacity": 15, "doctors": [
+                {"name": "Sophia Williams", "gender": "female", "birth_date": "1985-06-15", "expertise": "Orthopedics"}
+            ]}
+        ]
+    }
+
+hospitals without a doctor roster get the default one.
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+from src.models.enums import Expertise, Gender
+from src.models.hospital import Hospital
+from src.models.hospital_journal import HospitalJournal
+from src.models.person import Doctor
+from src.models.person_cache import PersonCache
+from src.models.snapshot import SnapshotReader
+from src.models.snapshot_store import SnapshotStore
+from src.models.treatment_store import TreatmentStore
+from src.runtime import async_runtime
+from src.utils.discharge_scheduler import DischargeScheduler
+from src.utils.http_client import AsyncWorldModelClient, WorldModelClient
+from src.utils.logger import get_logger
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+
+def _doctor_from_dict(data: dict) -> Doctor:
+    return Doctor(
+        data["name"],
+        Gender.MALE if data["gender"] == "male" else Gender.FEMALE,
+        datetime.fromisoformat(data["birth_date"]),
+        Expertise(data["expertise"]),
+    )
+
+
+class Fleet:
+    def __init__(
+        self,
+        definitions: list[dict],
+        worldmodel_baseUrl: str = config.WORLDMODEL_BASE_URL,
+        share_snapshots: bool = False,
+        journal_dir: str | None = config.JOURNAL_DIR,
+        store_path: str | None = config.STORE_PATH,
+    ) -> None:
+        self.url = worldmodel_baseUrl
+        self.share_snapshots = share_snapshots
+        self.scheduler = DischargeScheduler(Hospital.dispatch_discharge)
+        self.client = WorldModelClient(worldmodel_baseUrl)
+        self.async_client = AsyncWorldModelClient(worldmodel_baseUrl, pool_size=config.FLEET_HTTP_POOL_SIZE)
+        self.person_cache = PersonCache() if share_snapshots else None
+        self.snapshots = SnapshotStore() if share_snapshots else None
+        # one history writer for the whole fleet, rows carry the hospital name
+        self.store = TreatmentStore(store_path) if store_path else None
+
+        self.hospitals = [
+            Hospital(
+                definition["name"],
+                definition["max_capacity"],
+                worldmodel_baseUrl,
+                discharge_scheduler=self.scheduler,
+                client=self.client,
+                async_client=self.async_client,
+                doctors=[_doctor_from_dict(doctor) for doctor in definition.get("doctors", [])] or None,
+                person_cache=self.person_cache,
+                snapshots=self.snapshots,
+                journal=HospitalJournal(os.path.join(journal_dir, f"{definition['name']}.journal")) if journal_dir else None,
+                store=self.store,
+            )
+            for definition in definitions
+        ]
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        worldmodel_baseUrl: str = config.WORLDMODEL_BASE_URL,
+        journal_dir: str | None = config.JOURNAL_DIR,
+        store_path: str | None = config.STORE_PATH,
+    ) -> "Fleet":
+        with open(path) as file:
+            data = json.load(file)
+        return cls(data["hospitals"], worldmodel_baseUrl, data.get("share_snapshots", False), journal_dir, store_path)
+
+    def _offer_candidates(self, persons: list) -> None:
+        for hospital in self.hospitals:
+            hospital.offer_candidates(persons)
+
+    async def _fetch_shared_snapshot(self) -> None:
+        leader = self.hospitals[0]
+        try:
+            started = time.monotonic()
+            # every hospital sees the persons of the shared snapshot as they are decoded
+            reader = SnapshotReader(self.person_cache, self._offer_candidates)
+            status_code, body = await self.async_client.stream(f"/snapshot/{leader.id}", reader)
+            latency = time.monotonic() - started
+            for hospital in self.hospitals:
+                hospital.polling.observe_latency(latency)
+            if status_code != 200:
+                logger.error(f"faild to load snapshot - statuscode: {status_code} - message: {body['message']}")
+                return
+            snapshot = reader.finish()
+            for hospital in self.hospitals:
+                hospital.apply_snapshot(snapshot)
+        except Exception as error:
+            logger.error(f"faile to get shared snapshot from worldmodel - {error}")
+
+    def stats(self) -> dict:
+        treatments = [hospital.stats.summary()["treatments"] for hospital in self.hospitals]
+        return {
+            "hospitals": len(self.hospitals),
+            "registered": sum(hospital.registered.is_set() for hospital in self.hospitals),
+            "treatments": sum(counts["started"] for counts in treatments),
+            "discharges": sum(counts["healthy"] + counts["dead"] for counts in treatments),
+            "used_capacity": sum(hospital.used_capacity for hospital in self.hospitals),
+            "pending_discharges": self.scheduler.pending,
+        }
+
+    async def run(self, shutdown: asyncio.Event | None = None) -> None:
+        if shutdown is None:
+            shutdown = async_runtime.shutdown_event()
+        tasks = []
+        try:
+            await asyncio.gather(*(hospital.async_register() for hospital in self.hospitals))
+            logger.info(f"{len(self.hospitals)} hospitals registered")
+
+            if self.share_snapshots:
+                # the shared fetch follows the fastest hospital, a surge or free beds anywhere count
+                tasks.append(asyncio.create_task(async_runtime.at_fixed_rate(
+                    self._fetch_shared_snapshot,
+                    lambda: min(hospital.polling.snapshot_interval() for hospital in self.hospitals),
+                )))
+            else:
+                tasks.extend(asyncio.create_task(async_runtime.take_snapshot(hospital)) for hospital in self.hospitals)
+            tasks.extend(asyncio.create_task(async_runtime.admit_patient(hospital)) for hospital in self.hospitals)
+            tasks.append(asyncio.create_task(async_runtime.discharge_patient(self.scheduler)))
+
+            await shutdown.wait()
+            logger.info("shutting down fleet")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await async_runtime.drain(self.scheduler)
+            for hospital in self.hospitals:
+                hospital.close()
+            if self.store is not None:
+                self.store.close()
+            await self.async_client.close()
+            self.client.close()
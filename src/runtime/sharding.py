@@ -0,0 +1,225 @@
+"""
+sharded fleet: hospitals are spread over a pool of worker processes, each
+running its share as a Fleet on its own interpreter. hospitals are mapped to
+workers with a consistent hash ring on their name, a supervisor in the parent
+restarts crashed workers and collects the metrics they report.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.synchronize
+import os
+import queue
+import signal
+import threading
+import time
+
+from src.runtime.fleet import Fleet
+from src.utils.logger import get_logger
+from src.utils.metrics import registry
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+
+class ConsistentHashRing:
+    def __init__(self, nodes: list[int], replicas: int = 100) -> None:
+        self._ring: list[tuple[int, int]] = sorted(
+            (self._hash(f"{node}-{replica}"), node) for node in nodes for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def node_for(self, key: str) -> int:
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._ring[index][1]
+
+
+def _worker_main(
+    shard: int,
+    definitions: list[dict],
+    worldmodel_baseUrl: str,
+    share_snapshots: bool,
+    metrics_queue,
+    stop,
+    report_interval: float,
+    journal_dir: str | None = None,
+    store_path: str | None = None,
+) -> None:
+    # the parent handles SIGINT and tells workers to stop through `stop`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def main():
+        fleet = Fleet(definitions, worldmodel_baseUrl, share_snapshots, journal_dir, store_path)
+        shutdown = asyncio.Event()
+
+        async def watch_stop():
+            await asyncio.to_thread(stop.wait)
+            shutdown.set()
+
+        async def report():
+            while True:
+                stats = fleet.stats()
+                stats.update(shard=shard, pid=os.getpid(), cpu=time.process_time(), reported_at=time.time())
+                metrics_queue.put(stats)
+                await asyncio.sleep(report_interval)
+
+        helpers = [asyncio.create_task(watch_stop()), asyncio.create_task(report())]
+        try:
+            await fleet.run(shutdown)
+        finally:
+            for task in helpers:
+                task.cancel()
+            stats = fleet.stats()
+            stats.update(shard=shard, pid=os.getpid(), cpu=time.process_time(), reported_at=time.time())
+            metrics_queue.put(stats)
+
+    asyncio.run(main())
+
+
+class ShardedFleet:
+    COUNTERS = ("treatments", "discharges", "cpu")
+    GAUGES = ("hospitals", "registered", "used_capacity", "pending_discharges")
+
+    def __init__(
+        self,
+        definitions: list[dict],
+        workers: int = os.cpu_count() or 1,
+        worldmodel_baseUrl: str = config.WORLDMODEL_BASE_URL,
+        share_snapshots: bool = False,
+        report_interval: float = config.SHARD_METRICS_INTERVAL,
+        journal_dir: str | None = config.JOURNAL_DIR,
+        store_path: str | None = config.STORE_PATH,
+    ) -> None:
+        self.url = worldmodel_baseUrl
+        self.share_snapshots = share_snapshots
+        self.report_interval = report_interval
+        # a hospital stays on its shard across restarts, so a restarted worker recovers its journals
+        self.journal_dir = journal_dir
+        # every worker writes its own rows, sqlite serializes the writers on the file lock
+        self.store_path = store_path
+        self.ring = ConsistentHashRing(list(range(workers)))
+        self.shards: dict[int, list[dict]] = {shard: [] for shard in range(workers)}
+        for definition in definitions:
+            self.shards[self.ring.node_for(definition["name"])].append(definition)
+
+        self._context = multiprocessing.get_context("spawn")
+        # every worker incarnation gets its own stop event and metrics queue, a
+        # killed worker can leave shared multiprocessing locks held forever
+        self._processes: dict[int, multiprocessing.Process] = {}
+        self._stops: dict[int, multiprocessing.synchronize.Event] = {}
+        self._queues: dict[int, multiprocessing.queues.Queue] = {}
+        self.restarts: dict[int, int] = {shard: 0 for shard in self.shards}
+        self.shard_metrics: dict[int, dict] = {}
+        # counters reported by worker incarnations that crashed
+        self._retired: dict[str, float] = {key: 0 for key in self.COUNTERS}
+        self.shutdown_event = threading.Event()
+
+        # workers keep their own registries, the parent exports the aggregated reports
+        for key in ("workers", "restarts") + self.COUNTERS + self.GAUGES:
+            registry.gauge(f"sharded_fleet_{key}", f"{key} summed over the worker reports").set_function(
+                lambda key=key: self.metrics().get(key, 0)
+            )
+
+    @classmethod
+    def from_file(
+        cls,
+        path: str,
+        workers: int,
+        worldmodel_baseUrl: str = config.WORLDMODEL_BASE_URL,
+        journal_dir: str | None = config.JOURNAL_DIR,
+        store_path: str | None = config.STORE_PATH,
+    ) -> "ShardedFleet":
+        with open(path) as file:
+            data = json.load(file)
+        return cls(
+            data["hospitals"], workers, worldmodel_baseUrl, data.get("share_snapshots", False),
+            journal_dir=journal_dir, store_path=store_path,
+        )
+
+    def _start_worker(self, shard: int) -> None:
+        stop = self._context.Event()
+        metrics_queue = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                shard, self.shards[shard], self.url, self.share_snapshots,
+                metrics_queue, stop, self.report_interval, self.journal_dir, self.store_path,
+            ),
+            name=f"hospital-shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard] = process
+        self._stops[shard] = stop
+        self._queues[shard] = metrics_queue
+        logger.info(f"started shard {shard} with {len(self.shards[shard])} hospitals - pid: {process.pid}")
+
+    def _collect_metrics(self) -> None:
+        for metrics_queue in self._queues.values():
+            try:
+                while True:
+                    stats = metrics_queue.get_nowait()
+                    self.shard_metrics[stats["shard"]] = stats
+            except queue.Empty:
+                pass
+
+    def _restart_crashed(self) -> None:
+        for shard, process in list(self._processes.items()):
+            if process.is_alive() or self.shutdown_event.is_set():
+                continue
+            self.restarts[shard] += 1
+            logger.error(f"shard {shard} exited with code {process.exitcode}, restarting (restart #{self.restarts[shard]})")
+            last = self.shard_metrics.pop(shard, {})
+            for key in self.COUNTERS:
+                self._retired[key] += last.get(key, 0)
+            # back off a little for workers that keep crashing
+            if self.shutdown_event.wait(min(self.restarts[shard] * 0.5, 5)):
+                return
+            self._start_worker(shard)
+
+    def metrics(self) -> dict:
+        totals: dict = {"workers": len(self._processes), "restarts": sum(self.restarts.values())}
+        totals.update(self._retired)
+        for stats in self.shard_metrics.values():
+            for key in self.COUNTERS + self.GAUGES:
+                totals[key] = totals.get(key, 0) + stats.get(key, 0)
+        return totals
+
+    def shutdown(self) -> None:
+        self.shutdown_event.set()
+
+    def run(self) -> None:
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda signum, frame: self.shutdown())
+
+        for shard, definitions in self.shards.items():
+            if definitions:
+                self._start_worker(shard)
+
+        while not self.shutdown_event.wait(0.5):
+            self._collect_metrics()
+            self._restart_crashed()
+
+        logger.info("stopping shards")
+        for stop in self._stops.values():
+            stop.set()
+        deadline = time.monotonic() + config.SHUTDOWN_DRAIN_TIMEOUT + 5
+        for shard, process in self._processes.items():
+            # keep reading so a worker flushing its last report is not blocked on a full pipe
+            while process.is_alive() and time.monotonic() < deadline:
+                process.join(0.2)
+                self._collect_metrics()
+            if process.is_alive():
+                process.terminate()
+        self._collect_metrics()
+        logger.info(f"fleet metrics: {self.metrics()}")
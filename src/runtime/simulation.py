@@ -0,0 +1,273 @@
+"""
+deterministic simulation mode. hospitals run their real snapshot, admit and
+discharge code against an in-process FakeWorldModel on a virtual clock: the
+next tick or due discharge is looked up, the clock jumps there and the work is
+done right away, so nothing ever sleeps and a week of activity replays in as
+long as the cpu needs for it.
+
+every random draw comes from a stream seeded from the simulation seed (see
+src.utils.random_streams) and the id pool starts over, so two runs with the
+same seed and definitions produce the same treatments, discharges and
+fingerprint. the id generator is reset by a run, do not simulate inside a
+process that also runs a live hospital.
+
+within one instant discharges go first, then the snapshot, then admissions.
+"""
+
+import hashlib
+import struct
+import time
+from collections import Counter
+from datetime import datetime
+from functools import partial
+
+from src.fake_worldmodel import FakeWorldModel, InProcessClient
+from src.models.enums import DischargeStatus, TreatmentType
+from src.models.hospital import Hospital
+from src.models.person_cache import PersonCache
+from src.models.snapshot import SnapshotReader
+from src.models.snapshot_store import SnapshotStore
+from src.runtime.fleet import _doctor_from_dict
+from src.utils import clock, random_streams
+from src.utils.clock import VirtualClock
+from src.utils.discharge_scheduler import DischargeScheduler
+from src.utils.logger import get_logger
+from src.utils.random_id_generator import UniqueIDGenerator
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+_FINGERPRINT_RECORD = struct.Struct("<qqqBBBdd")
+_TREATMENT_TYPES = list(TreatmentType)
+_DISCHARGE_STATUSES = list(DischargeStatus)
+# simulations start at a fixed date so their treatment dates repeat too
+START = datetime(2024, 1, 1)
+
+
+class Simulation:
+    def __init__(
+        self,
+        definitions: list[dict],
+        seed: int = config.SIMULATION_SEED,
+        population: int = config.SIMULATION_POPULATION,
+        time_rate: float = 1,
+        reject_rate: float = 0.0,
+        share_snapshots: bool = True,
+        start: datetime = START,
+        earthquake_rate: float = 0.0,
+        earthquake_duration: float = 0.0,
+        earthquake_population: int | None = None,
+        adaptive_polling: bool = config.ADAPTIVE_POLLING,
+        admission_planner: bool = config.ADMISSION_PLANNER,
+    ) -> None:
+        self.definitions = definitions
+        self.seed = seed
+        self.population = population
+        self.time_rate = time_rate
+        self.reject_rate = reject_rate
+        self.share_snapshots = share_snapshots
+        self.earthquake_rate = earthquake_rate
+        self.earthquake_duration = earthquake_duration
+        self.earthquake_population = earthquake_population
+        self.adaptive_polling = adaptive_polling
+        self.admission_planner = admission_planner
+        self.start = start.timestamp()
+        self.clock = VirtualClock(self.start)
+
+        self.world: FakeWorldModel | None = None
+        self.hospitals: list[Hospital] = []
+        self.scheduler: DischargeScheduler | None = None
+        self.person_cache: PersonCache | None = None
+        # name -> [bed seconds, peak used capacity]
+        self._occupancy: dict[str, list] = {}
+        # name -> finished treatments and their discharges per status
+        self._totals: dict[str, Counter] = {}
+        self._digest = hashlib.sha256()
+        self.ticks = 0
+
+    @classmethod
+    def single(cls, max_capacity: int = 15, **options) -> "Simulation":
+        return cls([{"name": "hospital", "max_capacity": max_capacity}], **options)
+
+    # ==setup=================================================================
+    def _build(self) -> None:
+        self.world = FakeWorldModel(
+            population=self.population,
+            time_rate=self.time_rate,
+            reject_rate=self.reject_rate,
+            earthquake_rate=self.earthquake_rate,
+            seed=random_streams.stream("world").getrandbits(64),
+            earthquake_duration=self.earthquake_duration,
+            earthquake_population=self.earthquake_population,
+        )
+        client = InProcessClient(self.world)
+        self.scheduler = DischargeScheduler(Hospital.dispatch_discharge, clock=clock.time)
+        self.person_cache = PersonCache() if self.share_snapshots else None
+        snapshots = SnapshotStore() if self.share_snapshots else None
+        self.hospitals = [
+            Hospital(
+                definition["name"],
+                definition["max_capacity"],
+                discharge_scheduler=self.scheduler,
+                client=client,
+                doctors=[_doctor_from_dict(doctor) for doctor in definition.get("doctors", [])] or None,
+                person_cache=self.person_cache,
+                snapshots=snapshots,
+                on_discharge=partial(self._settled, index),
+            )
+            for index, definition in enumerate(self.definitions)
+        ]
+        for hospital in self.hospitals:
+            hospital.polling.enabled = self.adaptive_polling
+            hospital.planner.enabled = self.admission_planner
+            _, body = client.post("/register", hospital._registration_payload())
+            hospital._on_registered(body)
+        self._occupancy = {hospital.name: [0.0, 0] for hospital in self.hospitals}
+        self._totals = {hospital.name: Counter() for hospital in self.hospitals}
+        self._digest = hashlib.sha256()
+
+    # ==ticks=================================================================
+    def _discharge(self, now: float) -> None:
+        for treatment_id, payload in self.scheduler.pop_due(now):
+            Hospital.dispatch_discharge(treatment_id, payload)
+        # the coalescer thread is not running, batches go out at the due time
+        for hospital in self.hospitals:
+            while hospital.discharge_coalescer.pending:
+                hospital.discharge_coalescer.flush()
+
+    def _offer_candidates(self, persons: list) -> None:
+        for hospital in self.hospitals:
+            hospital.offer_candidates(persons)
+
+    def _snapshot(self, index: int) -> None:
+        if not self.share_snapshots:
+            self.hospitals[index].take_snapshot()
+            return
+        leader = self.hospitals[0]
+        reader = SnapshotReader(self.person_cache, self._offer_candidates)
+        status_code, body = leader.client.stream(f"/snapshot/{leader.id}", reader)
+        if status_code != 200:
+            logger.error(f"faild to load snapshot - statuscode: {status_code} - message: {body['message']}")
+            return
+        snapshot = reader.finish()
+        for hospital in self.hospitals:
+            hospital.apply_snapshot(snapshot)
+
+    def _snapshot_interval(self, index: int) -> float:
+        if not self.share_snapshots:
+            return self.hospitals[index].polling.snapshot_interval()
+        # the shared fetch follows the fastest hospital, as in a fleet
+        return min(hospital.polling.snapshot_interval() for hospital in self.hospitals)
+
+    def _sample_occupancy(self, elapsed: float) -> None:
+        for hospital in self.hospitals:
+            occupancy = self._occupancy[hospital.name]
+            used = hospital.used_capacity
+            occupancy[0] += used * elapsed
+            if used > occupancy[1]:
+                occupancy[1] = used
+
+    def _loop(self, end: float) -> None:
+        # intervals are asked for after every tick, they follow the adaptive polling
+        now = self.clock.time()
+        next_snapshot = [now] * (1 if self.share_snapshots else len(self.hospitals))
+        next_admit = [now] * len(self.hospitals)
+        while True:
+            due = self.scheduler.next_due()
+            upcoming = min(min(next_snapshot), min(next_admit), due if due is not None else float("inf"))
+            if upcoming > end:
+                break
+            # beds are counted as they were held until this instant
+            self._sample_occupancy(upcoming - now)
+            now = upcoming
+            self.clock.advance_to(now)
+            self._discharge(now)
+            for index, when in enumerate(next_snapshot):
+                if when <= now:
+                    self._snapshot(index)
+                    next_snapshot[index] = now + self._snapshot_interval(index)
+            for index, hospital in enumerate(self.hospitals):
+                if next_admit[index] <= now:
+                    hospital.admit_patient()
+                    next_admit[index] = now + hospital.polling.admit_interval()
+            self.ticks += 1
+        self._sample_occupancy(end - now)
+        self.clock.advance_to(end)
+
+    # ==run===================================================================
+    def run(self, duration: float) -> dict:
+        """
+        simulates `duration` seconds of hospital time and returns the report.
+        the process clock and random streams are swapped for the run and put
+        back afterwards.
+        """
+        previous_clock = clock.use(self.clock)
+        previous_seed = random_streams.current_seed()
+        random_streams.seed(self.seed)
+        UniqueIDGenerator.reset()
+        started = time.perf_counter()
+        try:
+            self._build()
+            self._loop(self.start + duration)
+            return self.report(duration, time.perf_counter() - started)
+        finally:
+            # the next run may name its hospitals the same
+            for hospital in self.hospitals:
+                hospital.close_metrics()
+            clock.use(previous_clock)
+            random_streams.seed(previous_seed)
+
+    def report(self, duration: float, wall_seconds: float) -> dict:
+        hospitals = {}
+        for hospital in self.hospitals:
+            totals = self._totals[hospital.name]
+            bed_seconds, peak = self._occupancy[hospital.name]
+            hospitals[hospital.name] = {
+                "max_capacity": hospital.max_capacity,
+                "treatments": totals["treatments"] + len(hospital.treatments),
+                "healthy": totals[DischargeStatus.HEALTHY],
+                "dead": totals[DischargeStatus.DEAD],
+                "waiting": sum(len(queue) for queue in hospital.waiting_patients.values()),
+                "in_service": len(hospital.patients.in_service),
+                "mean_occupancy": bed_seconds / duration if duration else 0.0,
+                "peak_occupancy": peak,
+            }
+        return {
+            "seed": self.seed,
+            "simulated_seconds": duration,
+            "wall_seconds": wall_seconds,
+            "speedup": duration / wall_seconds if wall_seconds else float("inf"),
+            "ticks": self.ticks,
+            "hospitals": hospitals,
+            "world": self.world.stats(),
+            "fingerprint": self.fingerprint(),
+        }
+
+    def _pack(self, index: int, treatment, discharge_status: DischargeStatus | None) -> bytes:
+        return _FINGERPRINT_RECORD.pack(
+            treatment.id, treatment.patient_id, treatment.doctor_id, index,
+            _TREATMENT_TYPES.index(treatment.treatment_type),
+            _DISCHARGE_STATUSES.index(discharge_status) + 1 if discharge_status is not None else 0,
+            treatment.start_date.timestamp() - self.start,
+            treatment.end_date.timestamp() - self.start,
+        )
+
+    def _settled(self, index: int, treatment, discharge) -> None:
+        # finished treatments go into the digest and the totals as they are settled,
+        # the hospital itself forgets them
+        totals = self._totals[self.hospitals[index].name]
+        discharge_status = discharge.discharge_status if discharge is not None else None
+        totals["treatments"] += 1
+        if discharge_status is not None:
+            totals[discharge_status] += 1
+        self._digest.update(self._pack(index, treatment, discharge_status))
+
+    def fingerprint(self) -> str:
+        # every finished treatment in discharge order, then the running ones.
+        # equal digests mean identical runs
+        digest = self._digest.copy()
+        for index, hospital in enumerate(self.hospitals):
+            for treatment in hospital.treatments.values():
+                digest.update(self._pack(index, treatment, None))
+        return digest.hexdigest()
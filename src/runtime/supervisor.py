@@ -0,0 +1,155 @@
+"""
+thread runtime for the hospital agent. the main thread blocks on a shutdown
+event while the snapshot and admit loops run at a fixed rate on their own
+threads, and pending discharges are drained before the process exits. with
+ADMIT_WORKERS above one several admit loops share the candidates, each bed is
+reserved by exactly one of them.
+"""
+
+import signal
+import threading
+import time
+from typing import Callable
+
+from src.models.hospital import Hospital
+from src.utils.logger import get_logger
+from src.utils.metrics import registry
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+loop_jitter_seconds = registry.histogram(
+    "loop_tick_jitter_seconds", "how late a fixed rate loop tick started", ("loop",)
+)
+loop_overruns = registry.counter(
+    "loop_overruns_total", "fixed rate loop ticks skipped because the previous one overran", ("loop",)
+)
+
+
+class FixedRateLoop:
+    """
+    calls `func` every `interval()` seconds. ticks are scheduled against the
+    loop's own timeline so the time spent inside `func` does not add up as drift,
+    ticks missed because `func` overran are skipped rather than run back to back.
+    tick jitter and overruns are exported as loop_tick_jitter_seconds and
+    loop_overruns_total.
+    """
+
+    def __init__(self, name: str, func: Callable[[], None], interval: Callable[[], float], shutdown: threading.Event) -> None:
+        self.name = name
+        self._func = func
+        self._interval = interval
+        self._shutdown = shutdown
+        self._thread: threading.Thread | None = None
+
+        self.ticks = 0
+        self.overruns = 0
+        self.last_jitter = 0.0
+        self.max_jitter = 0.0
+        self._total_jitter = 0.0
+        self._jitter_metric = loop_jitter_seconds.labels(name)
+        self._overrun_metric = loop_overruns.labels(name)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def join(self, timeout: float | None = None) -> None:
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "last_jitter": self.last_jitter,
+            "max_jitter": self.max_jitter,
+            "mean_jitter": self._total_jitter / self.ticks if self.ticks else 0.0,
+        }
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while not self._shutdown.is_set():
+            jitter = max(time.monotonic() - next_tick, 0.0)
+            self.ticks += 1
+            self.last_jitter = jitter
+            self.max_jitter = max(self.max_jitter, jitter)
+            self._total_jitter += jitter
+            self._jitter_metric.observe(jitter)
+
+            try:
+                self._func()
+            except Exception as error:
+                logger.error(f"{self.name} tick failed - {error}")
+
+            interval = self._interval()
+            next_tick += interval
+            now = time.monotonic()
+            if next_tick < now:
+                missed = int((now - next_tick) // interval) + 1
+                self.overruns += missed
+                self._overrun_metric.inc(missed)
+                next_tick += missed * interval
+            if self._shutdown.wait(next_tick - now):
+                break
+
+
+class Supervisor:
+    def __init__(
+        self,
+        hospital: Hospital,
+        drain_timeout: float = config.SHUTDOWN_DRAIN_TIMEOUT,
+        admit_workers: int = config.ADMIT_WORKERS,
+    ) -> None:
+        self.hospital = hospital
+        self.drain_timeout = drain_timeout
+        self.shutdown_event = threading.Event()
+        self.loops = [
+            FixedRateLoop(
+                "snapshot-loop", hospital.take_snapshot, hospital.polling.snapshot_interval, self.shutdown_event,
+            ),
+        ]
+        self.loops.extend(
+            FixedRateLoop(
+                "admit-loop" if admit_workers == 1 else f"admit-loop-{index}",
+                hospital.admit_patient, hospital.polling.admit_interval, self.shutdown_event,
+            )
+            for index in range(admit_workers)
+        )
+
+    def _install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self._on_signal)
+
+    def _on_signal(self, signum, frame) -> None:
+        logger.info(f"received {signal.Signals(signum).name}, shutting down")
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        self.shutdown_event.set()
+
+    def jitter_stats(self) -> dict[str, dict]:
+        return {loop.name: loop.stats() for loop in self.loops}
+
+    def run(self) -> None:
+        self._install_signal_handlers()
+        self.hospital.register()
+        # the loops need the entity id and time_rate handed out on registration
+        while not self.hospital.registered.is_set():
+            if self.shutdown_event.wait(0.1):
+                break
+        else:
+            for loop in self.loops:
+                loop.start()
+
+        # the main thread sleeps here until a signal or shutdown() wakes it up
+        self.shutdown_event.wait()
+
+        for loop in self.loops:
+            loop.join(self.drain_timeout)
+        self.hospital.drain(self.drain_timeout)
+        logger.info(f"loop jitter: {self.jitter_stats()}")
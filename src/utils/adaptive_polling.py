@@ -0,0 +1,97 @@
+"""
+adaptive snapshot and admit intervals for one hospital. the fixed intervals
+from the config are the base, they are
+
+- shortened by POLL_SURGE_FACTOR while the last snapshot reported an earthquake,
+- stretched for snapshots, doubling per snapshot that brought nothing the
+  hospital could use, up to POLL_IDLE_BACKOFF_MAX, while the world stands
+  still or every bed is taken,
+- stretched for both loops by how far the smoothed world model latency is
+  above POLL_LATENCY_TARGET, up to POLL_LATENCY_BACKOFF_MAX, so a slow world
+  model gets fewer calls instead of a growing backlog.
+
+it also tells the admit loop when a round trip would be wasted: no free bed
+or no candidate. once POLL_EMPTY_ANSWERS_BEFORE_BACKOFF requests in a row got
+nothing accepted the next tick is skipped too, twice as many after every
+further empty answer (up to POLL_IDLE_BACKOFF_MAX), until a snapshot brings
+news or a request succeeds.
+
+the runtimes read the intervals as the interval callables of their loops.
+"""
+
+from typing import Callable
+
+import src.config as config
+
+
+class AdaptivePolling:
+    def __init__(
+        self,
+        base_snapshot_interval: Callable[[], float],
+        base_admit_interval: Callable[[], float],
+        enabled: bool = config.ADAPTIVE_POLLING,
+    ) -> None:
+        self.base_snapshot_interval = base_snapshot_interval
+        self.base_admit_interval = base_admit_interval
+        self.enabled = enabled
+
+        self.surge = False
+        self.idle_factor = 1.0
+        # exponentially weighted world model latency in seconds
+        self.latency: float | None = None
+        # admit ticks to skip after accept requests that got nobody accepted
+        self.admit_backoff = 0
+        self._skips_left = 0
+        self._empty_answers = 0
+
+    # ==observations========================================================
+    def on_snapshot(self, earthquake: bool, changed: bool) -> None:
+        self.surge = earthquake
+        if changed or earthquake:
+            self.idle_factor = 1.0
+            # the count of empty answers in a row goes on, only a success ends it
+            self.admit_backoff = self._skips_left = 0
+        else:
+            self.idle_factor = min(self.idle_factor * 2, config.POLL_IDLE_BACKOFF_MAX)
+
+    def on_admit(self, accepted: int) -> None:
+        if accepted:
+            self.admit_backoff = self._empty_answers = 0
+        else:
+            self._empty_answers += 1
+            if self._empty_answers >= config.POLL_EMPTY_ANSWERS_BEFORE_BACKOFF:
+                self.admit_backoff = min(max(self.admit_backoff * 2, 1), config.POLL_IDLE_BACKOFF_MAX)
+        self._skips_left = self.admit_backoff
+
+    def observe_latency(self, seconds: float) -> None:
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += config.POLL_LATENCY_SMOOTHING * (seconds - self.latency)
+
+    # ==decisions===========================================================
+    def pressure(self) -> float:
+        if self.latency is None or self.latency <= config.POLL_LATENCY_TARGET:
+            return 1.0
+        return min(self.latency / config.POLL_LATENCY_TARGET, config.POLL_LATENCY_BACKOFF_MAX)
+
+    def snapshot_interval(self) -> float:
+        base = self.base_snapshot_interval()
+        if not self.enabled:
+            return base
+        factor = config.POLL_SURGE_FACTOR if self.surge else self.idle_factor
+        return base * factor * self.pressure()
+
+    def admit_interval(self) -> float:
+        base = self.base_admit_interval()
+        if not self.enabled:
+            return base
+        return base * (config.POLL_SURGE_FACTOR if self.surge else 1.0) * self.pressure()
+
+    def should_admit(self, free_capacity: int, candidates: int) -> bool:
+        if free_capacity <= 0 or candidates == 0:
+            return False
+        if self.enabled and self._skips_left:
+            self._skips_left -= 1
+            return False
+        return True
@@ -0,0 +1,53 @@
+"""
+process wide clock used for every date the models stamp. it follows the wall
+clock unless a simulation installs a VirtualClock, which only moves when it is
+advanced, so a run can cover days of hospital activity without waiting for them.
+"""
+
+import time as _time
+from datetime import datetime
+
+
+class SystemClock:
+    def time(self) -> float:
+        return _time.time()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class VirtualClock:
+    def __init__(self, start: float | None = None) -> None:
+        self._now = _time.time() if start is None else start
+
+    def time(self) -> float:
+        return self._now
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._now)
+
+    def advance_to(self, timestamp: float) -> None:
+        # the clock never runs backwards
+        if timestamp > self._now:
+            self._now = timestamp
+
+    def advance(self, seconds: float) -> None:
+        self.advance_to(self._now + seconds)
+
+
+_clock: SystemClock | VirtualClock = SystemClock()
+
+
+def time() -> float:
+    return _clock.time()
+
+
+def now() -> datetime:
+    return _clock.now()
+
+
+def use(clock: SystemClock | VirtualClock) -> SystemClock | VirtualClock:
+    # installs `clock` and returns the previous one so callers can put it back
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Any, Callable
+
+import src.config as config
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DischargeCoalescer:
+    """
+    gathers discharges that become due close together and hands them to the
+    flush callback as one batch, either once the window has elapsed since the
+    first pending item or as soon as the batch is full. with several workers
+    one batch can be in flight per worker.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[list[Any]], None],
+        window: float = config.DISCHARGE_BATCH_WINDOW,
+        max_batch_size: int = config.DISCHARGE_BATCH_MAX_SIZE,
+        workers: int = config.DISCHARGE_WORKERS,
+    ) -> None:
+        self._flush = flush
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._items: list[Any] = []
+        self._first_added: float | None = None
+        self.workers = workers
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._running = False
+
+    def start(self) -> None:
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._threads = [
+            threading.Thread(target=self._run, name=f"discharge-coalescer-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def add(self, item: Any) -> None:
+        with self._condition:
+            if not self._items:
+                self._first_added = time.monotonic()
+            self._items.append(item)
+            if len(self._items) == 1 or len(self._items) >= self.max_batch_size:
+                self._condition.notify()
+
+    @property
+    def pending(self) -> int:
+        return len(self._items)
+
+    def flush(self) -> None:
+        # sends everything that is pending right now on the calling thread
+        with self._condition:
+            batch, self._items = self._items, []
+        self._send(batch)
+
+    def _send(self, batch: list[Any]) -> None:
+        for start in range(0, len(batch), self.max_batch_size):
+            try:
+                self._flush(batch[start:start + self.max_batch_size])
+            except Exception as error:
+                logger.error(f"failed to flush discharge batch - {error}")
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running:
+                    if not self._items:
+                        self._condition.wait()
+                        continue
+                    remaining = self._first_added + self.window - time.monotonic()
+                    if remaining <= 0 or len(self._items) >= self.max_batch_size:
+                        break
+                    self._condition.wait(remaining)
+                if not self._running:
+                    return
+                batch, self._items = self._items, []
+            self._send(batch)
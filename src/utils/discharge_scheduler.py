@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Hashable
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DischargeScheduler:
+    """
+    single worker thread that fires the discharge handler for every scheduled
+    treatment once its end date is reached. entries live in a min-heap keyed on
+    the due time, cancelled entries are removed lazily.
+    """
+
+    def __init__(self, handler: Callable[[Hashable, Any], None], clock: Callable[[], float] = time.time) -> None:
+        self._handler = handler
+        self._clock = clock
+        self._heap: list[list] = []
+        self._entries: dict[Hashable, list] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._worker: threading.Thread | None = None
+        self._running = False
+
+    # ==lifecycle=============================================================
+    def start(self) -> None:
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._worker = threading.Thread(target=self._run, name="discharge-scheduler")
+        self._worker.daemon = True
+        self._worker.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._worker and self._worker is not threading.current_thread():
+            self._worker.join(timeout)
+        self._worker = None
+
+    # ==scheduling============================================================
+    def schedule(self, key: Hashable, when: datetime | float, payload: Any = None) -> None:
+        due = when.timestamp() if isinstance(when, datetime) else float(when)
+        with self._condition:
+            self._remove_locked(key)
+            entry = [due, next(self._counter), key, payload, True]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:
+                self._condition.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._condition:
+            return self._remove_locked(key) is not None
+
+    def reschedule(self, key: Hashable, when: datetime | float) -> bool:
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            payload = entry[3]
+        self.schedule(key, when, payload)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._entries)
+
+    def next_due(self) -> float | None:
+        with self._condition:
+            self._drop_cancelled_locked()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float | None = None) -> list[tuple[Hashable, Any]]:
+        with self._condition:
+            return self._pop_due_locked(self._clock() if now is None else now)
+
+    def pop_all(self) -> list[tuple[Hashable, Any]]:
+        with self._condition:
+            return self._pop_due_locked(float("inf"))
+
+    # ==internals=============================================================
+    def _remove_locked(self, key: Hashable) -> list | None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[4] = False
+            # rebuild once cancelled entries dominate the heap
+            if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+                self._heap = [e for e in self._heap if e[4]]
+                heapq.heapify(self._heap)
+        return entry
+
+    def _drop_cancelled_locked(self) -> None:
+        while self._heap and not self._heap[0][4]:
+            heapq.heappop(self._heap)
+
+    def _pop_due_locked(self, now: float) -> list[tuple[Hashable, Any]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not entry[4]:
+                continue
+            del self._entries[entry[2]]
+            due.append((entry[2], entry[3]))
+        return due
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running:
+                    self._drop_cancelled_locked()
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - self._clock()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if not self._running:
+                    return
+                due = self._pop_due_locked(self._clock())
+
+            for key, payload in due:
+                try:
+                    self._handler(key, payload)
+                except Exception as error:
+                    logger.error(f"discharge handler failed for {key} - {error}")
@@ -0,0 +1,163 @@
+"""
+pooled http clients for the world model api. one client instance keeps a
+keep-alive connection pool that is shared by every world model call.
+
+bodies are decoded with the fastest installed json backend. stream() hands a
+body to a reader chunk by chunk instead, see SnapshotReader.
+"""
+
+from time import perf_counter
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.utils import json_backend
+from src.utils.metrics import registry
+import src.config as config
+
+
+request_seconds = registry.histogram(
+    "worldmodel_request_seconds", "latency of world model calls", ("endpoint",)
+)
+http_errors = registry.counter(
+    "worldmodel_http_errors_total", "world model calls that failed or answered with an error status", ("endpoint",)
+)
+
+
+def _endpoint(path: str) -> str:
+    # "/snapshot/12" -> "/snapshot", ids would make one series per entity
+    return "/" + path.split("/", 2)[1]
+
+
+def _record(path: str, start: float, status: int | None) -> None:
+    endpoint = _endpoint(path)
+    request_seconds.labels(endpoint).observe(perf_counter() - start)
+    if status is None or status >= 400:
+        http_errors.labels(endpoint).inc()
+
+
+class WorldModelClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = config.HTTP_TIMEOUT,
+        pool_size: int = config.HTTP_POOL_SIZE,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path: str, timeout: float | None = None) -> tuple[int, Any]:
+        start, status = perf_counter(), None
+        try:
+            response = self.session.get(self.base_url + path, timeout=timeout or self.timeout)
+            body = json_backend.loads(response.content)
+            status = response.status_code
+            return status, body
+        finally:
+            _record(path, start, status)
+
+    def stream(self, path: str, reader, timeout: float | None = None) -> tuple[int, Any]:
+        # feeds a 200 body to `reader` as it arrives, error bodies are returned decoded
+        start, status = perf_counter(), None
+        try:
+            with self.session.get(self.base_url + path, timeout=timeout or self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    body = json_backend.loads(response.content)
+                    status = response.status_code
+                    return status, body
+                for chunk in response.iter_content(config.SNAPSHOT_STREAM_CHUNK):
+                    reader.feed(chunk)
+                status = response.status_code
+                return status, None
+        finally:
+            _record(path, start, status)
+
+    def post(self, path: str, payload: dict, timeout: float | None = None) -> tuple[int, Any]:
+        start, status = perf_counter(), None
+        try:
+            response = self.session.post(self.base_url + path, json=payload, timeout=timeout or self.timeout)
+            body = json_backend.loads(response.content)
+            status = response.status_code
+            return status, body
+        finally:
+            _record(path, start, status)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncWorldModelClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = config.HTTP_TIMEOUT,
+        pool_size: int = config.HTTP_POOL_SIZE,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+
+    def _get_session(self):
+        # aiohttp sessions must be created inside a running event loop
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def get(self, path: str, timeout: float | None = None) -> tuple[int, Any]:
+        import aiohttp
+
+        kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        start, status = perf_counter(), None
+        try:
+            async with self._get_session().get(self.base_url + path, **kwargs) as response:
+                body = await response.json(content_type=None, loads=json_backend.loads)
+                status = response.status
+                return status, body
+        finally:
+            _record(path, start, status)
+
+    async def stream(self, path: str, reader, timeout: float | None = None) -> tuple[int, Any]:
+        import aiohttp
+
+        kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        start, status = perf_counter(), None
+        try:
+            async with self._get_session().get(self.base_url + path, **kwargs) as response:
+                if response.status != 200:
+                    body = await response.json(content_type=None, loads=json_backend.loads)
+                    status = response.status
+                    return status, body
+                async for chunk in response.content.iter_chunked(config.SNAPSHOT_STREAM_CHUNK):
+                    reader.feed(chunk)
+                status = response.status
+                return status, None
+        finally:
+            _record(path, start, status)
+
+    async def post(self, path: str, payload: dict, timeout: float | None = None) -> tuple[int, Any]:
+        import aiohttp
+
+        kwargs = {"timeout": aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        start, status = perf_counter(), None
+        try:
+            async with self._get_session().post(self.base_url + path, json=payload, **kwargs) as response:
+                body = await response.json(content_type=None, loads=json_backend.loads)
+                status = response.status
+                return status, body
+        finally:
+            _record(path, start, status)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,164 @@
+"""
+append-only journal of fixed size binary records with a compact checkpoint.
+
+records are packed with one struct and buffered in memory, a background
+thread writes and fsyncs the buffer every `fsync_interval` seconds (or sooner
+once `batch_bytes` are waiting), so appending never waits on the disk and a
+crash loses at most one interval of events.
+
+once `checkpoint_every` records were appended the owner's checkpoint source is
+asked for the packed records describing the current state, they replace the
+checkpoint file and the journal starts over empty. recovery reads the
+checkpoint and then the journal.
+"""
+
+import os
+import struct
+import threading
+from typing import Callable, Iterator
+
+from src.utils.logger import get_logger
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+MAGIC = b"HJRNL\x00\x00\x01"
+
+
+class Journal:
+    def __init__(
+        self,
+        path: str,
+        record: struct.Struct,
+        fsync_interval: float = config.JOURNAL_FSYNC_INTERVAL,
+        batch_bytes: int = config.JOURNAL_BATCH_BYTES,
+        checkpoint_every: int = config.JOURNAL_CHECKPOINT_EVENTS,
+    ) -> None:
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.record = record
+        self.fsync_interval = fsync_interval
+        self.batch_bytes = batch_bytes
+        self.checkpoint_every = checkpoint_every
+        # returns the packed records that describe the current state, set by the owner
+        self.checkpoint_source: Callable[[], bytes] | None = None
+
+        self._buffer = bytearray()
+        self._appended = 0
+        # _lock guards the buffer, _io_lock orders writes, flushes and checkpoints
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._file = None
+        self._thread: threading.Thread | None = None
+
+    # ==reading=============================================================
+    def _read_file(self, path: str) -> bytes:
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return b""
+        if not data.startswith(MAGIC):
+            logger.error(f"{path} is not a journal file, ignoring it")
+            return b""
+        # a crash in the middle of a write leaves a torn last record
+        torn = (len(data) - len(MAGIC)) % self.record.size
+        if torn:
+            logger.info(f"dropping {torn} bytes of a torn record at the end of {path}")
+        return data[len(MAGIC):len(data) - torn]
+
+    def read_bytes(self) -> bytes:
+        # the checkpoint followed by the journal, always a whole number of records
+        return self._read_file(self.checkpoint_path) + self._read_file(self.path)
+
+    def read(self) -> Iterator[tuple]:
+        return self.record.iter_unpack(self.read_bytes())
+
+    # ==writing=============================================================
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        size = self._file.tell()
+        if size < len(MAGIC):
+            self._file.truncate(0)
+            self._file.write(MAGIC)
+        else:
+            self._file.truncate(size - (size - len(MAGIC)) % self.record.size)
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, name=f"journal-{os.path.basename(self.path)}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def append(self, *fields) -> None:
+        with self._lock:
+            self._buffer += self.record.pack(*fields)
+            self._appended += 1
+            if len(self._buffer) >= self.batch_bytes:
+                self._wakeup.set()
+
+    def flush(self) -> None:
+        with self._io_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        with self._lock:
+            data, self._buffer = self._buffer, bytearray()
+        if data and self._file is not None:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def checkpoint(self, payload: bytes | None = None) -> None:
+        with self._io_lock:
+            # records appended while the state is collected are kept in the buffer,
+            # replaying them on top of the checkpoint is harmless
+            with self._lock:
+                self._appended = 0
+            if payload is None:
+                payload = self.checkpoint_source()
+            temp_path = f"{self.checkpoint_path}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(MAGIC)
+                file.write(payload)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.checkpoint_path)
+            self._fsync_directory()
+            if self._file is not None:
+                self._file.truncate(len(MAGIC))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._flush_locked()
+
+    def _fsync_directory(self) -> None:
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.fsync_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if self._appended >= self.checkpoint_every and self.checkpoint_source is not None:
+                    self.checkpoint()
+            except Exception as error:
+                logger.error(f"failed to write journal {self.path} - {error}")
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
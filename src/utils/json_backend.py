@@ -0,0 +1,24 @@
+"""
+the fastest json decoder that is installed: orjson, then ujson, then the
+standard library. both third party packages are optional, JSON_BACKEND picks
+one explicitly.
+"""
+
+import importlib
+import json
+
+import src.config as config
+
+
+def _load_backend(name: str | None):
+    for candidate in (name,) if name else ("orjson", "ujson"):
+        if candidate == "json":
+            break
+        try:
+            return candidate, importlib.import_module(candidate).loads
+        except ImportError:
+            continue
+    return "json", json.loads
+
+
+BACKEND, loads = _load_backend(config.JSON_BACKEND)
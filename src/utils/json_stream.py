@@ -0,0 +1,179 @@
+"""
+incremental decoding of one json object whose big array is wanted before the
+whole document has arrived, as the persons of a snapshot:
+
+    decoder = ArrayStreamDecoder("persons")
+    for chunk in chunks:
+        for person in decoder.feed(chunk):
+            ...
+    decoder.close()
+    decoder.fields  # every other top level key
+
+elements of the streamed array are decoded in runs: everything up to the last
+complete element in the buffer goes through the json backend in one call, only
+when that fails (an element cut in half right behind a `}`) the run is decoded
+element by element with the standard library. the buffer never holds more than
+one chunk and the element in progress.
+"""
+
+import codecs
+import json
+
+from src.utils import json_backend
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+# what the decoder expects next
+OBJECT_START, KEY, VALUE, NEXT, ARRAY, ARRAY_NEXT, END = range(7)
+
+
+class ArrayStreamDecoder:
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.fields: dict = {}
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = OBJECT_START
+        self._current_key: str | None = None
+        self._keys = 0
+        self._array_empty = False
+        # the fast path failed on this buffer, the rest is decoded one element at a time
+        self._slow = False
+
+    def feed(self, chunk: bytes | str, final: bool = False) -> list:
+        # returns the elements of the streamed array completed by this chunk
+        text = self._text.decode(chunk, final) if isinstance(chunk, bytes) else chunk
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        self._slow = False
+        elements: list = []
+        while self._step(elements, final):
+            pass
+        return elements
+
+    def close(self) -> None:
+        self.feed(b"", final=True)
+        if self._state != END or self._buffer[self._pos:].strip(_WHITESPACE):
+            raise ValueError(f"incomplete or invalid json document, stopped at state {self._state}")
+
+    # ==parsing=============================================================
+    def _skip(self) -> str | None:
+        # the next non whitespace character or None at the end of the buffer
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+
+    def _expect(self, char: str | None, expected: str) -> None:
+        if char != expected:
+            raise ValueError(f"expected {expected!r} in json document, got {char!r}")
+        self._pos += 1
+
+    def _value(self, final: bool):
+        # (True, value) or (False, None) when the value is not complete yet
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        # a number at the end of the buffer may go on in the next chunk
+        if end == len(self._buffer) and not final:
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _step(self, elements: list, final: bool) -> bool:
+        char = self._skip()
+        if char is None:
+            return False
+        state = self._state
+        if state == OBJECT_START:
+            self._expect(char, "{")
+            self._state = KEY
+        elif state == KEY:
+            if char == "}" and not self._keys:
+                self._pos += 1
+                self._state = END
+                return True
+            # the key and its colon are taken together, or not at all
+            start = self._pos
+            complete, key = self._value(final)
+            if not complete:
+                return False
+            if type(key) is not str:
+                raise ValueError(f"expected an object key in json document, got {key!r}")
+            colon = self._skip()
+            if colon is None:
+                self._pos = start
+                return False
+            self._expect(colon, ":")
+            self._keys += 1
+            self._current_key = key
+            self._state = VALUE
+        elif state == VALUE:
+            if self._current_key == self.key and char == "[":
+                self._pos += 1
+                self._array_empty = True
+                self._state = ARRAY
+                return True
+            complete, value = self._value(final)
+            if not complete:
+                return False
+            self.fields[self._current_key] = value
+            self._state = NEXT
+        elif state == NEXT:
+            if char == ",":
+                self._pos += 1
+                self._state = KEY
+            else:
+                self._expect(char, "}")
+                self._state = END
+        elif state == ARRAY:
+            if char == "]" and self._array_empty:
+                self._pos += 1
+                self._state = NEXT
+                return True
+            return self._elements(elements, final)
+        elif state == ARRAY_NEXT:
+            if char == ",":
+                self._pos += 1
+                self._state = ARRAY
+            else:
+                self._expect(char, "]")
+                self._state = NEXT
+        else:
+            raise ValueError(f"unexpected {char!r} after the end of the json document")
+        return True
+
+    def _run_end(self) -> int:
+        # the last `}` followed by `,` or `]`, the end of an element if anything
+        buffer, end = self._buffer, len(self._buffer)
+        while True:
+            end = buffer.rfind("}", self._pos, end)
+            if end == -1 or buffer[end + 1:end + 17].lstrip(_WHITESPACE)[:1] in (",", "]"):
+                return end
+
+    def _elements(self, elements: list, final: bool) -> bool:
+        self._array_empty = False
+        # fast path: every complete element up to the end of the run in one call
+        end = -1 if self._slow else self._run_end()
+        if end != -1:
+            try:
+                elements.extend(json_backend.loads("[" + self._buffer[self._pos:end + 1] + "]"))
+                self._pos = end + 1
+                self._state = ARRAY_NEXT
+                return True
+            except ValueError:
+                self._slow = True
+        # slow path: one element, the next step goes on with the rest
+        complete, value = self._value(final)
+        if not complete:
+            return False
+        elements.append(value)
+        self._state = ARRAY_NEXT
+        return True
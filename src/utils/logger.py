@@ -1,12 +1,25 @@
 """
 logging handling module to create custom and particular loggers.
+
+every logger hands its records to one shared queue, a single background
+listener thread formats them and writes to the console and to one log file,
+so the calling threads never wait on terminal or disk i/o.
 """
 
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from typing import Literal
 from colorlog.formatter import ColoredFormatter
 import datetime
 
+import src.config as config
+
 LogLevelType = Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] | None
 
 DEFAULT_LOG_LEVEL: LogLevelType = "INFO"
@@ -16,25 +29,66 @@ class ColorfulFormatter(ColoredFormatter):
     pass
 
 
-def get_logger(
-    name: str = "hospital-app",
-    log_level: LogLevelType = DEFAULT_LOG_LEVEL,
-):
-    # create logger
-    logger = logging.getLogger(name=name)
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
 
-    # set log level
-    if log_level is not None:
-        logger.setLevel(log_level)
 
-    # Disable propagation to avoid duplicate logs
-    # logger.propagate = False
+class SamplingFilter(logging.Filter):
+    """
+    rate limits records logged with `extra={"sample_key": ...}`: each key lets
+    through at most `max_per_second` records, the rest are dropped and counted.
+    records without a sample key always pass.
+    """
+
+    def __init__(self, max_per_second: float = config.LOG_SAMPLE_MAX_PER_SECOND) -> None:
+        super().__init__()
+        self.max_per_second = max_per_second
+        self._buckets: dict[str, list[float]] = {}
+        self.dropped: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None or self.max_per_second <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.max_per_second, now]
+            # token bucket, refilled at max_per_second
+            bucket[0] = min(self.max_per_second, bucket[0] + (now - bucket[1]) * self.max_per_second)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self.dropped[key] = self.dropped.get(key, 0) + 1
+            return False
 
-    # Remove all existing handlers before adding the custom one
-    if logger.hasHandlers():
-        logger.handlers.clear()
 
-    # # set logger handler and formating
+class _NonFormattingQueueHandler(QueueHandler):
+    # the listener thread formats the record, not the thread that logged it
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+_setup_lock = threading.Lock()
+sampling_filter = SamplingFilter()
+
+
+def _build_handlers() -> list[logging.Handler]:
     console_handler = logging.StreamHandler()
     formatter = ColorfulFormatter(
         fmt="{log_color}{levelname} : {asctime} - {light_yellow}{name}{reset} : {message}{reset}",
@@ -48,15 +102,63 @@ def get_logger(
         },
     )
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    # TODO read LOGS path from CONFIG
-    log_file_name = (
-        f"LOGS/app-log-{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+
+    os.makedirs(config.LOG_DIR, exist_ok=True)
+    log_file_name = os.path.join(
+        config.LOG_DIR,
+        f"app-log-{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}",
     )
     fileHandler = logging.FileHandler(log_file_name)
-    fileHandler.setFormatter(
-        logging.Formatter(fmt="%(levelname)s : %(asctime)s - %(name)s - %(message)s")
-    )
-    logger.addHandler(fileHandler)
+    if config.LOG_FORMAT == "json":
+        fileHandler.setFormatter(JsonLinesFormatter())
+    else:
+        fileHandler.setFormatter(
+            logging.Formatter(fmt="%(levelname)s : %(asctime)s - %(name)s - %(message)s")
+        )
+    return [console_handler, fileHandler]
+
+
+def _shared_queue_handler() -> QueueHandler:
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is None:
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            _queue_handler = _NonFormattingQueueHandler(log_queue)
+            _queue_handler.addFilter(sampling_filter)
+            _listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+            _listener.start()
+            atexit.register(shutdown_logging)
+        return _queue_handler
+
+
+def shutdown_logging() -> None:
+    # flushes whatever is still queued, called at exit
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def get_logger(
+    name: str = "hospital-app",
+    log_level: LogLevelType = DEFAULT_LOG_LEVEL,
+):
+    # create logger
+    logger = logging.getLogger(name=name)
+
+    # set log level
+    if log_level is not None:
+        logger.setLevel(log_level)
+
+    # Disable propagation to avoid duplicate logs
+    # logger.propagate = False
+
+    # Remove all existing handlers before adding the custom one
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    # all loggers share one queue handler, file and console output happen on the listener thread
+    logger.addHandler(_shared_queue_handler())
 
     return logger
@@ -0,0 +1,385 @@
+"""
+in-process metrics: counters, gauges and latency histograms kept in a
+registry and rendered in the prometheus text format. the registry can be
+served on a local http endpoint and dumped to a file at a fixed interval.
+the same endpoint serves the status board, json summaries the hospitals keep
+up to date themselves, for dashboards that want more than flat series.
+
+metric families are declared once at module level next to the code that
+updates them, per entity children are looked up once with `labels()` and
+kept, so the hot path is a lock and an addition.
+"""
+
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+from urllib.parse import unquote
+
+from src.utils.logger import get_logger
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+# seconds, tuned for local world model calls and in-process parsing
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """either set explicitly or read from a function when the registry is rendered"""
+
+    __slots__ = ("_value", "_function")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: "Histogram") -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # one slot per bucket plus the +Inf one, not cumulative
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-th observation
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if count == 0:
+            return math.nan
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else math.inf
+        return math.inf
+
+
+class MetricFamily:
+    _types = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple[str, ...] = (), **options) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self._options = options
+        self._children: dict[tuple[str, ...], Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Counter | Gauge | Histogram:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._types[self.kind](**self._options))
+        return child
+
+    def remove(self, *values) -> None:
+        with self._lock:
+            self._children.pop(tuple(str(value) for value in values), None)
+
+    # unlabelled families are used directly
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        with self._lock:
+            children = list(self._children.items())
+        samples = []
+        for values, child in children:
+            labels = dict(zip(self.labelnames, values))
+            if self.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip((*child.buckets, math.inf), list(child.counts)):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, child.sum))
+                samples.append((f"{self.name}_count", labels, child.count))
+            else:
+                try:
+                    value = child.value
+                except Exception as error:
+                    logger.error(f"failed to read gauge {self.name} - {error}")
+                    continue
+                samples.append((self.name, labels, value))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._families: dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, help: str, kind: str, labelnames: tuple[str, ...], **options) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help, kind, labelnames, **options)
+            elif family.kind != kind or family.labelnames != labelnames:
+                raise ValueError(f"metric {name} is already registered as a {family.kind} {family.labelnames}")
+            return family
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        return self._family(name, help, "counter", labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        return self._family(name, help, "gauge", labelnames)
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> MetricFamily:
+        return self._family(name, help, "histogram", labelnames, buckets=buckets)
+
+    def get(self, name: str) -> MetricFamily | None:
+        return self._families.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        lines = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for name, labels, value in family.samples():
+                if labels:
+                    label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# the registry every module reports into
+registry = MetricsRegistry()
+
+
+class StatusBoard:
+    """named sources of json summaries, a source is only called when its status is asked for"""
+
+    def __init__(self) -> None:
+        self._sources: dict[str, Callable[[], dict]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, source: Callable[[], dict | None]) -> bool:
+        # False when the name was taken, the new source replaces the old one
+        with self._lock:
+            free = name not in self._sources
+            self._sources[name] = source
+        return free
+
+    def remove(self, name: str, source: Callable[[], dict | None] | None = None) -> bool:
+        # with `source`, only removes the name while it still belongs to that source
+        with self._lock:
+            if name not in self._sources or (source is not None and self._sources[name] is not source):
+                return False
+            del self._sources[name]
+        return True
+
+    def read(self, name: str) -> dict | None:
+        source = self._sources.get(name)
+        return source() if source is not None else None
+
+    def read_all(self) -> dict[str, dict]:
+        # a source answering None has nothing to report any more
+        with self._lock:
+            sources = list(self._sources.items())
+        return {name: summary for name, source in sources if (summary := source()) is not None}
+
+
+# summaries of every hospital of the process, by name
+status_board = StatusBoard()
+
+
+# ==exporters===============================================================
+class MetricsServer:
+    """
+    serves from a background thread, read only:
+        GET /metrics          the registry in prometheus text format
+        GET /status           json summaries of every source on the status board
+        GET /status/<name>    the summary of one source
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = registry,
+        host: str = config.METRICS_HOST,
+        port: int = config.METRICS_PORT,
+        status: StatusBoard = status_board,
+    ) -> None:
+        metrics_registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "/metrics":
+                    self._send(metrics_registry.render().encode(), "text/plain; version=0.0.4; charset=utf-8")
+                    return
+                if path == "/status":
+                    summary = status.read_all()
+                elif path.startswith("/status/"):
+                    summary = status.read(unquote(path[len("/status/"):]))
+                else:
+                    summary = None
+                if summary is None:
+                    self.send_error(404)
+                    return
+                self._send(json.dumps(summary).encode(), "application/json")
+
+            def _send(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info(f"serving metrics on {self.url}")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsDumper:
+    """rewrites `path` with the rendered registry every `interval` seconds"""
+
+    def __init__(
+        self,
+        path: str,
+        registry: MetricsRegistry = registry,
+        interval: float = config.METRICS_DUMP_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def dump(self) -> None:
+        # written next to the target and renamed, readers never see half a file
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(self.registry.render())
+        os.replace(temp_path, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.dump()
+            except Exception as error:
+                logger.error(f"failed to dump metrics to {self.path} - {error}")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="metrics-dumper")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.dump()
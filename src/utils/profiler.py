@@ -0,0 +1,303 @@
+"""
+always-on profiling from inside the process. a sampler thread reads the stack
+of every other thread (snapshot, admit, discharge workers, ...) at a fixed
+interval and counts them as collapsed stacks, the format flamegraph.pl,
+speedscope and inferno read:
+
+    admit-loop;supervisor.py:_run;hospital.py:admit_patient;... 42
+
+threads whose cpu clock did not move since the last sample are idle (waiting
+on a lock, an event or a socket) and counted apart, the stacks show where cpu
+time goes. thread pools ("admit-loop-0", "admit-loop-1") share one root.
+
+allocations are tracked with tracemalloc in windows of PROFILE_ALLOC_WINDOW
+seconds every PROFILE_ALLOC_EVERY seconds, tracing slows every allocation
+down, so it only runs for a small share of the time. what a window allocated
+and still holds is reported by module and by line.
+
+the sampler measures its own cost and stretches the interval so it never uses
+more than PROFILE_MAX_OVERHEAD of one cpu. every PROFILE_WRITE_INTERVAL
+seconds and on stop the results are rewritten to
+
+    <directory>/stacks.folded   collapsed stacks since the start
+    <directory>/profile.txt     cpu samples and allocations by module
+
+profiling starts with `main.py --profile DIR` or is toggled at runtime with
+SIGUSR1 (see install_signal).
+"""
+
+import os
+import re
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from src.utils.logger import get_logger
+import src.config as config
+
+
+logger = get_logger(__name__)
+
+_POOL_SUFFIX = re.compile(r"-\d+$")
+
+
+def _thread_root(name: str) -> str:
+    # one root per pool, spaces and separators would break the collapsed format
+    return _POOL_SUFFIX.sub("", name).replace(";", ":").replace(" ", "_")
+
+
+def _cpu_clock(ident: int) -> int | None:
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):
+        # no per thread cpu clocks here, every thread counts as busy
+        return None
+
+
+class Profiler:
+    def __init__(
+        self,
+        directory: str = config.PROFILE_DIR,
+        interval: float = config.PROFILE_SAMPLE_INTERVAL,
+        max_overhead: float = config.PROFILE_MAX_OVERHEAD,
+        max_depth: int = config.PROFILE_MAX_DEPTH,
+        write_interval: float = config.PROFILE_WRITE_INTERVAL,
+        alloc_window: float = config.PROFILE_ALLOC_WINDOW,
+        alloc_every: float = config.PROFILE_ALLOC_EVERY,
+    ) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.write_interval = write_interval
+        self.alloc_window = alloc_window
+        self.alloc_every = alloc_every
+
+        self._reset()
+
+        self._cpu: dict[int, tuple[int | None, float | None]] = {}
+        self._traced_by_us = False
+        self._window_base: tracemalloc.Snapshot | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _reset(self) -> None:
+        self.stacks: Counter[str] = Counter()
+        # samples per module, of the innermost frame (self) and of any frame (total)
+        self.self_samples: Counter[str] = Counter()
+        self.total_samples: Counter[str] = Counter()
+        self.idle_samples: Counter[str] = Counter()
+        self.samples = 0
+        self.sample_seconds = 0.0
+        self.started_at: float | None = None
+        # (file, line, bytes, blocks) held at the end of the last finished window
+        self.allocations: list[tuple[str, int, int, int]] = []
+        self.allocations_at: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def sampling(self) -> bool:
+        # running and not asked to stop, a stopped sampler may still be writing its results
+        return self.running and not self._stop.is_set()
+
+    def start(self) -> None:
+        if self.sampling:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # every sampler gets its own stop event, one toggled off and on again quickly
+        # is still finishing and the new one waits for it before it starts over
+        previous = self._thread if self.running else None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop, previous), name="profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"profiling to {self.directory}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def toggle(self) -> None:
+        # from a signal handler: never joins, the sampler writes its results on the way out
+        if self.sampling:
+            self._stop.set()
+            logger.info("profiling stopped")
+        else:
+            self.start()
+
+    def install_signal(self, signum: int | None = None) -> None:
+        signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signum, lambda *_: self.toggle())
+
+    # ==sampling============================================================
+    def _run(self, stop: threading.Event, previous: threading.Thread | None) -> None:
+        if previous is not None:
+            previous.join()
+        # every start is a new profile, the files of the last one are overwritten
+        self._reset()
+        self.started_at = time.monotonic()
+        now = time.monotonic()
+        next_write = now + self.write_interval
+        next_window = now
+        window_ends: float | None = None
+        try:
+            while True:
+                started = time.perf_counter()
+                self.sample()
+                spent = time.perf_counter() - started
+                self.sample_seconds += spent
+
+                now = time.monotonic()
+                if window_ends is None and now >= next_window and self.alloc_window > 0:
+                    window_ends = self._start_window(now)
+                    next_window = now + self.alloc_every
+                elif window_ends is not None and now >= window_ends:
+                    self._finish_window(now)
+                    window_ends = None
+                if now >= next_write:
+                    self.write()
+                    next_write = now + self.write_interval
+                # the wait grows with the cost of a sample, the sampler stays under max_overhead
+                if stop.wait(max(self.interval, spent / self.max_overhead)):
+                    break
+        finally:
+            if window_ends is not None:
+                self._finish_window(time.monotonic())
+            self.write()
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        cpu = {}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            root = _thread_root(names.get(ident, "unknown"))
+            if not self._busy(ident, cpu):
+                self.idle_samples[root] += 1
+                continue
+            frames = []
+            while frame is not None and len(frames) < self.max_depth:
+                code = frame.f_code
+                frames.append((os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            if not frames:
+                continue
+            self.self_samples[frames[0][0]] += 1
+            for module in {module for module, _ in frames}:
+                self.total_samples[module] += 1
+            frames.reverse()
+            self.stacks[";".join([root, *(f"{module}:{function}" for module, function in frames)])] += 1
+        self._cpu = cpu
+        self.samples += 1
+
+    def _busy(self, ident: int, cpu: dict) -> bool:
+        if ident in self._cpu:
+            clock, previous = self._cpu[ident]
+        else:
+            clock, previous = _cpu_clock(ident), None
+        if clock is None:
+            cpu[ident] = (None, None)
+            return True
+        try:
+            used = time.clock_gettime(clock)
+        except OSError:
+            return True
+        cpu[ident] = (clock, used)
+        # a thread seen for the first time counts as busy
+        return previous is None or used > previous
+
+    # ==allocations=========================================================
+    def _start_window(self, now: float) -> float:
+        # a tracemalloc started by someone else is theirs, its traces are left alone and
+        # the window reports what was allocated since its start
+        self._traced_by_us = not tracemalloc.is_tracing()
+        self._window_base = None
+        if self._traced_by_us:
+            tracemalloc.start(config.PROFILE_ALLOC_FRAMES)
+        else:
+            self._window_base = tracemalloc.take_snapshot()
+        return now + self.alloc_window
+
+    def _finish_window(self, now: float) -> None:
+        if not tracemalloc.is_tracing():
+            # stopped by its owner during the window
+            return
+        snapshot = tracemalloc.take_snapshot()
+        if self._traced_by_us:
+            tracemalloc.stop()
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        snapshot = snapshot.filter_traces(ignore)
+        if self._window_base is None:
+            self.allocations = [
+                (statistic.traceback[0].filename, statistic.traceback[0].lineno, statistic.size, statistic.count)
+                for statistic in snapshot.statistics("lineno")
+            ]
+        else:
+            self.allocations = [
+                (difference.traceback[0].filename, difference.traceback[0].lineno, difference.size_diff, difference.count_diff)
+                for difference in snapshot.compare_to(self._window_base.filter_traces(ignore), "lineno")
+                if difference.size_diff > 0
+            ]
+        self._window_base = None
+        self.allocations_at = now
+
+    # ==reports=============================================================
+    def write(self) -> None:
+        try:
+            self._replace("stacks.folded", "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()))
+            self._replace("profile.txt", self.report())
+        except OSError as error:
+            logger.error(f"failed to write the profile to {self.directory} - {error}")
+
+    def _replace(self, name: str, text: str) -> None:
+        # written next to the target and renamed, readers never see half a file
+        path = os.path.join(self.directory, name)
+        with open(f"{path}.tmp", "w") as file:
+            file.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    def report(self, top: int = config.PROFILE_TOP) -> str:
+        elapsed = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        busy = sum(self.self_samples.values())
+        lines = [
+            f"profiled {elapsed:.0f} s - {self.samples} samples - {busy} busy and {sum(self.idle_samples.values())} idle thread stacks"
+            f" - sampler cpu {self.sample_seconds:.2f} s ({self.sample_seconds / elapsed if elapsed else 0.0:.2%})",
+            "",
+            f"cpu samples by module (self / total of {busy} busy stacks)",
+        ]
+        for module, count in self.self_samples.most_common(top):
+            lines.append(f"{count / busy:8.1%} {self.total_samples[module] / busy:8.1%}  {module}")
+        lines += ["", "idle samples by thread"]
+        lines += [f"{count:8}  {root}" for root, count in self.idle_samples.most_common(top)]
+
+        lines += ["", "allocations still held at the end of the last tracemalloc window"]
+        if self.allocations_at is None:
+            lines.append("    no window finished yet")
+        else:
+            by_module: Counter[str] = Counter()
+            blocks: Counter[str] = Counter()
+            for filename, _, size, count in self.allocations:
+                module = os.path.basename(filename)
+                by_module[module] += size
+                blocks[module] += count
+            lines.append(f"    {time.monotonic() - self.allocations_at:.0f} s ago, {self.alloc_window:.0f} s window")
+            lines += [
+                f"{size / 1024:10.1f} KiB {blocks[module]:9} blocks  {module}"
+                for module, size in by_module.most_common(top)
+            ]
+            lines += ["", "top allocating lines"]
+            lines += [
+                f"{size / 1024:10.1f} KiB {count:9} blocks  {os.path.basename(filename)}:{lineno}"
+                for filename, lineno, size, count in self.allocations[:top]
+            ]
+        return "\n".join(lines) + "\n"
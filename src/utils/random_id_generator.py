@@ -1,20 +1,46 @@
-import random
+import threading
+
+from src.utils import random_streams
 
 class UniqueIDGenerator:
-    _available_ids = set(range(1, 1_000))
+    # ids are drawn at random from the pool by swapping the picked slot with
+    # the last one and popping it, so every draw is O(1)
+    _available_ids = list(range(1, 1_000))
     _id_start = 1_001
     _id_increment = 1_000
+    _lock = threading.Lock()
     
     @staticmethod
     def generate_id():
-        if not UniqueIDGenerator._available_ids:
+        with UniqueIDGenerator._lock:
+            return UniqueIDGenerator._take_id()
+
+    @staticmethod
+    def reserve_ids(count: int) -> list[int]:
+        # draws a whole block under one lock acquisition for callers that create many entities at once
+        with UniqueIDGenerator._lock:
+            return [UniqueIDGenerator._take_id() for _ in range(count)]
+
+    @staticmethod
+    def reset():
+        # back to the pool of a fresh process, simulations replay their ids from here
+        with UniqueIDGenerator._lock:
+            UniqueIDGenerator._available_ids[:] = range(1, 1_000)
+            UniqueIDGenerator._id_start = 1_001
+
+    @staticmethod
+    def _take_id():
+        available_ids = UniqueIDGenerator._available_ids
+        if not available_ids:
             UniqueIDGenerator._extend_id_pool()
-        new_id = random.choice(tuple(UniqueIDGenerator._available_ids))
-        UniqueIDGenerator._available_ids.remove(new_id)
+        index = random_streams.stream("ids").randrange(len(available_ids))
+        new_id = available_ids[index]
+        available_ids[index] = available_ids[-1]
+        available_ids.pop()
         return new_id
     
     @staticmethod
     def _extend_id_pool():
-        new_ids = set(range(UniqueIDGenerator._id_start, UniqueIDGenerator._id_start + UniqueIDGenerator._id_increment))
-        UniqueIDGenerator._available_ids.update(new_ids)
+        new_ids = range(UniqueIDGenerator._id_start, UniqueIDGenerator._id_start + UniqueIDGenerator._id_increment)
+        UniqueIDGenerator._available_ids.extend(new_ids)
         UniqueIDGenerator._id_start += UniqueIDGenerator._id_increment
@@ -0,0 +1,52 @@
+"""
+named random streams, one per component that draws random numbers (treatment
+durations, deaths, treatment types, admissions, ids). unseeded they are drawn
+from os entropy like the global random module. once seeded every stream is
+derived from the seed and its own name, so components draw independently and a
+change in how often one of them draws does not shift the numbers of the others.
+
+streams are looked up on every use, `seed` replaces them.
+
+`keyed` draws a number from a key instead of a stream, whoever asks for the
+same name and key gets the same number (in one process, or in every process
+run with the same seed).
+"""
+
+import hashlib
+import random
+import threading
+
+_seed: int | None = None
+_streams: dict[str, random.Random] = {}
+_lock = threading.Lock()
+# salt of the keyed draws while unseeded
+_process_salt = random.SystemRandom().getrandbits(64)
+
+
+def stream(name: str) -> random.Random:
+    generator = _streams.get(name)
+    if generator is None:
+        with _lock:
+            generator = _streams.get(name)
+            if generator is None:
+                generator = _streams[name] = random.Random(None if _seed is None else f"{_seed}:{name}")
+    return generator
+
+
+def keyed(name: str, key: int) -> float:
+    # a number in [0, 1) that only depends on the seed, `name` and `key`
+    salt = _process_salt if _seed is None else _seed
+    digest = hashlib.blake2b(f"{salt}:{name}:{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def seed(value: int | None) -> None:
+    # None goes back to unseeded streams
+    global _seed
+    with _lock:
+        _seed = value
+        _streams.clear()
+
+
+def current_seed() -> int | None:
+    return _seed